@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from modeltranslation.admin import TranslationAdmin
 from .models import *
+from .admin_utils import LargeTableAdmin
 
 # Register your models here.
 class NewsAdmin(TranslationAdmin):
@@ -10,20 +11,50 @@ class NewsAdmin(TranslationAdmin):
 class BannerAdmin(admin.ModelAdmin):
     list_display=['title', 'active']
 
-class LocationAdmin(admin.ModelAdmin):
+class LocationAdmin(LargeTableAdmin):
     list_display=['user', 'address']
+    list_select_related=['user__origin']
+    autocomplete_fields=['user']
 
-class ProfileAdmin(admin.ModelAdmin):
+class ProfileAdmin(LargeTableAdmin):
     list_display=['phone_number','full_name']
+    ordering=['-id']
+    # Qidiruv ProfileQuerySet.search orqali (pattern_ops indekslari); autocomplete ham shundan foydalanadi
+    search_fields=['phone_number']
+    raw_id_fields=['origin']
+
+    def get_queryset(self, request):
+        # __str__ origin.username ni o'qiydi (ro'yxatdagi katakcha yorlig'i, autocomplete)
+        return super().get_queryset(request).select_related('origin')
+
+    def get_search_results(self, request, queryset, search_term):
+        return queryset.search(search_term), False
+
+class ViewedNewsAdmin(LargeTableAdmin):
+    list_select_related=['user']
+    raw_id_fields=['user', 'news']
+
+class FavoriteAdmin(LargeTableAdmin):
+    list_select_related=['user__origin', 'product']
+    raw_id_fields=['user', 'product']
 
 admin.site.register(Profile, ProfileAdmin)
 admin.site.register(Location, LocationAdmin)
 admin.site.register(News, NewsAdmin)
-admin.site.register(ViewedNews)
-admin.site.register(Favorite)
+admin.site.register(ViewedNews, ViewedNewsAdmin)
+admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(Banner, BannerAdmin)
 
 
+class DeviceTokenAdmin(LargeTableAdmin):
+    list_display = ['profile', 'created_at', 'last_seen_at']
+    list_select_related = ['profile__origin']
+    raw_id_fields = ['profile']
+
+
+admin.site.register(DeviceToken, DeviceTokenAdmin)
+
+
 class CustomUserAdmin(UserAdmin):
     # Добавляем новые поля в список отображения (в таблице)
     list_display = ('username' ,'is_wholesaler', 'is_approved', 'is_b2b', 'is_staff', 'img')
@@ -59,6 +90,8 @@ admin.site.register(User, CustomUserAdmin)
 class B2BApplicationAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "company_name", "phone", "status", "created")
     list_filter = ("status",)
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
     search_fields = ("company_name", "phone", "user__username")
 
     @admin.action(description="B2B arizalarni APPROVED qilish")
@@ -0,0 +1,44 @@
+"""
+Katta jadvallar uchun admin yordamchilari (Profile, Order, SoldProduct, LoyaltyLedger...).
+
+Admin changelist har sahifada ikki marta COUNT(*) qiladi: filtrlangan natija va (show_full_result_count)
+butun jadval. Million qatorli jadvalda ikkalasi ham to'liq skan. Bu yerda:
+    - LargeTableAdmin.show_full_result_count = False — ikkinchi COUNT yo'q;
+    - EstimatedCountPaginator — filtr/qidiruv bo'lmasa soni pg_class.reltuples dan (ANALYZE bahosi);
+      jadval kichik yoki filtr bor bo'lsa — oddiy COUNT.
+"""
+
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    # Shundan kichik jadvalda aniq COUNT arzon va sahifalar soni to'g'ri chiqadi
+    ESTIMATE_THRESHOLD = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where and not queryset.query.distinct:
+            estimate = self.estimated_count(queryset)
+            if estimate >= self.ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def estimated_count(queryset):
+        """ANALYZE/autovacuum bahosi; hali baholanmagan jadval uchun -1 (PostgreSQL 14+) yoki 0"""
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else -1
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
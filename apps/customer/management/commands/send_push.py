@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.customer.push import PushService
+
+
+class Command(BaseCommand):
+    help = "Barcha qurilmalarga push xabar yuboradi va yetkazish hisobotini chiqaradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--title", required=True)
+        parser.add_argument("--body", required=True)
+        parser.add_argument("--topic", default="broadcast")
+
+    def handle(self, *args, **options):
+        texts = {lang: (options["title"], options["body"]) for lang in settings.MODELTRANSLATION_LANGUAGES}
+        report = PushService.send(texts, data={"topic": options["topic"]})
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {report['sent']}, failed {report['failed']}, pruned {report['pruned']} "
+            f"in {report['batches']} batches ({report['seconds']}s, {report['per_second']}/s)."
+        ))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_profile_tokens(apps, schema_editor):
+    # Profile.device_token dagi mavjud tokenlar yangi jadvalga ko'chiriladi
+    Profile = apps.get_model("customer", "Profile")
+    DeviceToken = apps.get_model("customer", "DeviceToken")
+
+    tokens = {}
+    for profile_id, token in (
+        Profile.objects.exclude(device_token=None).exclude(device_token="")
+        .order_by("id").values_list("id", "device_token")
+    ):
+        # Bir xil token bir nechta profilda bo'lsa, oxirgisi qoladi
+        tokens[token.strip()[:512]] = profile_id
+    DeviceToken.objects.bulk_create(
+        [DeviceToken(profile_id=profile_id, token=token) for token, profile_id in tokens.items() if token],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=512, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_seen_at', models.DateTimeField(auto_now=True)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='device_tokens', to='customer.profile')),
+            ],
+        ),
+        migrations.RunPython(copy_profile_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:30
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0003_devicetoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['phone_number'], name='profile_phone_like', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('full_name'), name='text_pattern_ops'), name='profile_name_upper_like'),
+        ),
+    ]
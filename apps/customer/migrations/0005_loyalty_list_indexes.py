@@ -0,0 +1,21 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0004_profile_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['full_name'], name='profile_full_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['created_at'], name='profile_created_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.10 on 2026-10-19 19:05
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+import apps.customer.trigram
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0005_loyalty_list_indexes'),
+    ]
+
+    operations = [
+        apps.customer.trigram.TrigramExtensionIfAvailable(),
+        apps.customer.trigram.AddTrigramIndex(
+            model_name='profile',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('full_name'), name='gin_trgm_ops'), name='profile_name_trgm'),
+        ),
+        apps.customer.trigram.AddTrigramIndex(
+            model_name='profile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['phone_number'], name='profile_phone_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -2,10 +2,14 @@ import random, string
 
 from django.conf import settings
 from django.contrib.auth.models import User, AbstractUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
 from django.db.models import Q
+from django.db.models.functions import Upper
 from model_utils.models import TimeStampedModel
 
+from .trigram import TRIGRAM_MIN_LENGTH
+
 
 # Create your models here.
 
@@ -33,6 +37,30 @@ def generate_referral_code():
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
 
 
+class ProfileQuerySet(models.QuerySet):
+    def search(self, query):
+        """
+        Dashboard qidiruvi: raqam bo'lsa telefon, aks holda ism bo'yicha — satr ichidan (ILIKE '%x%'),
+        Profile.Meta dagi GIN gin_trgm_ops indekslari bilan.
+        TRIGRAM_MIN_LENGTH dan qisqa so'rov trigram indeksidan foydalana olmaydi: u boshidan
+        (telefon 998 siz ham) pattern_ops indekslari bo'yicha qidiriladi.
+        """
+        query = (query or "").strip()
+        if not query:
+            return self
+        digits = query.replace("+", "").replace(" ", "").replace("-", "")
+        if digits.isdigit():
+            if len(digits) >= TRIGRAM_MIN_LENGTH:
+                return self.filter(phone_number__contains=digits)
+            condition = Q(phone_number__startswith=digits)
+            if not digits.startswith("998"):
+                condition |= Q(phone_number__startswith=f"998{digits}")
+            return self.filter(condition)
+        if len(query) >= TRIGRAM_MIN_LENGTH:
+            return self.filter(full_name__icontains=query)
+        return self.filter(full_name__istartswith=query)
+
+
 class Profile(models.Model):  # Удали TimeStampedModel если она вызывает ошибки, или оставь если она есть
     LANG = (("uz", "UZ"), ("ru", "RU"), ("en", "EN"), ("kr", "KR"))
     origin = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -50,6 +78,21 @@ class Profile(models.Model):  # Удали TimeStampedModel если она вы
     device_token = models.TextField(null=True, blank=True)  # Yangi maydon
     created_at = models.DateTimeField(auto_now_add=True, null=True)
 
+    objects = ProfileQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # ProfileQuerySet.search: phone_number LIKE '998..%' va UPPER(full_name) LIKE 'ALI%'
+            models.Index(fields=["phone_number"], name="profile_phone_like", opclasses=["varchar_pattern_ops"]),
+            models.Index(OpClass(Upper("full_name"), name="text_pattern_ops"), name="profile_name_upper_like"),
+            # Dashboard ro'yxatlarida saralash
+            models.Index(fields=["full_name"], name="profile_full_name_idx"),
+            models.Index(fields=["created_at"], name="profile_created_idx"),
+            # ProfileQuerySet.search: UPPER(full_name) LIKE UPPER('%ali%') va phone_number LIKE '%9011%' (pg_trgm)
+            GinIndex(OpClass(Upper("full_name"), name="gin_trgm_ops"), name="profile_name_trgm"),
+            GinIndex(fields=["phone_number"], opclasses=["gin_trgm_ops"], name="profile_phone_trgm"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.referral_code:
             while True:
@@ -64,6 +107,21 @@ class Profile(models.Model):  # Удали TimeStampedModel если она вы
         return f"{self.full_name} ({self.origin.username})"
 
 
+class DeviceToken(models.Model):
+    """
+    Foydalanuvchining qurilmalari (FCM registration token). Bitta profilda bir nechta
+    qurilma bo'lishi mumkin; token bitta qurilmaga tegishli, shuning uchun unique.
+    FCM NotRegistered/InvalidRegistration qaytargan tokenlar apps.customer.push da o'chiriladi.
+    """
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="device_tokens")
+    token = models.CharField(max_length=512, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.profile_id}: {self.token[:16]}..."
+
+
 class B2BApplication(TimeStampedModel, models.Model):
     """B2B ariza modeli.
 
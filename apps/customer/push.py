@@ -0,0 +1,159 @@
+"""
+Push xabarlarni yetkazish (FCM legacy HTTP API).
+
+Oldin har bir xabar /topics/all ga o'zbek tilida ketardi. Endi:
+    - qurilma tokenlari DeviceToken jadvalida (bir profilda bir nechta qurilma);
+    - xabar profil tili (Profile.lang) bo'yicha segmentlarga bo'linadi va har bir segment
+      o'z tilidagi matn bilan registration_ids orqali BATCH_SIZE tadan yuboriladi;
+    - FCM javobidagi NotRegistered/InvalidRegistration tokenlar o'chiriladi;
+    - natija (yuborilgan, xato, o'chirilgan, soniyada nechta) log'ga va chaqiruvchiga qaytadi.
+
+Signallar send_localized() ni chaqiradi: yuborish commit'dan keyin fon oqimida bajariladi,
+admin paneldagi saqlash FCM'ni kutib qolmaydi.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.db import connections, transaction
+
+from .models import DeviceToken
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FCM_URL = "https://fcm.googleapis.com/fcm/send"
+
+# FCM legacy API bitta so'rovda 1000 tagacha registration_ids qabul qiladi
+BATCH_SIZE = 500
+REQUEST_TIMEOUT = 10
+
+# Shu xatolar bilan qaytgan token boshqa hech qachon ishlamaydi
+INVALID_TOKEN_ERRORS = {"NotRegistered", "InvalidRegistration", "MismatchSenderId"}
+
+# Profile.lang -> modeltranslation tili (ko'rinishi "kr", tarjimada "ko")
+PROFILE_LANGUAGES = {"uz": "uz", "ru": "ru", "en": "en", "kr": "ko"}
+FALLBACK_LANGUAGE = "uz"
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="push")
+
+
+class PushService:
+
+    @staticmethod
+    def register_token(profile, token):
+        """Login paytida: token boshqa profilga tegishli bo'lsa, yangi egasiga o'tadi"""
+        token = (token or "").strip()
+        if not token:
+            return None
+        device, _ = DeviceToken.objects.update_or_create(token=token, defaults={"profile": profile})
+        return device
+
+    @staticmethod
+    def localized_messages(texts):
+        """
+        texts: {"uz": (title, body), "ru": ...} — til bo'yicha segmentlar uchun matnlar.
+        Tarjimasi yo'q segmentga FALLBACK_LANGUAGE matni yuboriladi.
+        """
+        fallback = texts.get(FALLBACK_LANGUAGE) or next(iter(texts.values()))
+        return {
+            profile_lang: texts.get(language) or fallback
+            for profile_lang, language in PROFILE_LANGUAGES.items()
+        }
+
+    @staticmethod
+    def _token_batches(profile_lang, profiles=None):
+        """(id, token) juftliklari, id bo'yicha keyset bilan BATCH_SIZE tadan"""
+        queryset = DeviceToken.objects.filter(profile__lang=profile_lang)
+        if profiles is not None:
+            queryset = queryset.filter(profile__in=profiles)
+        last_id = 0
+        while True:
+            batch = list(
+                queryset.filter(id__gt=last_id).order_by("id").values_list("id", "token")[:BATCH_SIZE]
+            )
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1][0]
+
+    @staticmethod
+    def _post(session, tokens, title, body, data):
+        response = session.post(
+            getattr(settings, "FCM_URL", DEFAULT_FCM_URL),
+            json={
+                "registration_ids": tokens,
+                "priority": "high",
+                "notification": {"title": title, "body": body},
+                "data": data,
+            },
+            headers={"Authorization": f"key={settings.FCM_SERVER_KEY}"},
+            timeout=REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+        return response.json().get("results", [])
+
+    @classmethod
+    def send(cls, texts, data=None, profiles=None):
+        """
+        Xabarni til segmentlari bo'yicha batch qilib yuboradi va hisobot qaytaradi.
+        profiles berilsa (queryset) — faqat shu profillarga.
+        """
+        report = {"sent": 0, "failed": 0, "pruned": 0, "batches": 0, "seconds": 0.0, "per_second": 0.0}
+        if not settings.FCM_SERVER_KEY:
+            logger.info("FCM_SERVER_KEY is not configured, push skipped")
+            return report
+
+        started = time.monotonic()
+        messages = cls.localized_messages(texts)
+        with requests.Session() as session:
+            for profile_lang, (title, body) in messages.items():
+                for batch in cls._token_batches(profile_lang, profiles):
+                    ids, tokens = zip(*batch)
+                    report["batches"] += 1
+                    try:
+                        results = cls._post(session, list(tokens), title, body, data or {})
+                    except (requests.RequestException, ValueError):
+                        logger.exception("FCM batch of %d tokens failed", len(tokens))
+                        report["failed"] += len(tokens)
+                        continue
+
+                    invalid = []
+                    for token_id, result in zip(ids, results):
+                        if "message_id" in result:
+                            report["sent"] += 1
+                        else:
+                            report["failed"] += 1
+                            if result.get("error") in INVALID_TOKEN_ERRORS:
+                                invalid.append(token_id)
+                    if invalid:
+                        report["pruned"] += DeviceToken.objects.filter(id__in=invalid).delete()[0]
+
+        report["seconds"] = round(time.monotonic() - started, 3)
+        if report["seconds"]:
+            report["per_second"] = round(report["sent"] / report["seconds"], 1)
+        logger.info("Push delivered: %s", report)
+        return report
+
+    @classmethod
+    def _send_in_background(cls, texts, data):
+        try:
+            cls.send(texts, data)
+        except Exception:
+            logger.exception("Push delivery failed")
+        finally:
+            connections.close_all()
+
+    @classmethod
+    def send_localized(cls, texts, data=None):
+        """Commit'dan keyin yuboradi (PUSH_ASYNC=False bo'lsa shu oqimda)"""
+        def run():
+            if getattr(settings, "PUSH_ASYNC", True):
+                _executor.submit(cls._send_in_background, texts, data)
+            else:
+                cls.send(texts, data)
+
+        transaction.on_commit(run)
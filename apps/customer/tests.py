@@ -1,3 +1,180 @@
-from django.test import TestCase
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.customer import push
+from apps.customer.models import DeviceToken, Location, News, Profile
+from apps.merchant.models import Order
+from apps.customer.push import PushService
+
+
+class FakeFCMServer:
+	"""
+	FCM legacy /fcm/send ning soddalashtirilgan nusxasi.
+	"stale" bilan boshlanadigan tokenlarga NotRegistered qaytaradi.
+	"""
+
+	def __init__(self):
+		self.requests = []
+		fake = self
+
+		class Handler(BaseHTTPRequestHandler):
+			def do_POST(self):
+				payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+				fake.requests.append({"auth": self.headers["Authorization"], **payload})
+				results = [
+					{"error": "NotRegistered"} if token.startswith("stale") else {"message_id": f"m:{token}"}
+					for token in payload["registration_ids"]
+				]
+				body = json.dumps({"results": results}).encode()
+				self.send_response(200)
+				self.send_header("Content-Type", "application/json")
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, *args):
+				pass
+
+		self.server = HTTPServer(("127.0.0.1", 0), Handler)
+		self.url = f"http://127.0.0.1:{self.server.server_port}/fcm/send"
+		self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+	def __enter__(self):
+		self.thread.start()
+		return self
+
+	def __exit__(self, *exc):
+		self.server.shutdown()
+		self.server.server_close()
+
+
+class PushServiceTests(TestCase):
+	def setUp(self):
+		self.fcm = FakeFCMServer().__enter__()
+		self.addCleanup(self.fcm.__exit__, None, None, None)
+		settings_override = override_settings(FCM_URL=self.fcm.url, FCM_SERVER_KEY="test-key", PUSH_ASYNC=False)
+		settings_override.enable()
+		self.addCleanup(settings_override.disable)
+
+	def _profile(self, phone, lang, tokens):
+		user = get_user_model().objects.create_user(username=phone, password="testpass123")
+		profile = Profile.objects.create(origin=user, full_name=phone, phone_number=phone, lang=lang)
+		for token in tokens:
+			PushService.register_token(profile, token)
+		return profile
+
+	def test_segments_by_language_and_prunes_invalid_tokens(self):
+		self._profile("998901000001", "uz", ["uz-1", "stale-uz"])
+		self._profile("998901000002", "ru", ["ru-1"])
+		self._profile("998901000003", "kr", ["ko-1"])
+
+		report = PushService.send({"uz": ("Salom", "Matn"), "ru": ("Привет", "Текст"), "ko": ("안녕", "본문")})
+
+		sent = {tuple(r["registration_ids"]): r["notification"]["title"] for r in self.fcm.requests}
+		self.assertEqual(sent, {("uz-1", "stale-uz"): "Salom", ("ru-1",): "Привет", ("ko-1",): "안녕"})
+		self.assertEqual(self.fcm.requests[0]["auth"], "key=test-key")
+		self.assertEqual((report["sent"], report["failed"], report["pruned"]), (3, 1, 1))
+		self.assertFalse(DeviceToken.objects.filter(token="stale-uz").exists())
+
+	def test_tokens_are_sent_in_batches(self):
+		self._profile("998901000004", "en", [f"en-{i}" for i in range(5)])
+		with mock.patch.object(push, "BATCH_SIZE", 2):
+			report = PushService.send({"uz": ("Salom", "Matn")})
+
+		self.assertEqual([len(r["registration_ids"]) for r in self.fcm.requests], [2, 2, 1])
+		# Tarjimasi yo'q til uchun o'zbekcha matn
+		self.assertEqual({r["notification"]["title"] for r in self.fcm.requests}, {"Salom"})
+		self.assertEqual((report["sent"], report["batches"]), (5, 3))
+
+	def test_token_moves_to_latest_profile(self):
+		first = self._profile("998901000005", "uz", ["shared"])
+		second = self._profile("998901000006", "ru", ["shared"])
+		self.assertEqual(DeviceToken.objects.get(token="shared").profile, second)
+		self.assertFalse(first.device_tokens.exists())
+
+	def test_news_push_is_localized_after_commit(self):
+		self._profile("998901000007", "ru", ["ru-2"])
+		now = timezone.now()
+		with self.captureOnCommitCallbacks(execute=True):
+			News.objects.create(
+				title_uz="Aksiya", title_ru="Акция", start_date=now, end_date=now, image="media/news/a.png"
+			)
+
+		self.assertEqual(len(self.fcm.requests), 1)
+		self.assertEqual(self.fcm.requests[0]["notification"], {"title": "Новость!", "body": "Акция"})
+		self.assertEqual(self.fcm.requests[0]["data"], {"topic": "newsTopic"})
+
+	@override_settings(FCM_SERVER_KEY="")
+	def test_nothing_is_sent_without_server_key(self):
+		self._profile("998901000008", "uz", ["uz-3"])
+		self.assertEqual(PushService.send({"uz": ("Salom", "Matn")})["sent"], 0)
+		self.assertEqual(self.fcm.requests, [])
+
+
+class UserListViewTests(TestCase):
+	def setUp(self):
+		self.admin = get_user_model().objects.create_user(username="admin", password="testpass123", is_staff=True)
+		self.client.force_login(self.admin)
+		for i in range(15):
+			user = get_user_model().objects.create_user(username=f"99890200{i:04d}", password="testpass123")
+			profile = Profile.objects.create(origin=user, full_name=f"User {i}", phone_number=f"99890200{i:04d}")
+			Location.objects.create(user=profile, address=f"Old {i}")
+			Location.objects.create(user=profile, address=f"Active {i}", active=True)
+			Order.objects.create(user=profile, status="pending")
+
+	def test_page_queries_do_not_grow_with_users(self):
+		# session + user + count + sahifa + manzillar
+		with self.assertNumQueries(5):
+			response = self.client.get("/dashboard/users/")
+		self.assertEqual(response.status_code, 200)
+		users = list(response.context["users"])
+		self.assertEqual(len(users), 10)
+		self.assertEqual({profile.order_count for profile in users}, {1})
+		active = response.context["active_locations"]
+		self.assertEqual([location.address for location in active[users[0]]], ["Active 14"])
+
+	def test_search_by_phone_and_name(self):
+		self.assertEqual(
+			[p.phone_number for p in self.client.get("/dashboard/users/", {"q": "90 200 0012"}).context["users"]],
+			["998902000012"],
+		)
+		self.assertEqual(
+			[p.full_name for p in self.client.get("/dashboard/users/", {"q": "user 1"}).context["users"]],
+			[f"User {i}" for i in (14, 13, 12, 11, 10, 1)],
+		)
+
+	def test_search_matches_substrings(self):
+		self.assertEqual(
+			[p.full_name for p in self.client.get("/dashboard/users/", {"q": "ser 1"}).context["users"]],
+			[f"User {i}" for i in (14, 13, 12, 11, 10, 1)],
+		)
+		self.assertEqual(list(Profile.objects.search("2000012").values_list("phone_number", flat=True)), ["998902000012"])
+		# Qisqa so'rov boshidan: "er" ism ichida bor, lekin boshida emas
+		self.assertFalse(Profile.objects.search("er").exists())
+		self.assertEqual(Profile.objects.search("90").count(), 15)
+
+	def plan(self, queryset):
+		with connection.cursor() as cursor:
+			cursor.execute("SET LOCAL enable_seqscan = off")
+			sql, params = queryset.query.sql_with_params()
+			cursor.execute(f"EXPLAIN {sql}", params)
+			return "\n".join(row[0] for row in cursor.fetchall())
+
+	def test_short_search_uses_prefix_indexes(self):
+		self.assertIn("profile_phone_like", self.plan(Profile.objects.search("99")))
+		self.assertIn("profile_name_upper_like", self.plan(Profile.objects.search("Us")))
+
+	def test_substring_search_uses_trigram_indexes(self):
+		with connection.cursor() as cursor:
+			cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+			if cursor.fetchone() is None:
+				self.skipTest("pg_trgm o'rnatilmagan")
+		self.assertIn("profile_phone_trgm", self.plan(Profile.objects.search("2000012")))
+		self.assertIn("profile_name_trgm", self.plan(Profile.objects.search("ser 1")))
@@ -0,0 +1,47 @@
+"""
+pg_trgm (trigram) indekslari uchun migratsiya operatsiyalari.
+
+Prod (Neon) da pg_trgm bor: GIN gin_trgm_ops indekslari ILIKE '%x%' qidiruvini indeks bo'yicha bajaradi.
+contrib'siz yig'ilgan lokal PostgreSQL'da kengaytma va indekslar o'tkazib yuboriladi —
+migratsiya yiqilmaydi, qidiruv esa xuddi shu natijani (indekssiz) beradi.
+"""
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# Trigram indeksi 3+ belgili so'rovda ishlaydi; qisqaroq so'rov pattern_ops indeksi bo'yicha boshidan qidiriladi
+TRIGRAM_MIN_LENGTH = 3
+
+
+def trigram_available(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def trigram_installed(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+class TrigramExtensionIfAvailable(TrigramExtension):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if trigram_available(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        # Kengaytmani boshqa ilovalarning indekslari ham ishlatadi — o'chirilmaydi
+        pass
+
+
+class AddTrigramIndex(migrations.AddIndex):
+    """Holatga doim qo'shiladi, bazada esa faqat pg_trgm o'rnatilgan bo'lsa yaratiladi"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if trigram_installed(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        schema_editor.execute(f"DROP INDEX IF EXISTS {schema_editor.quote_name(self.index.name)}")
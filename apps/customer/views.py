@@ -27,9 +27,11 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from twilio.rest import Client
 
 from .base import CustomerFilterService, CustomerListService
+from .push import PushService
 from .models import (
     B2BApplication,
     Banner,
+    DeviceToken,
     Favorite,
     Location,
     News,
@@ -82,6 +84,8 @@ class LoginView(APIView):
             if device_token:
                 profile.device_token = device_token
                 profile.save()
+                # Bir nechta qurilma: push xabarlar DeviceToken jadvalidan yuboriladi
+                PushService.register_token(profile, device_token)
 
             refresh = RefreshToken.for_user(user)
 
@@ -581,4 +585,23 @@ def send_otp_sms(phone_number, otp):
         )
         print(f"OK! SMS ID: {message.sid}")
     except Exception as e:
-        print(f"XATO JONI: {e}")
\ No newline at end of file
+        print(f"XATO JONI: {e}")
+
+
+@extend_schema(tags=["Customer"])
+class DeviceTokenAPIView(APIView):
+    """
+    Qurilma push tokenini ro'yxatdan o'tkazish (POST, token yangilanganda) va
+    chiqishda o'chirish (DELETE). Body: {"token": "<fcm token>"}
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        device = PushService.register_token(request.user.profile, request.data.get("token"))
+        if device is None:
+            return Response({"error": "token is required"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"status": "registered"}, status=status.HTTP_201_CREATED)
+
+    def delete(self, request):
+        DeviceToken.objects.filter(profile=request.user.profile, token=request.data.get("token")).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -9,6 +9,7 @@ from apps.product.models import (
     Good,
     Category,
 )
+from apps.product.promotions import PromotionEngine
 from django.core.validators import MinValueValidator
 from apps.customer.models import News, Banner
 from apps.merchant.models import Information, Service, Bonus, SocialMedia
@@ -94,6 +95,8 @@ class PhoneProductItemForm(forms.ModelForm):
         phone.category = self.cleaned_data["category"]
         if commit:
             phone.save()
+            # Kategoriya/guruh bo'yicha faol aksiyalar yangi mahsulotga ham qo'llanadi
+            PromotionEngine.recompute_after_edit([product_item])
             for img in self.files.getlist("images"):
                 Image.objects.create(image=img, name=f"{phone.model_name}_{img.name}", product=product_item)
         return phone
@@ -130,6 +133,7 @@ class TicketProductItemForm(forms.ModelForm):
         ticket.category = self.cleaned_data["category"]
         if commit:
             ticket.save()
+            PromotionEngine.recompute_after_edit([product_item])
             for img in self.files.getlist("images"):
                 Image.objects.create(image=img, name=f"{ticket.event_name_uz}_{img.name}", product=product_item)
         return ticket
@@ -201,6 +205,7 @@ class GoodProductItemForm(forms.ModelForm):
         good.product = product_item
         if commit:
             good.save()
+            PromotionEngine.recompute_after_edit([product_item])
             for img in self.files.getlist("images"):
                 Image.objects.create(image=img, name=f"{good.name_uz}_{img.name}", product=product_item)
         return good
@@ -236,12 +241,14 @@ class GoodEditForm(forms.ModelForm):
         good.category = self.cleaned_data['category']
 
         product_item = good.product
-        product_item.new_price = self.cleaned_data["new_price"]
+        # Aksiya davomida qo'lda narx manual_* ga yoziladi, aksiya narxi recompute'da yangilanadi
+        PromotionEngine.assign_price(product_item, "new_price", self.cleaned_data["new_price"])
         product_item.old_price = self.cleaned_data["old_price"]
 
         if commit:
             product_item.save()
             good.save()
+            PromotionEngine.recompute_after_edit([product_item])
             # Image logic...
         return good
 
@@ -1487,7 +1494,7 @@ class PhoneEditForm(forms.ModelForm):
         get_weight = self.cleaned_data.get("weight", None)
         product_item = phone.product
         product_item.old_price = self.cleaned_data["product_old_price"]
-        product_item.new_price = self.cleaned_data["product_new_price"]
+        PromotionEngine.assign_price(product_item, "new_price", self.cleaned_data["product_new_price"])
         product_item.weight = get_weight if get_weight else 1
         product_item.available_quantity = self.cleaned_data[
             "product_available_quantity"
@@ -1499,6 +1506,7 @@ class PhoneEditForm(forms.ModelForm):
         product_item.active = self.cleaned_data["product_active"]
         if commit:
             product_item.save()
+            PromotionEngine.recompute_after_edit([product_item])
             phone.product = product_item
             phone.category = self.cleaned_data["category"]
             phone.save()
@@ -1714,8 +1722,8 @@ class TicketEditForm(forms.ModelForm):
         product_item.desc_ru = self.cleaned_data["product_desc_ru"]
         product_item.desc_en = self.cleaned_data["product_desc_en"]
         product_item.desc_ko = self.cleaned_data["product_desc_ko"]
-        product_item.new_price = self.cleaned_data["product_old_price"]
-        product_item.new_price = self.cleaned_data["product_new_price"]
+        product_item.old_price = self.cleaned_data["product_old_price"]
+        PromotionEngine.assign_price(product_item, "new_price", self.cleaned_data["product_new_price"])
         product_item.available_quantity = self.cleaned_data[
             "product_available_quantity"
         ]
@@ -1723,6 +1731,7 @@ class TicketEditForm(forms.ModelForm):
 
         if commit:
             product_item.save()
+            PromotionEngine.recompute_after_edit([product_item])
             ticket.product = product_item
             ticket.category = self.cleaned_data["category"]
             ticket.save()
@@ -1864,7 +1873,10 @@ class GoodChildProductItemForm(forms.ModelForm):
             active=self.cleaned_data["active"],
             product_type=self.product_type,
             main=False,
-            new_price=parent.product.new_price,
+            # Ota mahsulot aksiyada bo'lsa, aksiya narxi emas, qo'lda qo'yilgan narx ko'chiriladi
+            new_price=(
+                parent.product.manual_new_price if parent.product.promotion_id else parent.product.new_price
+            ),
             old_price=parent.product.old_price,
             desc_uz=parent.product.desc_uz,
             desc_ru=parent.product.desc_ru,
@@ -1879,6 +1891,7 @@ class GoodChildProductItemForm(forms.ModelForm):
         if commit:
 
             product_item.save()
+            PromotionEngine.recompute_after_edit([product_item])
             good.product = product_item
             good.sub_cat = parent.sub_cat
             good.save()
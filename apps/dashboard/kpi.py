@@ -0,0 +1,172 @@
+"""
+Dashboard bosh sahifasidagi KPI hisoblagichlari.
+
+Oldin har bir sahifa ochilishida Order, Profile, LoyaltyPendingBonus va SoldProduct
+jadvallari bo'yicha ~10 ta alohida COUNT/SUM ketardi. Endi:
+    - hamma hisoblagichlar ikkita so'rovda (shartli agregatsiya) hisoblanadi;
+    - natija keshda SNAPSHOT_TTL soniya turadi;
+    - shu vaqt ichida buyurtma/profil/bonus hodisalari snapshot'ni o'zi yangilaydi
+      (adjust), shuning uchun raqamlar TTL tugashini kutmaydi.
+
+adjust() read-modify-write: ikki worker bir vaqtda yozsa bitta o'zgarish yo'qolishi mumkin,
+lekin snapshot TTL'dan uzoq yashamaydi — keyingi to'liq hisoblash uni tuzatadi.
+"""
+
+import time
+from datetime import datetime, time as dt_time
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from apps.customer.models import Profile
+from apps.merchant.models import LoyaltyPendingBonus, Order
+from apps.product.models import ProductItem, SoldProduct
+
+
+SNAPSHOT_KEY = "dashboard:kpi"
+SNAPSHOT_TTL = 300
+
+PAID_STATUSES = Order.PAID_STATUSES
+
+TOP_SELLING_LIMIT = 10
+
+def start_of_today():
+    """TIME_ZONE bo'yicha bugungi kun boshi (aware datetime)"""
+    return timezone.make_aware(datetime.combine(timezone.localdate(), dt_time.min))
+
+
+class KpiSnapshotService:
+
+    @staticmethod
+    def _order_counters(day_start):
+        paid = Q(status__in=PAID_STATUSES)
+        today = Q(created_at__gte=day_start)
+        return Order.objects.aggregate(
+            pending_orders=Count("id", filter=Q(status="pending")),
+            check_pending=Count("id", filter=Q(status="check_pending")),
+            order_today_count=Count("id", filter=today),
+            revenue_today=Sum("total_amount", filter=paid & today),
+            total_revenue=Sum("total_amount", filter=paid),
+        )
+
+    @staticmethod
+    def _customer_counters(day_start):
+        profiles = connection.ops.quote_name(Profile._meta.db_table)
+        bonuses = connection.ops.quote_name(LoyaltyPendingBonus._meta.db_table)
+        # Uch xil jadval — bitta so'rovda skalyar subquery'lar bilan
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT
+                    (SELECT COUNT(*) FROM {profiles}),
+                    (SELECT COUNT(*) FROM {profiles} WHERE created_at >= %s),
+                    (SELECT COUNT(*) FROM {bonuses} WHERE status = 'pending')
+                """,
+                [day_start],
+            )
+            customers, customers_today, pending_bonuses = cursor.fetchone()
+        return {
+            "customers": customers,
+            "customers_today": customers_today,
+            "pending_bonuses": pending_bonuses,
+        }
+
+    @staticmethod
+    def top_selling():
+        """Avval SoldProduct bitta jadvalda guruhlanadi, nomlar faqat 10 ta mahsulot uchun olinadi"""
+        rows = list(
+            SoldProduct.objects.exclude(product=None)
+            .values("product_id")
+            .annotate(total_qty=Sum("quantity"))
+            .order_by("-total_qty")[:TOP_SELLING_LIMIT]
+        )
+        products = ProductItem.objects.select_related("goods", "phones", "tickets").in_bulk(
+            [row["product_id"] for row in rows]
+        )
+
+        def title(product):
+            if product is None:
+                return "Nomsiz"
+            for relation, field in (("goods", "name_uz"), ("phones", "model_name_uz"), ("tickets", "event_name_uz")):
+                related = getattr(product, relation, None)
+                if related is not None and getattr(related, field, None):
+                    return getattr(related, field)
+            return "Nomsiz"
+
+        return [
+            {"title": title(products.get(row["product_id"])), "total_quantity": row["total_qty"]}
+            for row in rows
+        ]
+
+    @classmethod
+    def compute(cls):
+        day_start = start_of_today()
+        snapshot = {
+            **cls._order_counters(day_start),
+            **cls._customer_counters(day_start),
+            "chart_data": cls.top_selling(),
+            "day": day_start.date().isoformat(),
+            "computed_at": time.time(),
+        }
+        for key in ("revenue_today", "total_revenue"):
+            snapshot[key] = snapshot[key] or 0
+        return snapshot
+
+    @classmethod
+    def get(cls):
+        snapshot = cache.get(SNAPSHOT_KEY)
+        if snapshot is None or snapshot["day"] != timezone.localdate().isoformat():
+            snapshot = cls.compute()
+            cache.set(SNAPSHOT_KEY, snapshot, SNAPSHOT_TTL)
+        return snapshot
+
+    @staticmethod
+    def adjust(**deltas):
+        """Keshdagi snapshot'ga o'zgarishlarni qo'shadi (snapshot bo'lmasa — keyingi get() hisoblaydi)"""
+        snapshot = cache.get(SNAPSHOT_KEY)
+        if snapshot is None or snapshot["day"] != timezone.localdate().isoformat():
+            return
+        remaining = SNAPSHOT_TTL - (time.time() - snapshot["computed_at"])
+        if remaining < 1:
+            cache.delete(SNAPSHOT_KEY)
+            return
+        for key, delta in deltas.items():
+            snapshot[key] += delta
+        # TTL uzaytirilmaydi: snapshot baribir computed_at + SNAPSHOT_TTL da qayta hisoblanadi
+        cache.set(SNAPSHOT_KEY, snapshot, int(remaining))
+
+    @staticmethod
+    def transition_deltas(old_status, new_status, amount, created_at):
+        """Buyurtma statusi o'zgarganda hisoblagichlar farqi"""
+        deltas = {}
+        for counter, status in (("pending_orders", "pending"), ("check_pending", "check_pending")):
+            deltas[counter] = (new_status == status) - (old_status == status)
+
+        created_today = created_at is not None and created_at >= start_of_today()
+        if old_status is None and created_today:
+            deltas["order_today_count"] = 1
+
+        was_paid, is_paid = old_status in PAID_STATUSES, new_status in PAID_STATUSES
+        if was_paid != is_paid:
+            amount = amount if is_paid else -amount
+            deltas["total_revenue"] = amount
+            if created_today:
+                deltas["revenue_today"] = amount
+        return deltas
+
+    @classmethod
+    def order_transition(cls, old_status, new_status, amount, created_at):
+        cls.order_transitions([(old_status, new_status, amount, created_at)])
+
+    @classmethod
+    def order_transitions(cls, transitions):
+        """Bir nechta o'zgarish bitta adjust() bilan (ommaviy status o'zgarishi)"""
+        totals = {}
+        for transition in transitions:
+            for key, value in cls.transition_deltas(*transition).items():
+                totals[key] = totals.get(key, 0) + value
+        totals = {key: value for key, value in totals.items() if value}
+        if totals:
+            cls.adjust(**totals)
@@ -1,26 +1,64 @@
-from django.db import transaction
-from django.db.models import Q
+from decimal import Decimal
+
+from django.core.paginator import Paginator
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from apps.customer.models import Profile
 from apps.merchant.models import LoyaltyPendingBonus, Referral, LoyaltyCard
+from apps.merchant.loyalty import LoyaltyLedgerService
+from apps.dashboard.kpi import KpiSnapshotService
 from datetime import date, timedelta
 
 
+# ?sort= qiymatlari: faqat indeks bilan ta'minlangan ustunlar
+LOYALTY_SORTS = {
+    "name": ("full_name", "id"),
+    "-name": ("-full_name", "-id"),
+    "balance": ("loyalty_card__current_balance", "id"),
+    "-balance": ("-loyalty_card__current_balance", "-id"),
+    "created": ("created_at", "id"),
+    "-created": ("-created_at", "-id"),
+}
+LOYALTY_PAGE_SIZE = 25
+
+
+def loyalty_customers_queryset():
+    """Balans, tasdiqlangan bonuslar summasi va referallar soni — bitta so'rovda"""
+    bonus_total = (
+        LoyaltyPendingBonus.objects.filter(profile=OuterRef("pk"), status="approved")
+        .order_by().values("profile").annotate(total=Sum("bonus_amount")).values("total")
+    )
+    referral_count = (
+        Referral.objects.filter(referrer=OuterRef("pk"))
+        .order_by().values("referrer").annotate(total=Count("id")).values("total")
+    )
+    return Profile.objects.select_related("loyalty_card").annotate(
+        balance=Coalesce(F("loyalty_card__current_balance"), Value(Decimal(0)), output_field=DecimalField()),
+        bonus_total=Coalesce(Subquery(bonus_total), Value(Decimal(0)), output_field=DecimalField()),
+        referral_count=Coalesce(Subquery(referral_count), Value(0)),
+    )
+
+
 def loyalty_customer_list(request):
-    # 1. Qidiruv so'rovini olish
     query = request.GET.get('q', '')
+    sort = request.GET.get('sort', '-created')
+    if sort not in LOYALTY_SORTS:
+        sort = '-created'
 
-    # 2. Querysetni boshlash
-    profiles = Profile.objects.select_related('loyalty_card').all()
-
-    # 3. Agar qidiruv so'rovi bo'lsa, ism bo'yicha filtrlash
-    if query:
-        profiles = profiles.filter(full_name__icontains=query)
+    # Qidiruv ism/telefon ichidan (Profile.objects.search, trigram indekslari), sahifada LOYALTY_PAGE_SIZE ta mijoz
+    profiles = loyalty_customers_queryset().search(query).order_by(*LOYALTY_SORTS[sort])
+    page_obj = Paginator(profiles, LOYALTY_PAGE_SIZE).get_page(request.GET.get('page'))
 
+    params = request.GET.copy()
+    params.pop('page', None)
     context = {
-        'profiles': profiles,
-        'query': query  # Qidiruv maydonida so'z qolishi uchun
+        'profiles': page_obj.object_list,
+        'page_obj': page_obj,
+        'query': query,  # Qidiruv maydonida so'z qolishi uchun
+        'sort': sort,
+        'filter_query': params.urlencode(),
     }
 
     return render(request, 'loyalty_card/customer-list.html', context)
@@ -44,34 +82,35 @@ def loyalty_customer_detail(request, profile_id):
 
 
 def approve_bonus(request, bonus_id):
-    if request.method == "POST":
-        bonus = get_object_or_404(LoyaltyPendingBonus, id=bonus_id)
+    bonus = get_object_or_404(LoyaltyPendingBonus, id=bonus_id)
 
+    if request.method == "POST":
         # HTML-dagi inputdan foizni olamiz
         percent_from_admin = request.POST.get('percent')
 
         if bonus.status == "pending" and percent_from_admin:
-            with transaction.atomic():
-                bonus.status = "approved"
-                bonus.percent = int(percent_from_admin)  # Admin kiritgan foiz
+            # Karta balansi bulk tasdiqlash bilan bir xil yo'l orqali (bitta marta) to'ldiriladi
+            approved = LoyaltyLedgerService.approve_bonuses([bonus.id], percent_from_admin)
+            KpiSnapshotService.adjust(pending_bonuses=-approved)
+            messages.success(request, f"Bonus {percent_from_admin}% bilan tasdiqlandi!")
+
+    return redirect('loyalty_customer_detail', profile_id=bonus.profile_id)
 
-                # save() chaqirilganda modeldagi mantiq bonus_amountni hisoblaydi
-                bonus.save()
 
-                # LoyaltyCard balansini yangilash
-                card, created = LoyaltyCard.objects.get_or_create(
-                    profile=bonus.profile,
-                    defaults={
-                        'cycle_start': date.today(),
-                        'cycle_end': date.today() + timedelta(days=60)
-                    }
-                )
-                card.current_balance += bonus.bonus_amount
-                card.save()
+def approve_bonuses_bulk(request):
+    """Tanlangan pending bonuslarni bitta foiz bilan tasdiqlash"""
+    if request.method == "POST":
+        bonus_ids = request.POST.getlist('bonus_ids')
+        percent = request.POST.get('percent')
 
-                messages.success(request, f"Bonus {bonus.percent}% bilan tasdiqlandi!")
+        if bonus_ids and percent and percent.isdigit():
+            approved = LoyaltyLedgerService.approve_bonuses(bonus_ids, percent)
+            KpiSnapshotService.adjust(pending_bonuses=-approved)
+            messages.success(request, f"{approved} ta bonus {percent}% bilan tasdiqlandi!")
+        else:
+            messages.error(request, "Bonuslar va foizni tanlang")
 
-    return redirect('loyalty_card/customers.html', profile_id=bonus.profile.id)
+    return redirect('all_pending_bonuses')
 
 
 def loyalty_user_detail_view(request, profile_id):
@@ -87,9 +126,10 @@ def loyalty_user_detail_view(request, profile_id):
     # 4. Referallar (Bu foydalanuvchi taklif qilgan odamlar)
     referrals = Referral.objects.filter(referrer=profile).order_by('-created_at')
 
-    # 5. Statistika hisoblash (Shablon uchun qo'shimcha)
-    total_spent_on_bonuses = sum(b.order_amount for b in pending_bonuses)
-    bonuses_count = pending_bonuses.count()
+    # 5. Statistika — bazada, bitta so'rovda
+    stats = pending_bonuses.aggregate(total=Sum('order_amount'), count=Count('id'))
+    total_spent_on_bonuses = stats['total'] or 0
+    bonuses_count = stats['count']
 
     context = {
         'profile': profile,
@@ -116,25 +156,28 @@ def edit_loyalty_card(request, profile_id):
         cycle_days = request.POST.get('cycle_days')
 
         if card:
-            # Mavjud kartani yangilash
-            card.current_balance = balance
+            # Mavjud kartani yangilash (balans farqi jurnalga 'adjustment' bo'lib yoziladi)
             card.cycle_start = cycle_start
             card.cycle_end = cycle_end
             card.cycle_number = cycle_number
             card.cycle_days = cycle_days
-            card.save()
+            card.save(update_fields=['cycle_start', 'cycle_end', 'cycle_number', 'cycle_days', 'updated_at'])
+            LoyaltyLedgerService.set_balance(
+                profile, balance, comment=f"Admin: {request.user.username}"
+            )
             messages.success(request, "Loyallik kartasi muvaffaqiyatli yangilandi!")
         else:
             # Agar karta hali yo'q bo'lsa, yangi yaratish (ixtiyoriy, lekin foydali)
-            from apps.merchant.models import LoyaltyCard
             LoyaltyCard.objects.create(
                 profile=profile,
-                current_balance=balance,
                 cycle_start=cycle_start,
                 cycle_end=cycle_end,
                 cycle_number=cycle_number,
                 cycle_days=cycle_days
             )
+            LoyaltyLedgerService.set_balance(
+                profile, balance, comment=f"Admin: {request.user.username}"
+            )
             messages.success(request, "Yangi loyallik kartasi yaratildi!")
 
         # MANA BU YERDA XATO EDI: 'loyalty_card/loyalty_edit.html' o'rniga name yozamiz
@@ -1,6 +1,7 @@
 from django.urls import reverse
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, JsonResponse
 from apps.merchant.models import Information, Service, Order, Bonus, LoyaltyPendingBonus
+from apps.merchant.sales import SalesFactService
 from apps.customer.models import Banner, Profile
 from apps.product.models import SoldProduct, Ticket, Good, Phone, ProductItem
 from decouple import config
@@ -12,6 +13,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, DetailView
 from django.views import View
 from .forms import ServiceEditForm, InformationEditForm
+from .kpi import KpiSnapshotService
+from .users import change_order_status
 from apps.dashboard.forms import BannerForm, NewsForm, NewsEditForm, BonusEditForm
 from apps.customer.models import News
 from datetime import date
@@ -58,70 +61,60 @@ from django.db.models import Count, Sum, F
 
 
 def dashboard(request):
-    today = date.today()
+    # Hisoblagichlar va grafik KPI snapshot'idan (apps.dashboard.kpi): 2-3 ta so'rov, keyin kesh
+    kpi = KpiSnapshotService.get()
 
-    # Umumiy buyurtmalar obyekti
-    all_orders = Order.objects.all()
-
-    # --- 1. TEZKOR HARAKATLAR (Admin tasdiqlashi kerak bo'lgan narsalar) ---
-    pending_orders_count = all_orders.filter(status="pending").count()  # Tovar borligini kutayotganlar
-    check_pending_count = all_orders.filter(
-        status="check_pending").count()  # To'lov cheki tekshirilishi kerak bo'lganlar
-    pending_bonuses = LoyaltyPendingBonus.objects.filter(status="pending").count()
-    # pending_b2b = B2BApplication.objects.filter(status="pending").count() # Agar model bo'lsa qo'shing
-
-    # --- 2. BUGUNGI STATISTIKA ---
-    order_today = all_orders.filter(created_at__date=today)
-    order_today_count = order_today.count()
-
-    # Bugungi daromad (faqat tasdiqlangan va yuborilganlar)
-    revenue_today = order_today.filter(status__in=["approved", "sent"]).aggregate(total=Sum("total_amount"))[
-                        "total"] or 0
-
-    # --- 3. UMUMIY STATISTIKA ---
-    customers_count = Profile.objects.count()
-    customers_today_count = Profile.objects.filter(created_at__date=today).count()
-    total_revenue = all_orders.filter(status__in=["approved", "sent"]).aggregate(total=Sum("total_amount"))[
-                        "total"] or 0
-
-    # --- 4. MAHSULOTLAR TAHLILI ---
     # Omborda kam qolganlar (Shoshilinch)
     low_stock_products = ProductItem.objects.filter(available_quantity__lt=10, active=True).order_by(
         'available_quantity')[:10]
 
-    # Eng ko'p sotilganlar
-    top_selling_products = SoldProduct.objects.values(
-        "product__goods__name_uz",
-        "product__phones__model_name_uz",
-        "product__tickets__event_name_uz"
-    ).annotate(total_qty=Sum("quantity")).order_by("-total_qty")[:10]
-
-    # Grafik uchun ma'lumotlar
-    chart_data = []
-    for p in top_selling_products:
-        title = p.get("product__goods__name_uz") or p.get("product__phones__model_name_uz") or p.get(
-            "product__tickets__event_name_uz") or "Nomsiz"
-        chart_data.append({"title": title, "total_quantity": p["total_qty"]})
-
     # So'nggi buyurtmalar
+    all_orders = Order.objects.all()
     recent_orders = all_orders.select_related("user").order_by("-created_at")[:15]
 
     return render(request, "base.html", {
-        "pending_orders": pending_orders_count,
-        "check_pending": check_pending_count,
-        "pending_bonuses": pending_bonuses,
-        "order_today_count": order_today_count,
-        "revenue_today": revenue_today,
-        "customers": customers_count,
-        "customers_today": customers_today_count,
-        "total_revenue": total_revenue,
+        "pending_orders": kpi["pending_orders"],
+        "check_pending": kpi["check_pending"],
+        "pending_bonuses": kpi["pending_bonuses"],
+        "order_today_count": kpi["order_today_count"],
+        "revenue_today": kpi["revenue_today"],
+        "customers": kpi["customers"],
+        "customers_today": kpi["customers_today"],
+        "total_revenue": kpi["total_revenue"],
         "recent": recent_orders,
-        "chart_data": chart_data,
+        "chart_data": kpi["chart_data"],
         "low_stock": low_stock_products,
         "comments": all_orders.exclude(comment="").order_by("-created_at")[:10],
     })
 
 
+# Grafik oraliqlari (kun): DailySalesFact'dan ko'pi bilan 365 qator o'qiladi
+SALES_SERIES_DAYS = (7, 30, 365)
+
+
+def sales_series(request):
+    try:
+        days = int(request.GET.get("days", 30))
+    except ValueError:
+        days = 0
+    if days not in SALES_SERIES_DAYS:
+        return JsonResponse({"error": f"days must be one of {SALES_SERIES_DAYS}"}, status=400)
+
+    rows = SalesFactService.series(days)
+    return JsonResponse({
+        "days": days,
+        "series": [
+            {
+                **row,
+                "day": row["day"].isoformat(),
+                "revenue": str(row["revenue"]),
+                "loyalty_spent": str(row["loyalty_spent"]),
+            }
+            for row in rows
+        ],
+    })
+
+
 def get_first_image_url(product_item):
     first_image = product_item.images.first()
     return first_image.image.url if first_image else None
@@ -324,11 +317,7 @@ class OrdersView(DetailView):
     def post(self, request, *args, **kwargs):
         order_id = self.kwargs["pk"]
         order = get_object_or_404(Order, id=order_id)
-        new_status = request.POST.get("status")
-
-        if new_status in dict(order.STATUS_CHOICES):
-            order.status = new_status
-            order.save()
+        change_order_status(request, [order.pk], request.POST.get("status"))
 
         return HttpResponseRedirect(
             reverse("orders-list", kwargs={"pk": order.user.id})
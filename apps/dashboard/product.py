@@ -1,9 +1,14 @@
+from django.contrib import messages
+from django.http import HttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
 from django.views.generic import ListView, CreateView
 from django.views import View
 from django.db.models import Q
 
+from django.core.paginator import Paginator
+
+from apps.product.bulk import EDITABLE_FIELDS, BulkEditError, ProductBulkEditService
 from apps.product.models import Phone, Ticket, Good, Category, ProductItem
 from .forms import (
     PhoneProductItemForm,
@@ -347,4 +352,66 @@ class GoodMainCategoryCreateView(CreateView):
 
     def form_valid(self, form):
         form.instance.main_type = "f"
-        return super().form_valid(form)
\ No newline at end of file
+        return super().form_valid(form)
+
+
+# ==========================================
+# BULK NARX / QOLDIQ TAHRIRI
+# ==========================================
+
+class ProductBulkEditView(View):
+    """
+    Jadval (sahifadagi mahsulotlar) yoki CSV fayl orqali narx, qoldiq va faollikni
+    bitta tranzaksiyada o'zgartirish (apps.product.bulk). ?export=csv — joriy filtr bo'yicha CSV.
+    """
+    template_name = "product/bulk_edit.html"
+    paginate_by = 50
+
+    def get_queryset(self):
+        query = self.request.GET.get("q", "")
+        category = self.request.GET.get("category", "")
+        products = ProductItem.objects.select_related("goods", "phones", "tickets").order_by("-pk")
+        if query:
+            products = products.filter(desc__icontains=query)
+        if category.isdigit():
+            products = products.filter(
+                Q(goods__category_id=category) | Q(phones__category_id=category) | Q(tickets__category_id=category)
+            )
+        return products
+
+    def get(self, request):
+        products = self.get_queryset()
+        if request.GET.get("export") == "csv":
+            response = HttpResponse(content_type="text/csv; charset=utf-8")
+            response["Content-Disposition"] = 'attachment; filename="products.csv"'
+            ProductBulkEditService.export_csv(products, response)
+            return response
+
+        params = request.GET.copy()
+        params.pop("page", None)
+        return render(request, self.template_name, {
+            "page_obj": Paginator(products, self.paginate_by).get_page(request.GET.get("page")),
+            "categories": Category.objects.order_by("name"),
+            "filter_query": params.urlencode(),
+        })
+
+    def post(self, request):
+        try:
+            if request.FILES.get("csv"):
+                rows = ProductBulkEditService.parse_csv(request.FILES["csv"])
+            else:
+                rows = [
+                    {"id": pk, **{field: request.POST.get(f"{field}-{pk}") for field in EDITABLE_FIELDS}}
+                    for pk in request.POST.getlist("ids")
+                ]
+            report = ProductBulkEditService.apply(rows)
+        except UnicodeDecodeError:
+            messages.error(request, "Fayl UTF-8 CSV emas")
+        except BulkEditError as exc:
+            messages.error(request, "; ".join(f"{key}: {message}" for key, message in exc.errors.items()))
+        else:
+            messages.success(
+                request,
+                f"{report['updated']} ta mahsulot yangilandi, {report['unchanged']} tasi o'zgarmadi",
+            )
+        return redirect(f"{request.path}?{request.GET.urlencode()}")
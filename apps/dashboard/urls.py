@@ -2,7 +2,7 @@ from collections import namedtuple
 
 from django.urls import path
 
-from .loyalty_card_managment import loyalty_customer_list, approve_bonus, \
+from .loyalty_card_managment import loyalty_customer_list, approve_bonus, approve_bonuses_bulk, \
     loyalty_user_detail_view, edit_loyalty_card, all_pending_bonuses, all_referrals
 from .product import (
     PhoneListView,
@@ -26,6 +26,7 @@ from .product import (
     CategoryDeleteView,
     ChildrenView,
     ChildActionView,
+    ProductBulkEditView,
 )
 
 from .users import (
@@ -34,10 +35,11 @@ from .users import (
     UserOrderDetailView,
     OrdersListView,
     BlockActivateUserView,
-    update_order_status, order_update_status,
+    update_order_status, order_update_status, orders_bulk_status, PickListView,
 )
 from .main import (
     dashboard,
+    sales_series,
     InformationView,
     BonusEditView,
     InformationEditView,
@@ -74,6 +76,7 @@ from .information import (
 
 urlpatterns = [
     path("", login_required(dashboard), name="dashboard"),
+    path("sales-series/", login_required(sales_series), name="sales-series"),
     path(
         "product/category/create/",
         login_required(CategoryCreateView.as_view()),
@@ -160,6 +163,7 @@ urlpatterns = [
         name="product-child-action",
     ),
     path("product/goods/", login_required(GoodListView.as_view()), name="good-list"),
+    path("product/bulk-edit/", login_required(ProductBulkEditView.as_view()), name="product-bulk-edit"),
     path(
         "product/good/edit-delete/<int:pk>/",
         login_required(GoodEditDeleteView.as_view()),
@@ -193,6 +197,8 @@ urlpatterns = [
         name="block_activate_user",
     ),
     path("orders/", login_required(OrdersListView.as_view()), name="all-orders-list"),
+    path("orders/bulk-status/", login_required(orders_bulk_status), name="orders-bulk-status"),
+    path("orders/pick-list/", login_required(PickListView.as_view()), name="orders-pick-list"),
     path("other/news/", login_required(NewsListView.as_view()), name="news-list"),
     path(
         "other/news-create/",
@@ -271,6 +277,7 @@ urlpatterns = [
     path('loyalty/customers/', loyalty_customer_list, name='loyalty_customer_list'),
     path('loyalty/customer/<int:profile_id>/', loyalty_user_detail_view, name='loyalty_customer_detail'),
     path('loyalty/approve-bonus/<int:bonus_id>/', approve_bonus, name='approve_bonus'),
+    path('loyalty/approve-bonuses/', approve_bonuses_bulk, name='approve_bonuses_bulk'),
     path('loyalty/edit-card/<int:profile_id>/', edit_loyalty_card, name='edit_loyalty_card'),
     path('loyalty/pending-bonuses/', all_pending_bonuses, name='all_pending_bonuses'),
     path('loyalty/referrals/', all_referrals, name='referral_list'),
@@ -1,5 +1,6 @@
 from apps.customer.models import Profile, Location
 from apps.merchant.models import Order, OrderItem, Service
+from apps.merchant.base import OrderItemPresenter
 from django.views.generic import ListView, DetailView
 from django.shortcuts import render, redirect, HttpResponse
 from django.shortcuts import get_object_or_404, redirect
@@ -9,6 +10,10 @@ from django.db.models import Subquery, OuterRef
 from django.urls import reverse
 from django.http import HttpResponseRedirect
 from django.db.models import Prefetch, Q, Count
+from datetime import date
+from apps.merchant.bulk_status import TARGET_STATUSES, OrderBulkStatusService
+from apps.merchant.picklist import DEFAULT_STATUS, PickListService
+from apps.merchant.sales import day_bounds
 
 
 class UserListView(ListView):
@@ -18,21 +23,22 @@ class UserListView(ListView):
     paginate_by = 10
 
     def get_queryset(self):
-        # Fetch the profiles along with their active locations
-        profiles = Profile.objects.select_related("origin").order_by("-pk")
-        return profiles
+        # Faol manzil va buyurtmalar soni sahifadagi 10 ta profil uchun: 3 ta so'rov (count, sahifa, manzillar)
+        return (
+            Profile.objects.search(self.request.GET.get("q"))
+            .select_related("origin")
+            .annotate(order_count=Count("order"))
+            .prefetch_related(
+                Prefetch("location", queryset=Location.objects.filter(active=True), to_attr="active_locations")
+            )
+            .order_by("-pk")
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-
-        # Fetch active locations for each profile
-        profiles = self.get_queryset()
-        active_locations = {}
-        for profile in profiles:
-            profile_locations = Location.objects.filter(user=profile, active=True)
-            active_locations[profile] = profile_locations
-
-        context["active_locations"] = active_locations
+        context["active_locations"] = {
+            profile: profile.active_locations for profile in context["object_list"]
+        }
         return context
 
 
@@ -64,25 +70,28 @@ class UserOrderDetailView(DetailView):
     model = Order
     template_name = "customer/users/user_order_detail.html"
 
+    def get_queryset(self):
+        # Itemlar, mahsulot turlari va rasmlar belgilangan sondagi so'rovda yuklanadi
+        return OrderItemPresenter.prefetch(Order.objects.select_related("user"))
+
     def get_context_data(self, **kwargs):
         context = super(UserOrderDetailView, self).get_context_data(**kwargs)
-        order = Order.objects.get(id=self.kwargs["pk"])
-        order_items = OrderItem.objects.filter(order__id=self.kwargs["pk"])
+        order = self.object
+        order_items = order.orderitem.all()
         user = order.user
-        cargo = Service.objects.all().first().delivery_fee
+        service = Service.objects.first()
+        cargo = service.delivery_fee if service else 0
+        presenter = OrderItemPresenter()
 
         order_items_data = []  # List to store data for each OrderItem
 
         for order_item in order_items:
+            if not order_item.product:
+                continue
             product_type, details = self.get_product_type(order_item.product)
-            first_image_url = self.get_first_image_url(order_item.product)
+            first_image_url = presenter.get_first_image_url(order_item.product)
             # Calculate total price for each OrderItem
-            if order_item.product.new_price:
-                total_price = order_item.quantity * order_item.product.new_price
-            elif order_item.product.old_price:
-                total_price = order_item.quantity * order_item.product.old_price
-            else:
-                total_price = 0
+            total_price = order_item.quantity * presenter.get_price(order_item.product)
 
             # Add data for each OrderItem to the list
             order_items_data.append(
@@ -105,77 +114,143 @@ class UserOrderDetailView(DetailView):
 
         return context
 
-    def get_first_image_url(self, product_item):
-        # Get the first image URL for the product
-        first_image = product_item.images.first()
-        return first_image.image.url if first_image else None
-
     def get_product_type(self, product_item):
-        if hasattr(product_item, "phones"):
+        type_name, target, _ = OrderItemPresenter.get_concrete(product_item)
+        if type_name == "Phone":
             return "Phone", {
-                "model_name": product_item.phones.model_name,
-                "ram": product_item.phones.get_ram_display(),
-                "storage": product_item.phones.get_storage_display(),
-                "color": product_item.phones.get_color_display(),
-                "condition": product_item.phones.get_condition_display(),
+                "model_name": target.model_name,
+                "ram": target.get_ram_display(),
+                "storage": target.get_storage_display(),
+                "color": target.get_color_display(),
+                "condition": target.get_condition_display(),
             }
-        elif hasattr(product_item, "tickets"):
-            x = "Ticket", {
-                "event_name": product_item.tickets.event_name,
-                "event_date": product_item.tickets.event_date,
-                "category": (
-                    product_item.tickets.category.name
-                    if product_item.tickets.category
-                    else "Bilet"
-                ),
-                "price": (
-                    product_item.new_price
-                    if product_item.new_price
-                    else product_item.old_price
-                ),
+        elif type_name == "Ticket":
+            return "Ticket", {
+                "event_name": target.event_name,
+                "event_date": target.event_date,
+                "category": target.category.name if target.category else "Bilet",
+                "price": OrderItemPresenter.get_price(product_item),
             }
-            return x
-        elif hasattr(product_item, "goods"):
+        elif type_name == "Good":
             return "Good", {
-                "name": product_item.goods.name,
-                "ingredients": product_item.goods.ingredients,
-                "expire_date": product_item.goods.expire_date,
-                "sub_cat": (
-                    product_item.goods.sub_cat.name
-                    if product_item.goods.sub_cat
-                    else None
-                ),
+                "name": target.name,
+                "ingredients": target.ingredients,
+                "expire_date": target.expire_date,
+                "category": target.category.name if target.category else None,
             }
         return None, None
 
 
+def order_filters(params):
+    filters = {"q": params.get("q", "").strip(), "status": params.get("status", "")}
+    for key in ("date_from", "date_to"):
+        try:
+            filters[key] = date.fromisoformat(params.get(key, ""))
+        except ValueError:
+            filters[key] = None
+    return filters
+
+
 class OrdersListView(ListView):
     template_name = "customer/orders/orders_list.html"
     context_object_name = "orders"
     paginate_by = 10
+
     def get_queryset(self):
-        query = self.request.GET.get('q', '')
-        # Retrieve goods with related product and sub_category, and filter by name if a search query is provided
-        order = (
-            Order.objects.select_related("user").order_by("-id")
+        # Qidiruv OrderQuerySet.search da; status/sana filtrlari (status, created_at) indeksi bo'yicha
+        filters = self.filters = order_filters(self.request.GET)
+        orders = Order.objects.search(filters["q"])
+        if filters["status"]:
+            orders = orders.filter(status=filters["status"])
+        if filters["date_from"]:
+            orders = orders.filter(created_at__gte=day_bounds(filters["date_from"], filters["date_from"])[0])
+        if filters["date_to"]:
+            orders = orders.filter(created_at__lt=day_bounds(filters["date_to"], filters["date_to"])[1])
+        return (
+            orders.select_related("user")
+            .prefetch_related(Prefetch("user__location", queryset=Location.objects.order_by("id"), to_attr="locations"))
+            .order_by("-created_at", "-id")
         )
-        if query:
-            order = order.filter(Q(user__full_name__icontains=query) | Q(id__icontains=query))
-        return order
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["filters"] = self.filters
+        context["status_choices"] = [choice for choice in Order.STATUS_CHOICES if choice[0] != "in_cart"]
+        context["bulk_statuses"] = TARGET_STATUSES.items()
+        # Sahifalash havolalarida filtrlar saqlanadi
+        params = self.request.GET.copy()
+        params.pop("page", None)
+        context["filter_query"] = params.urlencode()
+        return context
+
+
+class PickListView(View):
+    """
+    Ombor uchun yig'ma ro'yxat: belgilangan buyurtmalar (?ids=) yoki status/sana filtri
+    (standart — tasdiqlangan, yuborilishi kutilayotganlar). ?export=csv — CSV fayl.
+    """
+    template_name = "customer/orders/pick_list.html"
+
+    def get(self, request):
+        filters = order_filters(request.GET)
+        filters["status"] = filters["status"] or DEFAULT_STATUS
+        ids = [pk for pk in request.GET.getlist("ids") if pk.isdigit()]
+        orders = PickListService.orders(
+            ids=ids,
+            status=filters["status"],
+            start=day_bounds(filters["date_from"], filters["date_from"])[0] if filters["date_from"] else None,
+            end=day_bounds(filters["date_to"], filters["date_to"])[1] if filters["date_to"] else None,
+        )
+        pick_list = PickListService.build(orders)
+
+        if request.GET.get("export") == "csv":
+            response = HttpResponse(content_type="text/csv; charset=utf-8")
+            response["Content-Disposition"] = 'attachment; filename="pick-list.csv"'
+            PickListService.export_csv(pick_list, response)
+            return response
+
+        return render(request, self.template_name, {
+            "pick_list": pick_list,
+            "filters": filters,
+            "ids": ids,
+            "order_count": len({number for row in pick_list for number, _ in row["breakdown"]}),
+            "status_choices": [choice for choice in Order.STATUS_CHOICES if choice[0] != "in_cart"],
+            "filter_query": request.GET.urlencode(),
+        })
+
+
+def change_order_status(request, order_ids, new_status):
+    """
+    Bitta yoki bir nechta buyurtma: o'tish oqibatlari OrderBulkStatusService da to'plam bo'yicha.
+    Status yoki id noto'g'ri bo'lsa xabar ko'rsatiladi va None qaytadi.
+    """
+    try:
+        return OrderBulkStatusService.apply(order_ids, new_status)
+    except ValueError as exc:
+        messages.error(request, f"Buyurtmalar yoki status noto'g'ri tanlangan: {exc}")
+        return None
 
 
 def update_order_status(request, pk):
     order = get_object_or_404(Order, id=pk)
 
     if request.method == "POST":
-        new_status = request.POST.get("status")
-        if new_status in dict(order.STATUS_CHOICES):
-            order.status = new_status
-            order.save()
+        change_order_status(request, [order.pk], request.POST.get("status"))
 
     return HttpResponseRedirect(reverse("all-orders-list"))
 
 
+def orders_bulk_status(request):
+    """Buyurtmalar ro'yxatida belgilanganlarning statusini bitta so'rovda o'zgartiradi"""
+    if request.method == "POST":
+        report = change_order_status(request, request.POST.getlist("ids"), request.POST.get("status"))
+        if report is not None:
+            messages.success(
+                request, f"{report['updated']} ta buyurtma yangilandi, {report['skipped']} tasi o'zgarmadi"
+            )
+    return redirect(request.META.get("HTTP_REFERER") or reverse("all-orders-list"))
+
+
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from .forms import LoginForm
@@ -214,10 +289,7 @@ def user_logout(request):
 def order_update_status(request, pk):
     if request.method == "POST":
         order = get_object_or_404(Order, id=pk)
-        new_status = request.POST.get('status')
-        if new_status:
-            order.status = new_status
-            order.save()
+        change_order_status(request, [order.pk], request.POST.get('status'))
 
     # Qayerga qaytishni ko'rsatish (buyurtmalar ro'yxati sahifasiga)
     return redirect(request.META.get('HTTP_REFERER', 'user-orders-list'))
\ No newline at end of file
@@ -1,4 +1,6 @@
 from django.contrib import admin
+from apps.customer.admin_utils import LargeTableAdmin
+from apps.customer.models import Profile
 from .models import *
 
 
@@ -29,31 +31,62 @@ class BonusaAdmin(admin.ModelAdmin):
     list_display = ["amount", "percentage", "title", "created", "modified", 'active']
 admin.site.register(Bonus, BonusaAdmin)
 
-admin.site.register(OrderItem)
+class OrderItemAdmin(LargeTableAdmin):
+    list_display = ("order", "product", "quantity")
+    list_select_related = ("order", "product")
+    raw_id_fields = ("order",)
+    autocomplete_fields = ("product",)
+
+admin.site.register(OrderItem, OrderItemAdmin)
 
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 1  # Agar siz yangi Order yaratayotganda bitta bo'sh OrderItem qo'shmoqchi bo'lsangiz
+    # Har bir qatorda butun mahsulotlar ro'yxati <select> ga yuklanmaydi
+    autocomplete_fields = ("product",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("product")
 
 
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeTableAdmin):
     inlines = [OrderItemInline]
-    list_display = ("user", "status", "total_amount", "loyalty_payment", "created_at")
-    search_fields = ("user__full_name", "status")
+    list_display = ("order_number", "user", "status", "total_amount", "loyalty_payment", "created_at")
+    list_select_related = ("user__origin",)
+    # Qidiruv OrderQuerySet.search orqali: ORD raqami, id, telefon yoki ism (indekslar bo'yicha)
+    search_fields = ("order_number",)
     list_filter = ("status",)
+    autocomplete_fields = ("user",)
+    raw_id_fields = ("location",)
+
+    def get_search_results(self, request, queryset, search_term):
+        return queryset.search(search_term), False
 
 admin.site.register(Order, OrderAdmin)
 
 
+def search_by_profile(queryset, search_term, field="profile"):
+    """Profil bo'yicha qidiruv: avval Profile indekslari bo'yicha, keyin FK IN (subquery)"""
+    if not search_term.strip():
+        return queryset
+    return queryset.filter(**{f"{field}__in": Profile.objects.search(search_term).values("id")})
+
+
 @admin.register(LoyaltyCard)
-class LoyaltyCardModelAdmin(admin.ModelAdmin):
+class LoyaltyCardModelAdmin(LargeTableAdmin):
     list_display = ['profile','current_balance','cycle_start','cycle_end','cycle_days','cycle_number','created_at','updated_at']
+    list_select_related = ['profile__origin']
+    search_fields = ['profile__phone_number']
+    autocomplete_fields = ['profile']
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_by_profile(queryset, search_term), False
 
 
 
 @admin.register(LoyaltyPendingBonus)
-class LoyaltyPendingBonusAdmin(admin.ModelAdmin):
+class LoyaltyPendingBonusAdmin(LargeTableAdmin):
     list_display = [
         "order_name",
         "profile",
@@ -63,6 +96,8 @@ class LoyaltyPendingBonusAdmin(admin.ModelAdmin):
         "status",
         "created_at",
     ]
+    list_select_related = ["profile__origin"]
+    list_filter = ["status"]
 
     list_editable = ["percent", "status"]
 
@@ -76,9 +111,11 @@ class LoyaltyPendingBonusAdmin(admin.ModelAdmin):
 
 
 @admin.register(Referral)
-class ReferralAdmin(admin.ModelAdmin):
+class ReferralAdmin(LargeTableAdmin):
     list_display = ('referrer', 'referee', 'status', 'created_at')
     list_filter = ('status',)
+    list_select_related = ('referrer__origin', 'referee__origin')
+    autocomplete_fields = ('referrer', 'referee')
     actions = ['approve_referral_bonus']
 
     def approve_referral_bonus(self, request, queryset):
@@ -89,7 +126,39 @@ class ReferralAdmin(admin.ModelAdmin):
 
 
 
-# WalletTransaction admin removed - model no longer exists
+@admin.register(LoyaltyLedger)
+class LoyaltyLedgerAdmin(LargeTableAdmin):
+    # Jurnal append-only: admin faqat ko'radi
+    list_display = ("profile", "entry_type", "amount", "balance_after", "order", "comment", "created_at")
+    list_filter = ("entry_type",)
+    list_select_related = ("profile__origin", "order")
+    search_fields = ("profile__phone_number",)
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_by_profile(queryset, search_term), False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailySalesFact)
+class DailySalesFactAdmin(admin.ModelAdmin):
+    # Qatorlar signal va rebuild_sales_facts orqali yoziladi
+    list_display = ("day", "orders", "orders_approved", "orders_sent", "orders_cancelled",
+                    "revenue", "units_sold", "loyalty_spent", "new_customers")
+    date_hierarchy = "day"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 admin.site.register(BankCardModel)
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+Buyurtma elementlari (OrderItem) uchun umumiy logika.
+Mobil API serializerlari va dashboard buyurtma mahsulotlarini shu yerdagi
+yagona presenter orqali ko'rsatadi.
+"""
+
+from django.db.models import Prefetch
+
+from apps.product.models import Image
+from .models import OrderItem
+
+
+LANGUAGES = ("uz", "ru", "en", "ko")
+
+UNKNOWN_NAMES = {"uz": "Noma'lum", "ru": "Неизвестно", "en": "Unknown", "ko": "알 수 없음"}
+
+# ProductItem'ning aniq turi: (related_name, nom maydoni, turi)
+CONCRETE_TYPES = (
+    ("phones", "model_name", "Phone"),
+    ("goods", "name", "Good"),
+    ("tickets", "event_name", "Ticket"),
+)
+
+
+class OrderItemPresenter:
+    """
+    Buyurtmalar sahifasi uchun itemlarni, mahsulotlarni, ularning aniq turini
+    (Phone/Good/Ticket) va rasmlarini belgilangan sondagi so'rovlarda yuklaydi.
+
+    hasattr(p, 'phones') kabi tekshiruvlar select_related keshidan o'qiladi,
+    shuning uchun har bir item uchun qo'shimcha so'rov ketmaydi.
+    """
+
+    def __init__(self, request=None):
+        self.request = request
+        self._origin = None
+        if request is not None:
+            # Absolyut URL uchun host qismini bir marta hisoblaymiz
+            self._origin = request.build_absolute_uri("/").rstrip("/")
+
+    # ---------------- QUERYSETS ----------------
+    @staticmethod
+    def item_queryset():
+        """Itemlar + mahsulot + aniq turi + kategoriyasi bitta JOIN bilan, rasmlar bitta so'rov bilan"""
+        return OrderItem.objects.select_related(
+            "product",
+            "product__phones__category",
+            "product__goods__category",
+            "product__tickets__category",
+        ).prefetch_related(
+            Prefetch("product__images", queryset=Image.objects.order_by("pk"))
+        ).order_by("pk")
+
+    @classmethod
+    def prefetch(cls, queryset):
+        """Order querysetiga itemlarni oldindan yuklashni qo'shadi"""
+        return queryset.prefetch_related(
+            Prefetch("orderitem", queryset=cls.item_queryset())
+        )
+
+    # ---------------- HELPERS ----------------
+    @staticmethod
+    def get_concrete(product):
+        """(turi, obyekt, nom maydoni) qaytaradi yoki (None, None, None)"""
+        for related_name, name_field, type_name in CONCRETE_TYPES:
+            if hasattr(product, related_name):
+                return type_name, getattr(product, related_name), name_field
+        return None, None, None
+
+    def get_names(self, product):
+        _, target, name_field = self.get_concrete(product)
+        if target is None:
+            return dict(UNKNOWN_NAMES)
+        default = getattr(target, name_field)
+        return {
+            lang: getattr(target, f"{name_field}_{lang}", default)
+            for lang in LANGUAGES
+        }
+
+    @staticmethod
+    def get_descriptions(product):
+        return {lang: getattr(product, f"desc_{lang}", product.desc) for lang in LANGUAGES}
+
+    def absolute_url(self, url):
+        if self._origin and url.startswith("/"):
+            return self._origin + url
+        return url
+
+    def get_image_urls(self, product):
+        return [self.absolute_url(img.image.url) for img in product.images.all() if img.image]
+
+    def get_first_image_url(self, product):
+        for img in product.images.all():
+            if img.image:
+                return self.absolute_url(img.image.url)
+        return None
+
+    @staticmethod
+    def get_price(product):
+        return product.new_price or product.old_price or 0
+
+    # ---------------- PRESENT ----------------
+    def present_item(self, item):
+        """Bitta OrderItem uchun umumiy ma'lumot (mahsulot o'chib ketgan bo'lsa None)"""
+        p = item.product
+        if not p:
+            return None
+        price = self.get_price(p)
+        return {
+            "product_id": p.id,
+            "names": self.get_names(p),
+            "quantity": item.quantity,
+            "price": float(price),
+            "total_price": float(price * item.quantity),
+            "measure": p.get_measure_display(),
+            "images": self.get_image_urls(p),
+            "descriptions": self.get_descriptions(p),
+        }
+
+    def present_order(self, order):
+        rows = (self.present_item(item) for item in order.orderitem.all())
+        return [row for row in rows if row is not None]
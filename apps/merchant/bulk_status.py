@@ -0,0 +1,221 @@
+"""
+Buyurtmalar statusini ommaviy o'zgartirish (dashboard).
+
+Har bir buyurtma uchun Order.save() o'rniga:
+    - tanlangan buyurtmalar select_for_update bilan qulflanadi, eski statuslar eslab qolinadi;
+    - status bitta shartli UPDATE bilan o'zgaradi (status allaqachon shu bo'lganlar va savatdagilar
+      tegilmaydi); total_amount qayta hisoblanmaydi;
+    - o'tish oqibatlari to'plam bo'yicha bajariladi:
+        * kunlik statistika — kun bo'yicha yig'ilgan farq (SalesFactService.record_transitions);
+        * LoyaltyPendingBonus — bonusi yo'q buyurtmalar uchun bitta bulk_create;
+        * "sent" ga o'tganda qoldiq bitta UPDATE bilan kamayadi va SoldProduct yoziladi — buyurtma
+          uchun bir marta (Order.shipped_at belgisi); "sent" dan chiqqanda qoldiq (aynan chiqarilgan
+          OrderItem.shipped_quantity) va SoldProduct qaytariladi;
+        * SSE hodisalari bitta NOTIFY so'rovida, KPI snapshot'i bitta adjust() bilan (commit'dan keyin).
+order_status_changed signali bu yo'lda yuborilmaydi — uning qabul qiluvchilari shu yerda
+to'plam bo'yicha bajariladi.
+"""
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from apps.dashboard.kpi import KpiSnapshotService
+from apps.product import cache as catalog_cache
+from apps.product.models import ProductItem, SoldProduct
+from apps.product.signals import invalidate_namespaces
+from . import events
+from .models import LoyaltyPendingBonus, Order, OrderItem
+from .sales import SalesFactService
+
+
+# Dashboarddan qo'yiladigan statuslar (STATUS_CHOICES dagi "Sent" kod bo'yicha "sent")
+TARGET_STATUSES = {value.lower(): label for value, label in Order.STATUS_CHOICES if value != "in_cart"}
+
+# Shu statuslarga o'tganda bonus yaratiladi (create_pending_bonus signali va Order.save bilan bir xil)
+BONUS_STATUSES = ("approved", "check_pending", "sent")
+
+MAX_ORDERS = 1000
+BATCH_SIZE = 500
+
+
+def item_price(new_price, old_price):
+    return new_price if new_price and new_price > 0 else (old_price or 0)
+
+
+class OrderBulkStatusService:
+
+    @staticmethod
+    def create_bonuses(orders):
+        """Bonusi hali yo'q buyurtmalar uchun bitta bulk_create; yaratilganlar sonini qaytaradi"""
+        candidates = [order for order in orders if order.status in BONUS_STATUSES and order.total_amount > 0]
+        if not candidates:
+            return 0
+        existing = set(
+            LoyaltyPendingBonus.objects.filter(order__in=candidates).values_list("order_id", flat=True)
+        )
+        bonuses = [
+            LoyaltyPendingBonus(
+                profile_id=order.user_id,
+                order=order,
+                order_name=f"Заказ #{order.pk}",
+                order_amount=order.total_amount,
+                status="pending",
+            )
+            for order in candidates if order.pk not in existing
+        ]
+        LoyaltyPendingBonus.objects.bulk_create(bonuses, batch_size=BATCH_SIZE)
+        return len(bonuses)
+
+    @staticmethod
+    def move_stock(orders, now, sign):
+        """
+        Buyurtmalar mahsulotlarini ombordan chiqaradi (sign=-1) yoki qaytaradi (sign=1), qoldiq bitta UPDATE bilan.
+        Chiqarishda har bir qatordan qoldiq yetganicha olinadi va OrderItem.shipped_quantity ga yoziladi;
+        qaytarishda aynan shu miqdor qaytadi (qoldiq haqiqiy ombordan oshib ketmaydi).
+        SoldProduct (mahsulot, mijoz) bo'yicha to'liq miqdorda yig'iladi; qaytarishda summa joriy narx bo'yicha
+        ayiriladi. Qoldig'i o'zgargan mahsulotlar sonini qaytaradi.
+        """
+        items = list(
+            OrderItem.objects.filter(order__in=orders, product__isnull=False)
+            .annotate(
+                user_id=F("order__user_id"), new_price=F("product__new_price"), old_price=F("product__old_price")
+            )
+            .only("id", "product_id", "quantity", "shipped_quantity")
+            .order_by("order_id", "id")
+        )
+        if not items:
+            return 0
+        if sign < 0:
+            stock = dict(
+                ProductItem.objects.select_for_update()
+                .filter(id__in={item.product_id for item in items})
+                .order_by("id")
+                .values_list("id", "available_quantity")
+            )
+        quantities, sold = {}, {}
+        for item in items:
+            if sign < 0:
+                item.shipped_quantity = min(max(item.quantity, 0), stock[item.product_id])
+                stock[item.product_id] -= item.shipped_quantity
+                moved = item.shipped_quantity
+            else:
+                moved, item.shipped_quantity = item.shipped_quantity, 0
+            if moved:
+                quantities[item.product_id] = quantities.get(item.product_id, 0) + moved
+            totals = sold.setdefault((item.product_id, item.user_id), [0, 0])
+            totals[0] += item.quantity
+            totals[1] += item_price(item.new_price, item.old_price) * item.quantity
+        OrderItem.objects.bulk_update(items, ["shipped_quantity"], batch_size=BATCH_SIZE)
+
+        if quantities:
+            ProductItem.objects.filter(id__in=quantities).update(
+                available_quantity=F("available_quantity") + Case(
+                    *[When(id=product_id, then=Value(sign * quantity)) for product_id, quantity in quantities.items()],
+                    output_field=IntegerField(),
+                ),
+                # update() AutoLastModifiedField'ni o'zi yangilamaydi (delta sync shunga tayanadi)
+                modified=now,
+            )
+
+        existing = {}
+        for row in SoldProduct.objects.filter(
+            product__in={product_id for product_id, _ in sold}, user__in={user_id for _, user_id in sold}
+        ).order_by("id"):
+            existing.setdefault((row.product_id, row.user_id), row)
+        created, updated = [], []
+        for (product_id, user_id), (quantity, amount) in sold.items():
+            row = existing.get((product_id, user_id))
+            if row is None:
+                if sign < 0:
+                    created.append(SoldProduct(product_id=product_id, user_id=user_id, quantity=quantity, amount=amount))
+                continue
+            row.quantity = max(row.quantity - sign * quantity, 0)
+            row.amount = max(row.amount - sign * amount, 0)
+            row.modified = now
+            updated.append(row)
+        SoldProduct.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        SoldProduct.objects.bulk_update(updated, ["quantity", "amount", "modified"], batch_size=BATCH_SIZE)
+
+        invalidate_namespaces(catalog_cache.PRODUCT)
+        return len(quantities)
+
+    @classmethod
+    def record_shipment(cls, orders, now):
+        """"sent" ga o'tganlardan hali jo'natilmaganlari (shipped_at bo'sh) — ombordan bir marta chiqariladi"""
+        orders = [order for order in orders if order.shipped_at is None]
+        if not orders:
+            return 0
+        Order.objects.filter(id__in=[order.pk for order in orders]).update(shipped_at=now)
+        for order in orders:
+            order.shipped_at = now
+        return cls.move_stock(orders, now, sign=-1)
+
+    @classmethod
+    def cancel_shipment(cls, orders, now):
+        """"sent" dan boshqa statusga qaytganlar — qoldiq va SoldProduct qaytariladi, belgi olib tashlanadi"""
+        orders = [order for order in orders if order.shipped_at is not None]
+        if not orders:
+            return 0
+        Order.objects.filter(id__in=[order.pk for order in orders]).update(shipped_at=None)
+        for order in orders:
+            order.shipped_at = None
+        return cls.move_stock(orders, now, sign=1)
+
+    @classmethod
+    def apply(cls, order_ids, new_status):
+        """
+        Buyurtmalarni new_status ga o'tkazadi.
+        Hisobot: {"updated", "skipped", "bonuses", "products"}.
+        """
+        new_status = (new_status or "").lower()
+        if new_status not in TARGET_STATUSES:
+            raise ValueError(f"Noto'g'ri status: {new_status}")
+        order_ids = {int(pk) for pk in order_ids}
+        if len(order_ids) > MAX_ORDERS:
+            raise ValueError(f"Bir martada ko'pi bilan {MAX_ORDERS} ta buyurtma")
+        report = {"updated": 0, "skipped": len(order_ids), "bonuses": 0, "products": 0}
+        if not order_ids:
+            return report
+
+        with transaction.atomic():
+            # Eski "Sent" yozuvlari ham "sent" hisoblanadi
+            same_status = [value for value, _ in Order.STATUS_CHOICES if value.lower() == new_status]
+            orders = list(
+                Order.objects.select_for_update()
+                .filter(id__in=order_ids)
+                .exclude(status__in=[new_status, *same_status, "in_cart"])
+                .only("id", "user_id", "status", "total_amount", "loyalty_payment", "created_at", "shipped_at")
+                .order_by("id")
+            )
+            if not orders:
+                return report
+
+            old_statuses = {order.pk: order.status for order in orders}
+            Order.objects.filter(id__in=old_statuses).update(status=new_status)
+            for order in orders:
+                order.status = new_status
+
+            SalesFactService.record_transitions(orders, old_statuses)
+            report["bonuses"] = cls.create_bonuses(orders)
+            if new_status == "sent":
+                report["products"] = cls.record_shipment(orders, timezone.now())
+            else:
+                report["products"] = cls.cancel_shipment(orders, timezone.now())
+
+            events.publish_many([(order, old_statuses[order.pk]) for order in orders])
+            transitions = [
+                (old_statuses[order.pk], new_status, order.total_amount, order.created_at) for order in orders
+            ]
+            bonuses = report["bonuses"]
+
+            def update_kpi():
+                KpiSnapshotService.order_transitions(transitions)
+                if bonuses:
+                    KpiSnapshotService.adjust(pending_bonuses=bonuses)
+
+            transaction.on_commit(update_kpi)
+
+        report["updated"] = len(orders)
+        report["skipped"] = len(order_ids) - len(orders)
+        return report
@@ -0,0 +1,101 @@
+"""
+Savatni bitta so'rovda ko'p mahsulot bo'yicha yangilash.
+"""
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, When
+from django.db.models.functions import Coalesce
+
+from apps.product.models import ProductItem
+from .models import Order, OrderItem
+
+
+class CartBatchError(Exception):
+    """Operatsiyalardan biri tekshiruvdan o'tmadi; savat o'zgarmaydi"""
+
+    def __init__(self, errors):
+        super().__init__("Savatni yangilab bo'lmadi")
+        self.errors = errors
+
+
+class CartService:
+    """Savatdagi mahsulotlarni to'plam (batch) ko'rinishida o'zgartirish"""
+
+    @staticmethod
+    def validate(operations, is_wholesale=False):
+        """
+        Barcha mahsulotlarni bitta so'rov bilan o'qib, mavjudligi, zaxirasi va
+        (B2B mijoz uchun) min_wholesale_quantity ni tekshiradi.
+        """
+        ids = [op["product_id"] for op in operations if op["quantity"] > 0]
+        products = {
+            row["id"]: row
+            for row in ProductItem.objects.filter(pk__in=ids).values(
+                "id", "active", "available_quantity", "min_wholesale_quantity"
+            )
+        }
+
+        errors = {}
+        for op in operations:
+            product_id, quantity = op["product_id"], op["quantity"]
+            if quantity == 0:
+                continue
+            product = products.get(product_id)
+            if product is None or not product["active"]:
+                errors[product_id] = "Mahsulot topilmadi"
+            elif quantity > product["available_quantity"]:
+                errors[product_id] = f"Omborda faqat {product['available_quantity']} ta mavjud"
+            elif is_wholesale and quantity < product["min_wholesale_quantity"]:
+                errors[product_id] = f"Minimal optom miqdori: {product['min_wholesale_quantity']}"
+        return errors
+
+    @staticmethod
+    def cart_total_expression():
+        price = Case(
+            When(product__new_price__gt=0, then=F("product__new_price")),
+            default=F("product__old_price"),
+        )
+        return Coalesce(
+            Sum(F("quantity") * price),
+            0,
+            output_field=DecimalField(max_digits=20, decimal_places=0),
+        )
+
+    @classmethod
+    @transaction.atomic
+    def apply_batch(cls, profile, operations, is_wholesale=False):
+        """
+        operations: [{"product_id": int, "quantity": int}, ...], quantity=0 - o'chirish.
+        Miqdorlar bitta INSERT ... ON CONFLICT (order, product) DO UPDATE bilan yoziladi,
+        summa bitta aggregate UPDATE bilan hisoblanadi (Order.save chaqirilmaydi).
+        """
+        errors = cls.validate(operations, is_wholesale)
+        if errors:
+            raise CartBatchError(errors)
+
+        # Bir vaqtda kelgan batch so'rovlar savatni navbat bilan o'zgartiradi
+        order, _ = Order.objects.select_for_update().get_or_create(user=profile, status="in_cart")
+
+        upserts = [
+            OrderItem(order=order, product_id=op["product_id"], quantity=op["quantity"])
+            for op in operations
+            if op["quantity"] > 0
+        ]
+        removed = [op["product_id"] for op in operations if op["quantity"] == 0]
+
+        if upserts:
+            OrderItem.objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=["order", "product"],
+                update_fields=["quantity", "modified"],
+            )
+        if removed:
+            OrderItem.objects.filter(order=order, product_id__in=removed).delete()
+
+        total = OrderItem.objects.filter(order=order).aggregate(
+            total=cls.cart_total_expression()
+        )["total"]
+        Order.objects.filter(pk=order.pk).update(total_amount=total)
+        order.total_amount = total
+        return order
@@ -0,0 +1,152 @@
+"""
+Buyurtma hodisalari (SSE uchun) — PostgreSQL LISTEN/NOTIFY orqali.
+
+Order.save() status o'zgarganda publish() chaqiradi: NOTIFY tranzaksiya commit bo'lganda
+yetkaziladi. Har bir ASGI jarayonida bitta tinglovchi oqim (birinchi SSE ulanishida
+ishga tushadi) kelgan hodisani shu jarayondagi obunachilarning asyncio navbatlariga
+tarqatadi — hech bir worker bazani so'rab aylanib turmaydi.
+
+Hodisalar:
+    order.status  — buyurtma egasiga (status o'zgarishi)
+    order.created — xodimlarga (savatdan chiqib, rasmiylashtirilgan yangi buyurtma)
+"""
+
+import asyncio
+import json
+import os
+import threading
+
+from django.db import connection
+from django.utils import timezone
+
+from apps.product.cache_bus import InvalidationListener
+
+
+CHANNEL = "order_events"
+
+ORDER_STATUS = "order.status"
+ORDER_CREATED = "order.created"
+
+STAFF = "staff"
+
+# Sekin mijoz xotirani to'ldirmasligi uchun: navbat to'lsa eski hodisalar tashlanadi
+QUEUE_SIZE = 100
+
+
+def profile_key(profile_id):
+    return f"profile:{profile_id}"
+
+
+def messages_for(order, old_status):
+    event = {
+        "order_id": order.pk,
+        "profile_id": order.user_id,
+        "status": order.status,
+        "old_status": old_status,
+        "total_amount": str(order.total_amount),
+        "at": timezone.now().isoformat(),
+    }
+    messages = [{**event, "type": ORDER_STATUS}]
+    if old_status in (None, "in_cart") and order.status != "in_cart":
+        messages.append({**event, "type": ORDER_CREATED})
+    return messages
+
+
+def publish(order, old_status):
+    """Status o'zgarishini kanalga yuboradi (commit'da yetkaziladi)"""
+    publish_many([(order, old_status)])
+
+
+def publish_many(transitions):
+    """[(order, old_status)] — hamma xabarlar bitta so'rovda NOTIFY qilinadi"""
+    payloads = [
+        json.dumps(message)
+        for order, old_status in transitions
+        for message in messages_for(order, old_status)
+    ]
+    if not payloads:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload", [CHANNEL, payloads])
+
+
+class Subscription:
+    def __init__(self, keys):
+        self.keys = tuple(keys)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def put(self, event):
+        # Faqat event loop oqimida chaqiriladi (call_soon_threadsafe orqali)
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class OrderEventHub:
+    """Jarayon ichidagi obunachilar ro'yxati: kalit -> Subscription'lar"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, keys):
+        subscription = Subscription(keys)
+        with self._lock:
+            for key in subscription.keys:
+                self._subscribers.setdefault(key, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for key in subscription.keys:
+                bucket = self._subscribers.get(key)
+                if bucket is not None:
+                    bucket.discard(subscription)
+                    if not bucket:
+                        del self._subscribers[key]
+
+    def targets(self, event):
+        if event["type"] == ORDER_CREATED:
+            return (STAFF,)
+        return (profile_key(event["profile_id"]),)
+
+    def dispatch(self, event):
+        with self._lock:
+            subscriptions = {
+                subscription
+                for key in self.targets(event)
+                for subscription in self._subscribers.get(key, ())
+            }
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.put, event)
+
+
+hub = OrderEventHub()
+
+
+class OrderEventListener(InvalidationListener):
+    channel = CHANNEL
+
+    def on_connect(self):
+        pass
+
+    def handle(self, payload):
+        hub.dispatch(json.loads(payload))
+
+
+_listener = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def start_listener():
+    """Har bir jarayonda bitta tinglovchi (birinchi obunada ishga tushadi)"""
+    global _listener, _listener_pid
+    with _listener_lock:
+        if _listener is not None and _listener_pid == os.getpid() and _listener.is_alive():
+            return _listener
+        _listener = OrderEventListener()
+        _listener_pid = os.getpid()
+        _listener.start()
+        return _listener
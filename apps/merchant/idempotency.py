@@ -0,0 +1,123 @@
+"""
+Idempotency-Key header qo'llab-quvvatlash.
+Mobil ilova tarmoq uzilganda so'rovni qayta yuboradi; bir xil kalit bilan kelgan
+takroriy so'rov view'ni qayta ishga tushirmaydi, saqlangan javob qaytariladi.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+# Saqlangan javob qancha vaqt qaytariladi
+IDEMPOTENCY_KEY_TTL = getattr(settings, "IDEMPOTENCY_KEY_TTL", timedelta(hours=24))
+
+
+class IdempotencyService:
+    """
+    Bir xil (user, key) uchun parallel so'rovlar PostgreSQL advisory lock'da navbat kutadi:
+    birinchi so'rov tugagach, qolganlari uning saqlangan javobini oladi.
+    Lock tranzaksiyaga bog'lanmagan, shuning uchun view ichidagi atomic bloklarga xalaqit bermaydi.
+    """
+
+    @staticmethod
+    def fingerprint(request):
+        """Metod + yo'l + so'rov ma'lumotlari (fayllar nomi va hajmi bilan) bo'yicha sha256"""
+        data = request.data
+        if hasattr(data, "lists"):
+            payload = {key: values for key, values in data.lists()}
+        else:
+            payload = data
+        files = sorted((name, f.name, f.size) for name, f in request.FILES.items())
+        raw = json.dumps(
+            [request.method, request.path, payload, files],
+            sort_keys=True,
+            cls=JSONEncoder,
+            default=str,
+        )
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @staticmethod
+    def lock_id(user_id, key):
+        digest = hashlib.sha256(f"idempotency:{user_id}:{key}".encode()).digest()
+        return int.from_bytes(digest[:8], "big", signed=True)
+
+    @staticmethod
+    def find(user_id, key):
+        return IdempotencyKey.objects.filter(
+            user_id=user_id, key=key, expires_at__gt=timezone.now()
+        ).first()
+
+    @staticmethod
+    def store(user_id, key, fingerprint, response):
+        body = json.loads(json.dumps(response.data, cls=JSONEncoder))
+        IdempotencyKey.objects.update_or_create(
+            user_id=user_id,
+            key=key,
+            defaults={
+                "fingerprint": fingerprint,
+                "status_code": response.status_code,
+                "response_body": body,
+                "expires_at": timezone.now() + IDEMPOTENCY_KEY_TTL,
+            },
+        )
+
+    @staticmethod
+    def replay(record):
+        response = Response(record.response_body, status=record.status_code)
+        response["Idempotent-Replayed"] = "true"
+        return response
+
+
+def idempotent(view_method):
+    """
+    APIView metodi uchun dekorator (post/create).
+    Header bo'lmasa yoki user anonim bo'lsa, view odatdagidek ishlaydi.
+    5xx javoblar saqlanmaydi — bunday so'rovni qayta yuborish mumkin.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or not request.user.is_authenticated:
+            return view_method(self, request, *args, **kwargs)
+
+        if len(key) > 255:
+            return Response({"error": "Idempotency-Key juda uzun"}, status=400)
+
+        user_id = request.user.pk
+        fingerprint = IdempotencyService.fingerprint(request)
+        lock_id = IdempotencyService.lock_id(user_id, key)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", [lock_id])
+        try:
+            record = IdempotencyService.find(user_id, key)
+            if record is not None:
+                if record.fingerprint != fingerprint:
+                    return Response(
+                        {"error": "Bu Idempotency-Key boshqa so'rov uchun ishlatilgan"},
+                        status=422,
+                    )
+                return IdempotencyService.replay(record)
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code < 500:
+                IdempotencyService.store(user_id, key, fingerprint, response)
+            return response
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [lock_id])
+
+    return wrapper
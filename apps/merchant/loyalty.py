@@ -0,0 +1,243 @@
+"""
+Loyalty karta balansini o'zgartiradigan yagona joy.
+Balansni o'zgartiradigan har bir yo'l (Order.save, chek yuklash, bonus tasdiqlash,
+referal, admin tahriri) shu servis orqali o'tadi va LoyaltyLedger'ga yozuv qoldiradi.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import LoyaltyCard, LoyaltyLedger, LoyaltyPendingBonus
+
+
+class InsufficientLoyaltyBalance(Exception):
+    """Kartada mablag' yetarli emas (yoki karta umuman yo'q)"""
+
+    def __init__(self, has_card=True):
+        super().__init__("Loyalty kartada mablag' yetarli emas")
+        self.has_card = has_card
+
+
+class LoyaltyLedgerService:
+    """
+    Karta balansini o'zgartirish va jurnalga yozish bitta tranzaksiyada bajariladi.
+    """
+
+    @staticmethod
+    def card_defaults():
+        today = timezone.now().date()
+        return {
+            "cycle_start": today,
+            "cycle_end": today + timedelta(days=60),
+        }
+
+    @classmethod
+    def get_card(cls, profile):
+        card, _ = LoyaltyCard.objects.get_or_create(
+            profile=profile, defaults=cls.card_defaults()
+        )
+        return card
+
+    @staticmethod
+    def _update_balance(profile, amount, min_balance=None):
+        """
+        Bitta UPDATE ... RETURNING bilan balansni o'zgartiradi va yangi balansni qaytaradi.
+        min_balance berilsa, shart (current_balance >= min_balance) bajarilmaganda None qaytadi.
+        Python'da tekshirib keyin saqlash o'rniga shart bazaning o'zida tekshiriladi,
+        shuning uchun parallel so'rovlar balansni manfiyga tushira olmaydi.
+        """
+        sql = (
+            f"UPDATE {LoyaltyCard._meta.db_table} "
+            "SET current_balance = current_balance + %s, updated_at = %s "
+            "WHERE profile_id = %s"
+        )
+        params = [amount, timezone.now(), profile.pk]
+        if min_balance is not None:
+            sql += " AND current_balance >= %s"
+            params.append(min_balance)
+        sql += " RETURNING current_balance"
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @classmethod
+    @transaction.atomic
+    def apply(cls, profile, amount, entry_type, order=None, bonus=None, referral=None, comment=""):
+        """
+        Balansga `amount` ni qo'shadi (manfiy bo'lsa ayiradi) va jurnal yozuvini qaytaradi.
+        UPDATE qatorni tranzaksiya oxirigacha qulflaydi, shuning uchun
+        RETURNING bergan balans aynan shu yozuvdan keyingi balans bo'ladi.
+        """
+        amount = Decimal(amount)
+        balance = cls._update_balance(profile, amount)
+        if balance is None:
+            cls.get_card(profile)
+            balance = cls._update_balance(profile, amount)
+
+        return LoyaltyLedger.objects.create(
+            profile=profile,
+            entry_type=entry_type,
+            amount=amount,
+            balance_after=balance,
+            order=order,
+            bonus=bonus,
+            referral=referral,
+            comment=comment,
+        )
+
+    @classmethod
+    def credit(cls, profile, amount, entry_type, **refs):
+        return cls.apply(profile, abs(Decimal(amount)), entry_type, **refs)
+
+    @classmethod
+    def debit_for_order(cls, order, amount):
+        """
+        Buyurtma uchun loyalty'dan to'lov. Order ID bo'yicha idempotent:
+        shu buyurtma uchun yechim allaqachon bo'lgan bo'lsa, o'sha yozuv qaytadi va
+        balans qayta o'zgarmaydi. Mablag' yetarli bo'lmasa InsufficientLoyaltyBalance.
+        """
+        amount = abs(Decimal(amount))
+        existing = LoyaltyLedger.objects.filter(order=order, entry_type="spending").first()
+        if existing is not None:
+            return existing
+
+        try:
+            with transaction.atomic():
+                balance = cls._update_balance(order.user, -amount, min_balance=amount)
+                if balance is None:
+                    raise InsufficientLoyaltyBalance(
+                        has_card=LoyaltyCard.objects.filter(profile=order.user).exists()
+                    )
+                return LoyaltyLedger.objects.create(
+                    profile=order.user,
+                    entry_type="spending",
+                    amount=-amount,
+                    balance_after=balance,
+                    order=order,
+                )
+        except IntegrityError:
+            # Parallel so'rov shu buyurtma uchun yechimni birinchi yozib ulgurdi;
+            # bizning UPDATE'imiz savepoint bilan birga bekor qilindi
+            return LoyaltyLedger.objects.get(order=order, entry_type="spending")
+
+    @classmethod
+    def credit_for_bonus(cls, bonus):
+        """
+        Tasdiqlangan bonus uchun cashback. Bonus bo'yicha idempotent:
+        bonus qayta saqlansa ham karta ikkinchi marta to'ldirilmaydi.
+        """
+        existing = LoyaltyLedger.objects.filter(bonus=bonus, entry_type="cashback").first()
+        if existing is not None:
+            return existing
+        try:
+            with transaction.atomic():
+                return cls.credit(
+                    bonus.profile, bonus.bonus_amount, "cashback", order=bonus.order, bonus=bonus
+                )
+        except IntegrityError:
+            return LoyaltyLedger.objects.get(bonus=bonus, entry_type="cashback")
+
+    @classmethod
+    @transaction.atomic
+    def approve_bonuses(cls, bonus_ids, percent):
+        """
+        Tanlangan pending bonuslarni bitta foiz bilan tasdiqlaydi.
+        Har bir bonus uchun alohida save() o'rniga:
+          1) bitta shartli UPDATE ... RETURNING (faqat hali 'pending' bo'lganlari),
+          2) kartalarni bitta UPDATE ... FROM (VALUES ...) bilan to'ldirish,
+          3) jurnal yozuvlarini bulk_create.
+        post_save signali ishlamaydi, shuning uchun ikki marta hisoblanmaydi.
+        Tasdiqlangan bonuslar sonini qaytaradi.
+        """
+        bonus_ids = [int(pk) for pk in bonus_ids]
+        if not bonus_ids:
+            return 0
+        percent = int(percent)
+
+        with connection.cursor() as cursor:
+            # bonus_amount maydoni numeric(20,0): yaxlitlashni baza bajaradi
+            cursor.execute(
+                f"UPDATE {LoyaltyPendingBonus._meta.db_table} "
+                "SET status = 'approved', percent = %s, bonus_amount = order_amount * %s / 100 "
+                "WHERE id = ANY(%s) AND status = 'pending' "
+                "RETURNING id, profile_id, order_id, bonus_amount",
+                [percent, percent, bonus_ids],
+            )
+            approved = sorted(cursor.fetchall())
+
+        totals = {}
+        for _, profile_id, _, amount in approved:
+            if amount > 0:
+                totals[profile_id] = totals.get(profile_id, Decimal(0)) + amount
+        if not totals:
+            return len(approved)
+
+        # Kartasi yo'q profillar uchun kartani oldindan yaratamiz
+        LoyaltyCard.objects.bulk_create(
+            [
+                LoyaltyCard(profile_id=profile_id, **cls.card_defaults())
+                for profile_id in totals
+            ],
+            ignore_conflicts=True,
+        )
+
+        values_sql = ", ".join(["(%s, %s::numeric)"] * len(totals))
+        params = [timezone.now()]
+        for profile_id, amount in totals.items():
+            params.extend([profile_id, amount])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {LoyaltyCard._meta.db_table} AS card "
+                "SET current_balance = card.current_balance + v.amount, updated_at = %s "
+                f"FROM (VALUES {values_sql}) AS v(profile_id, amount) "
+                "WHERE card.profile_id = v.profile_id "
+                "RETURNING card.profile_id, card.current_balance",
+                params,
+            )
+            balances = dict(cursor.fetchall())
+
+        # Har bir profil uchun jurnaldagi balance_after ketma-ket bo'lishi uchun
+        # yakuniy balansdan boshlang'ich balansni tiklaymiz
+        running = {pid: balances[pid] - total for pid, total in totals.items()}
+        entries = []
+        for bonus_id, profile_id, order_id, amount in approved:
+            if amount <= 0:
+                continue
+            running[profile_id] += amount
+            entries.append(
+                LoyaltyLedger(
+                    profile_id=profile_id,
+                    entry_type="cashback",
+                    amount=amount,
+                    balance_after=running[profile_id],
+                    order_id=order_id,
+                    bonus_id=bonus_id,
+                    comment=f"Bonus {percent}%",
+                )
+            )
+        LoyaltyLedger.objects.bulk_create(entries)
+        return len(approved)
+
+    @classmethod
+    @transaction.atomic
+    def set_balance(cls, profile, new_balance, comment=""):
+        """Admin balansni qo'lda o'zgartirganda farqni 'adjustment' sifatida yozadi"""
+        card = LoyaltyCard.objects.select_for_update().get(pk=cls.get_card(profile).pk)
+        delta = Decimal(new_balance) - card.current_balance
+        if delta == 0:
+            return None
+        return cls.apply(profile, delta, "adjustment", comment=comment)
+
+    @staticmethod
+    def history(profile):
+        """Profil tarixi: bitta indekslangan so'rov (profile, created_at)"""
+        return (
+            LoyaltyLedger.objects.filter(profile=profile)
+            .select_related("order")
+            .order_by("-created_at", "-id")
+        )
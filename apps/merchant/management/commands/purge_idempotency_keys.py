@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.merchant.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Muddati o'tgan Idempotency-Key yozuvlarini o'chiradi (cron orqali)"
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired keys."))
@@ -0,0 +1,57 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from apps.customer.models import Profile
+from apps.merchant.models import Order
+from apps.merchant.sales import SalesFactService
+
+
+class Command(BaseCommand):
+    help = (
+        "DailySalesFact jadvalini Order/OrderItem/Profile'dan qayta quradi. "
+        "Standart: oxirgi 30 kun; --all — birinchi buyurtma/profil sanasidan boshlab."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start", help="YYYY-MM-DD")
+        parser.add_argument("--to", dest="end", help="YYYY-MM-DD (standart: bugun)")
+        parser.add_argument("--days", type=int, default=30)
+        parser.add_argument("--all", action="store_true")
+
+    def parse_day(self, value):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Noto'g'ri sana: {value}")
+
+    def handle(self, *args, **options):
+        end = self.parse_day(options["end"]) if options["end"] else timezone.localdate()
+
+        if options["all"]:
+            first = [
+                timezone.localdate(value) for value in (
+                    Order.objects.aggregate(first=Min("created_at"))["first"],
+                    Profile.objects.aggregate(first=Min("created_at"))["first"],
+                ) if value
+            ]
+            start = min(first, default=end)
+        elif options["start"]:
+            start = self.parse_day(options["start"])
+        else:
+            start = end - timedelta(days=options["days"] - 1)
+
+        if start > end:
+            raise CommandError("--from sanasi --to dan keyin bo'lishi mumkin emas")
+
+        # Bir yillik bo'laklar: har biri alohida tranzaksiya
+        written = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=365), end)
+            written += SalesFactService.rebuild(chunk_start, chunk_end)
+            chunk_start = chunk_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {start}..{end}: {written} days with data."))
@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from apps.merchant.models import LoyaltyCard, LoyaltyLedger
+
+
+class Command(BaseCommand):
+    help = "LoyaltyCard.current_balance ni LoyaltyLedger jurnali bilan partiyalab solishtiradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Farqni 'adjustment' yozuvi bilan jurnalga qo'shish (karta balansi o'zgarmaydi)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        fix = options["fix"]
+
+        # Har bir profil uchun jurnal yig'indisi (bitta korrelyatsiyalangan subquery)
+        ledger_total = (
+            LoyaltyLedger.objects.filter(profile_id=OuterRef("profile_id"))
+            .order_by()
+            .values("profile_id")
+            .annotate(total=Sum("amount"))
+            .values("total")
+        )
+        cards = LoyaltyCard.objects.annotate(
+            ledger_total=Coalesce(
+                Subquery(ledger_total),
+                Value(Decimal(0)),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            )
+        ).select_related("profile").order_by("pk")
+
+        checked = mismatched = 0
+        last_pk = 0
+        while True:
+            batch = list(cards.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            for card in batch:
+                checked += 1
+                diff = card.current_balance - card.ledger_total
+                if diff == 0:
+                    continue
+                mismatched += 1
+                self.stdout.write(
+                    f"Card #{card.pk} (profile {card.profile_id}): "
+                    f"balance={card.current_balance} ledger={card.ledger_total} diff={diff}"
+                )
+                if fix:
+                    LoyaltyLedger.objects.create(
+                        profile=card.profile,
+                        entry_type="adjustment",
+                        amount=diff,
+                        balance_after=card.current_balance,
+                        comment="Reconciliation",
+                    )
+
+        style = self.style.SUCCESS if not mismatched or fix else self.style.WARNING
+        self.stdout.write(style(f"Checked {checked} cards, {mismatched} mismatched."))
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.merchant.receipts import ReceiptService
+
+
+class Command(BaseCommand):
+    help = "Fonda qayta ishlanmay qolgan to'lov cheklarini buyurtmaga biriktiradi (cron orqali)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than", type=int, default=15,
+            help="Shundan (daqiqa) eski vaqtinchalik fayllar qayta ishlanadi",
+        )
+
+    def handle(self, *args, **options):
+        report = ReceiptService.reprocess_stale(timedelta(minutes=options["older_than"]))
+        self.stdout.write(self.style.SUCCESS(
+            "Processed {processed}, failed {failed}, missing {missing}, removed {removed} orphaned files.".format(**report)
+        ))
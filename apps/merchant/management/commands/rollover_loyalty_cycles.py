@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.merchant.models import LoyaltyCard
+
+
+class Command(BaseCommand):
+    help = (
+        "Muddati tugagan (cycle_end < bugun) loyalty kartalarning siklini yangilaydi. "
+        "Cron orqali kuniga bir marta ishga tushirish uchun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        today = timezone.localdate()
+        table = LoyaltyCard._meta.db_table
+
+        # Har bir partiya bitta UPDATE: yangi sikl bugundan boshlanadi va cycle_days davom etadi.
+        # Partiyalar pk bo'yicha ketma-ket olinadi, shuning uchun qulflar qisqa bo'ladi.
+        sql = (
+            f"UPDATE {table} "
+            "SET cycle_number = cycle_number + 1, cycle_start = %s, "
+            "cycle_end = %s + cycle_days, updated_at = %s "
+            f"WHERE id IN (SELECT id FROM {table} WHERE cycle_end < %s AND id > %s ORDER BY id LIMIT %s) "
+            "RETURNING id"
+        )
+
+        rolled = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, [today, today, timezone.now(), today, last_pk, batch_size])
+                ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            rolled += len(ids)
+            last_pk = max(ids)
+
+        self.stdout.write(self.style.SUCCESS(f"Rolled over {rolled} cards."))
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_opening_balances(apps, schema_editor):
+    # Mavjud kartalar balansi jurnalda "opening balance" yozuvi sifatida boshlanadi
+    LoyaltyCard = apps.get_model("merchant", "LoyaltyCard")
+    LoyaltyLedger = apps.get_model("merchant", "LoyaltyLedger")
+
+    entries = [
+        LoyaltyLedger(
+            profile_id=card.profile_id,
+            entry_type="adjustment",
+            amount=card.current_balance,
+            balance_after=card.current_balance,
+            comment="Opening balance",
+        )
+        for card in LoyaltyCard.objects.exclude(current_balance=0).iterator()
+    ]
+    LoyaltyLedger.objects.bulk_create(entries, batch_size=1000)
+
+
+def mark_legacy_spending(apps, schema_editor):
+    # Loyalty'dan to'langan eski buyurtmalar uchun 0 summali "spending" belgisi: karta allaqachon
+    # yechilgan, Order.save() dagi debit_for_order esa shu yozuv bo'lmasa qayta yechardi
+    LoyaltyCard = apps.get_model("merchant", "LoyaltyCard")
+    LoyaltyLedger = apps.get_model("merchant", "LoyaltyLedger")
+    Order = apps.get_model("merchant", "Order")
+
+    balances = dict(LoyaltyCard.objects.values_list("profile_id", "current_balance"))
+    entries = [
+        LoyaltyLedger(
+            profile_id=profile_id,
+            entry_type="spending",
+            amount=0,
+            balance_after=balances.get(profile_id, 0),
+            order_id=order_id,
+            comment="Paid before ledger",
+        )
+        for order_id, profile_id in Order.objects.filter(loyalty_payment__gt=0)
+        .values_list("id", "user_id").iterator()
+    ]
+    LoyaltyLedger.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0002_initial'),
+        ('merchant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoyaltyLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('spending', 'Spending'), ('cashback', 'Cashback'), ('referral', 'Referral'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('comment', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('bonus', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='loyalty_entries', to='merchant.loyaltypendingbonus')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='loyalty_entries', to='merchant.order')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loyalty_ledger', to='customer.profile')),
+                ('referral', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='loyalty_entries', to='merchant.referral')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['profile', 'created_at'], name='loyalty_ledger_profile_idx')],
+            },
+        ),
+        migrations.RunPython(create_opening_balances, migrations.RunPython.noop),
+        migrations.RunPython(mark_legacy_spending, migrations.RunPython.noop),
+    ]
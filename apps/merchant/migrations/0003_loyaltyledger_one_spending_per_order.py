@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0002_initial'),
+        ('merchant', '0002_loyaltyledger'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='loyaltyledger',
+            constraint=models.UniqueConstraint(condition=models.Q(('entry_type', 'spending')), fields=('order',), name='loyalty_ledger_one_spending_per_order'),
+        ),
+    ]
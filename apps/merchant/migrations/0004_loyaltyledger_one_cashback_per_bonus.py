@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0002_initial'),
+        ('merchant', '0003_loyaltyledger_one_spending_per_order'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='loyaltyledger',
+            constraint=models.UniqueConstraint(condition=models.Q(('entry_type', 'cashback')), fields=('bonus',), name='loyalty_ledger_one_cashback_per_bonus'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merchant', '0005_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='receipt_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:58
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_items(apps, schema_editor):
+    # Bir xil (order, product) qatorlari birinchisiga jamlanadi, qolganlari o'chiriladi
+    OrderItem = apps.get_model("merchant", "OrderItem")
+
+    duplicates = (
+        OrderItem.objects.exclude(product=None)
+        .values("order_id", "product_id")
+        .annotate(rows=Count("id"), keep_id=Min("id"), total=Sum("quantity"))
+        .filter(rows__gt=1)
+    )
+    for row in list(duplicates):
+        OrderItem.objects.filter(pk=row["keep_id"]).update(quantity=row["total"])
+        OrderItem.objects.filter(
+            order_id=row["order_id"], product_id=row["product_id"]
+        ).exclude(pk=row["keep_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merchant', '0006_order_receipt_hash'),
+        ('product', '0004_alter_good_product'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='orderitem',
+            constraint=models.UniqueConstraint(fields=('order', 'product'), name='orderitem_unique_order_product'),
+        ),
+    ]
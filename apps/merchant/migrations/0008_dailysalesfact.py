@@ -0,0 +1,35 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merchant', '0007_orderitem_unique_order_product'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('orders', models.IntegerField(default=0)),
+                ('orders_pending', models.IntegerField(default=0)),
+                ('orders_check_pending', models.IntegerField(default=0)),
+                ('orders_payment_pending', models.IntegerField(default=0)),
+                ('orders_approved', models.IntegerField(default=0)),
+                ('orders_sent', models.IntegerField(default=0)),
+                ('orders_cancelled', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=20)),
+                ('units_sold', models.IntegerField(default=0)),
+                ('loyalty_spent', models.DecimalField(decimal_places=0, default=0, max_digits=20)),
+                ('new_customers', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ('day',),
+            },
+        ),
+    ]
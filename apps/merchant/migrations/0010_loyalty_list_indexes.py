@@ -0,0 +1,22 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0005_loyalty_list_indexes'),
+        ('merchant', '0009_order_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loyaltycard',
+            index=models.Index(fields=['current_balance'], name='loyalty_card_balance_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loyaltypendingbonus',
+            index=models.Index(fields=['profile', 'status'], name='pending_bonus_profile_status'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merchant', '0010_loyalty_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='staged_receipt',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.10 on 2026-10-19 18:26
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Now
+
+
+def mark_sent_orders_shipped(apps, schema_editor):
+    # Allaqachon jo'natilganlar qayta "sent" bo'lsa, ombordan ikkinchi marta chiqarilmasin
+    Order = apps.get_model("merchant", "Order")
+    Order.objects.filter(status__in=["sent", "Sent"]).update(shipped_at=Coalesce("created_at", Now()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merchant', '0011_order_staged_receipt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='shipped_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_sent_orders_shipped, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.10 on 2026-10-19 18:38
+
+from django.db import migrations, models
+
+
+def mark_shipped_items(apps, schema_editor):
+    # Avval jo'natilganlarda qancha chiqarilgani noma'lum — to'liq miqdor deb olinadi
+    OrderItem = apps.get_model("merchant", "OrderItem")
+    OrderItem.objects.filter(order__shipped_at__isnull=False, quantity__gt=0).update(shipped_quantity=models.F("quantity"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('merchant', '0012_order_shipped_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='shipped_quantity',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(mark_shipped_items, migrations.RunPython.noop),
+    ]
@@ -2,11 +2,13 @@ import random
 import time
 from datetime import timedelta, date
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
+from django.dispatch import Signal
 from django.utils import timezone
 from model_utils.models import TimeStampedModel
-from django.db.models import F
+from django.db.models import F, Q
 from ckeditor.fields import RichTextField
 from rest_framework.response import Response
 from rest_framework import status
@@ -17,6 +19,11 @@ from apps.customer.models import Profile, Location
 from apps.product.models import ProductItem
 
 
+# Buyurtma statusi o'zgarganda (yaratilganda ham, old_status=None): sender=Order, order, old_status.
+# Order.save() ichida, tranzaksiya commit bo'lishidan oldin yuboriladi.
+order_status_changed = Signal()
+
+
 class BankCardModel(models.Model):
     title = models.BigIntegerField(default=0, null=True, blank=True)
     card_holder = models.CharField(max_length=100, null=True, blank=True)
@@ -40,6 +47,41 @@ def generate_order_number():
     number = random.randint(10000, 99999)
     return f"ORD{number}"
 
+class OrderQuerySet(models.QuerySet):
+    # Ism/telefon bo'yicha topilgan profillardan ko'pi bilan shunchasi qidiruvga kiradi
+    SEARCH_PROFILE_LIMIT = 500
+
+    def search(self, query):
+        """
+        Dashboard buyurtma qidiruvi, har bir tarmoq indeks bo'yicha:
+            "ORD12345"   -> order_number (unique indeks)
+            raqam        -> id yoki order_number, 4+ raqam bo'lsa mijoz telefoni ham (satr ichidan)
+            matn         -> mijoz ismi (satr ichidan, 3 belgidan qisqa bo'lsa boshidan)
+        Mijozlar avval alohida so'rovda (Profile.objects.search, trigram indekslari) topiladi, keyin
+        user_id IN (...) — bitta katta JOIN + seq scan o'rniga.
+        """
+        query = (query or "").strip()
+        if not query:
+            return self
+        if query.upper().startswith("ORD"):
+            return self.filter(order_number=query.upper())
+
+        digits = query.lstrip("#").replace("+", "").replace(" ", "").replace("-", "")
+        condition = Q(pk__in=[])
+        if digits.isdigit():
+            condition = Q(pk=int(digits)) | Q(order_number=f"ORD{digits}")
+            if len(digits) < 4:
+                return self.filter(condition)
+
+        profile_ids = list(
+            Profile.objects.search(digits if digits.isdigit() else query)
+            .order_by().values_list("id", flat=True)[:self.SEARCH_PROFILE_LIMIT]
+        )
+        if profile_ids:
+            condition |= Q(user_id__in=profile_ids)
+        return self.filter(condition)
+
+
 class Order(models.Model):
     # Buyurtma raqami (masalan: ORD1738080000)
     order_number = models.CharField(
@@ -59,6 +101,9 @@ class Order(models.Model):
         ("Sent", "Yetkazildi"),
     )
 
+    # Daromad hisoblanadigan statuslar (dashboard, kunlik statistika)
+    PAID_STATUSES = ("approved", "sent")
+
     user = models.ForeignKey(
         Profile, on_delete=models.CASCADE, related_name="order"
     )
@@ -73,9 +118,21 @@ class Order(models.Model):
     delivery_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     bonus_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     payment_receipt = models.ImageField(upload_to='receipts/', null=True, blank=True)  # To'lov cheki
+    receipt_hash = models.CharField(max_length=64, blank=True)  # Normallashtirilgan chek faylining sha256
+    staged_receipt = models.CharField(max_length=255, blank=True)  # Normallashtirish kutilayotgan chek (receipts/incoming/...)
+    shipped_at = models.DateTimeField(null=True, blank=True)  # Ombordan chiqarilgan (qoldiq va SoldProduct yozilgan) vaqt
     loyalty_payment = models.IntegerField(default=0, null=True, blank=True)
     bankcard = models.ForeignKey(BankCardModel, on_delete=models.CASCADE, null=True, blank=True, related_name='bank_card')
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Dashboard ro'yxati: status + sana filtri, sana oralig'i (statistika, rebuild)
+            models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+            models.Index(fields=["created_at"], name="order_created_idx"),
+        ]
+
     def update_total_amount(self):
         total = 0
         for item in self.orderitem.all():
@@ -148,17 +205,13 @@ class Order(models.Model):
         # agar loyalty_payment kiritilgan bo'lsa va hali yechilmagan bo'lsa, yechib olamiz.
         
         if self.loyalty_payment and self.loyalty_payment > 0:
-            # Balansni tekshirish va yechish
-            try:
-                card = self.user.loyalty_card
-                if card.current_balance >= self.loyalty_payment:
-                    with transaction.atomic():
-                        card.current_balance = F('current_balance') - self.loyalty_payment
-                        card.save()
-            except LoyaltyCard.DoesNotExist:
-                pass # Karta yo'q bo'lsa, hech narsa qilmaymiz (yoki xato qaytarish mumkin)
-
+            from .loyalty import InsufficientLoyaltyBalance, LoyaltyLedgerService
 
+            # Yechim order ID bo'yicha idempotent: keyingi save'lar balansga tegmaydi
+            try:
+                LoyaltyLedgerService.debit_for_order(self, self.loyalty_payment)
+            except InsufficientLoyaltyBalance:
+                pass # Mablag' yetarli emas yoki karta yo'q - hech narsa qilmaymiz
 
         # 2️⃣ Summani hisoblash
         total = Decimal(0)
@@ -188,6 +241,14 @@ class Order(models.Model):
         if self.status == "sent" and old_status != "sent":
             self.create_loyalty_pending_bonus()
 
+        if self.status != old_status:
+            order_status_changed.send(sender=Order, order=self, old_status=old_status)
+
+            # 5️⃣ SSE obunachilariga xabar (apps.merchant.events) — commit'dan keyin yetkaziladi
+            if self.status != "in_cart":
+                from . import events
+                events.publish(self, old_status)
+
     # ---------------- STOCK UPDATE ----------------
     def update_product_stock(self):
         for item in self.orderitem.all():
@@ -214,6 +275,13 @@ class OrderItem(TimeStampedModel, models.Model):
         null=True,
     )
     quantity = models.IntegerField(default=0)
+    shipped_quantity = models.PositiveIntegerField(default=0)  # "sent" da ombordan haqiqatda chiqarilgan miqdor
+
+    class Meta:
+        constraints = [
+            # Savatda bitta mahsulot bitta qator: batch upsert shu constraint bo'yicha ishlaydi
+            models.UniqueConstraint(fields=["order", "product"], name="orderitem_unique_order_product"),
+        ]
 
 
 class Information(TimeStampedModel, models.Model):
@@ -279,8 +347,11 @@ class LoyaltyCard(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-
-
+    class Meta:
+        indexes = [
+            # Loyalty dashboard: balans bo'yicha saralash
+            models.Index(fields=["current_balance"], name="loyalty_card_balance_idx"),
+        ]
 
     def __str__(self):
         return f"LoyaltyCard({self.profile})"
@@ -320,6 +391,12 @@ class LoyaltyPendingBonus(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Profil bo'yicha bonuslar summasi (loyalty dashboard)
+            models.Index(fields=["profile", "status"], name="pending_bonus_profile_status"),
+        ]
+
     def save(self, *args, **kwargs):
         """
         Автоматический расчёт bonus_amount:
@@ -375,18 +452,14 @@ class Referral(models.Model):
         super().save(*args, **kwargs)
 
     def make_rewarded_logic(self):
-        from .models import LoyaltyCard
-        with transaction.atomic():
-            card, created = LoyaltyCard.objects.get_or_create(
-                profile=self.referrer,
-                defaults={
-                    'cycle_start': date.today(),
-                    'cycle_end': date.today() + timedelta(days=60),
-                    'current_balance': 0
-                }
-            )
-            card.current_balance = F('current_balance') + 5000
-            card.save()
+        from .loyalty import LoyaltyLedgerService
+        LoyaltyLedgerService.credit(
+            self.referrer,
+            5000,
+            "referral",
+            referral=self,
+            comment=f"Referral: {self.referee.full_name}",
+        )
 
 
     class Meta:
@@ -396,7 +469,133 @@ class Referral(models.Model):
         return f"{self.referrer.full_name} -> {self.referee.full_name}"
 
 
-# WalletTransaction model removed - history is now fetched directly from Order, LoyaltyPendingBonus, and Referral models
+class LoyaltyLedger(models.Model):
+    """
+    Loyalty karta balansining append-only jurnali.
+    Har bir kirim (+) va chiqim (-) yozuvi o'zidan keyingi balans bilan saqlanadi.
+    Yozuvlar faqat apps.merchant.loyalty.LoyaltyLedgerService orqali yaratiladi.
+    """
+    ENTRY_TYPES = (
+        ("spending", "Spending"),
+        ("cashback", "Cashback"),
+        ("referral", "Referral"),
+        ("adjustment", "Adjustment"),
+    )
+
+    profile = models.ForeignKey(
+        "customer.Profile",
+        on_delete=models.CASCADE,
+        related_name="loyalty_ledger"
+    )
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance_after = models.DecimalField(max_digits=12, decimal_places=2)
+
+    order = models.ForeignKey(
+        "merchant.Order",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="loyalty_entries"
+    )
+    bonus = models.ForeignKey(
+        LoyaltyPendingBonus,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="loyalty_entries"
+    )
+    referral = models.ForeignKey(
+        Referral,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="loyalty_entries"
+    )
+    comment = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["profile", "created_at"], name="loyalty_ledger_profile_idx"),
+        ]
+        constraints = [
+            # Bitta buyurtma uchun loyalty'dan faqat bir marta yechiladi
+            models.UniqueConstraint(
+                fields=["order"],
+                condition=models.Q(entry_type="spending"),
+                name="loyalty_ledger_one_spending_per_order",
+            ),
+            # Bitta bonus uchun cashback faqat bir marta yoziladi
+            models.UniqueConstraint(
+                fields=["bonus"],
+                condition=models.Q(entry_type="cashback"),
+                name="loyalty_ledger_one_cashback_per_bonus",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Jurnal faqat qo'shiladi, mavjud yozuvni o'zgartirib bo'lmaydi
+        if not self._state.adding:
+            raise ValidationError("LoyaltyLedger yozuvlarini o'zgartirib bo'lmaydi")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.profile_id} | {self.entry_type} | {self.amount}"
 
 
+class IdempotencyKey(models.Model):
+    """
+    Idempotency-Key header bilan kelgan so'rovning natijasi.
+    Mobil ilova so'rovni qayta yuborsa, saqlangan javob qaytariladi va
+    buyurtma jadvallariga tegilmaydi. Yozuvlar apps.merchant.idempotency orqali yaratiladi.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys"
+    )
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="idempotency_key_per_user"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} | {self.key}"
+
+
+class DailySalesFact(models.Model):
+    """
+    Kunlik savdo statistikasi (dashboard grafiklari uchun), kun TIME_ZONE bo'yicha.
+    Buyurtma o'sha kunga yaratilgan sanasi bo'yicha tegishli; orders_* ustunlari —
+    shu kunda yaratilgan buyurtmalarning hozirgi statusi bo'yicha soni.
+    Statuslar o'zgarganda apps.merchant.sales orqali yangilanadi,
+    istalgan oraliq `rebuild_sales_facts` buyrug'i bilan qayta quriladi.
+    """
+
+    day = models.DateField(unique=True)
+    orders = models.IntegerField(default=0)
+    orders_pending = models.IntegerField(default=0)
+    orders_check_pending = models.IntegerField(default=0)
+    orders_payment_pending = models.IntegerField(default=0)
+    orders_approved = models.IntegerField(default=0)
+    orders_sent = models.IntegerField(default=0)
+    orders_cancelled = models.IntegerField(default=0)
+    revenue = models.DecimalField(decimal_places=0, max_digits=20, default=0)
+    units_sold = models.IntegerField(default=0)
+    loyalty_spent = models.DecimalField(decimal_places=0, max_digits=20, default=0)
+    new_customers = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("day",)
+
+    def __str__(self):
+        return f"{self.day} | {self.orders} | {self.revenue}"
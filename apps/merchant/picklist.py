@@ -0,0 +1,82 @@
+"""
+Ombor uchun yig'ma ro'yxat (pick-list).
+
+Tanlangan buyurtmalar (odatda "approved" — yuborilishi kutilayotganlar) bo'yicha har bir
+mahsulotdan jami qancha olish kerakligi. Hammasi OrderItem ustida bitta GROUP BY so'rovida:
+mahsulot nomi, o'lchov birligi va qoldiq JOIN bilan bir marta, buyurtmalar bo'yicha taqsimot
+esa ArrayAgg bilan shu qatorning o'zida keladi — har bir buyurtmani alohida ochish shart emas.
+"""
+
+import csv
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+
+from apps.product.models import ProductItem
+from .models import Order, OrderItem
+
+
+DEFAULT_STATUS = "approved"
+
+MEASURES = dict(ProductItem.CHOICES)
+
+
+class PickListService:
+
+    @staticmethod
+    def orders(ids=None, status=DEFAULT_STATUS, start=None, end=None):
+        """Tanlangan buyurtmalar (ids bo'lsa faqat ular); so'rov bajarilmaydi, subquery bo'lib qo'shiladi"""
+        orders = Order.objects.exclude(status="in_cart")
+        if ids:
+            return orders.filter(id__in=ids)
+        if status:
+            orders = orders.filter(status=status)
+        if start:
+            orders = orders.filter(created_at__gte=start)
+        if end:
+            orders = orders.filter(created_at__lt=end)
+        return orders
+
+    @staticmethod
+    def build(orders):
+        """
+        Mahsulotlar bo'yicha qatorlar (jami miqdor kamayish tartibida):
+        {product_id, name, desc, measure, stock, total, order_count, shortage, breakdown: [(order_number, miqdor)]}
+        """
+        rows = (
+            OrderItem.objects.filter(order__in=orders.values("id"), product__isnull=False)
+            .annotate(
+                name=Coalesce("product__goods__name", "product__phones__model_name", "product__tickets__event_name"),
+                desc=F("product__desc"),
+                measure=F("product__measure"),
+                stock=F("product__available_quantity"),
+            )
+            .values("product_id", "name", "desc", "measure", "stock")
+            .annotate(
+                total=Sum("quantity"),
+                order_count=Count("order_id", distinct=True),
+                order_numbers=ArrayAgg("order__order_number", ordering="order_id"),
+                quantities=ArrayAgg("quantity", ordering="order_id"),
+            )
+            .order_by("-total", "product_id")
+        )
+        pick_list = []
+        for row in rows:
+            row["name"] = row["name"] or row["desc"][:60]
+            row["measure"] = MEASURES.get(row["measure"], "")
+            row["shortage"] = max(row["total"] - row["stock"], 0)
+            # (order, product) juftligi unikal — har bir buyurtmadan bitta qator
+            row["breakdown"] = list(zip(row.pop("order_numbers"), row.pop("quantities")))
+            pick_list.append(row)
+        return pick_list
+
+    @staticmethod
+    def export_csv(pick_list, stream):
+        writer = csv.writer(stream)
+        writer.writerow(["product_id", "name", "measure", "total", "stock", "shortage", "orders"])
+        for row in pick_list:
+            writer.writerow([
+                row["product_id"], row["name"], row["measure"], row["total"], row["stock"], row["shortage"],
+                "; ".join(f"{number} x{quantity}" for number, quantity in row["breakdown"]),
+            ])
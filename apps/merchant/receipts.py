@@ -0,0 +1,172 @@
+"""
+To'lov cheklarini qabul qilish.
+Yuklangan fayl DB tranzaksiyasidan tashqarida storage'ga yoziladi, keyin fon oqimida
+normallashtiriladi (EXIF orientatsiya, o'lcham, qayta siqish) va faqat tayyor fayl
+storage'da turganidan keyin Order.payment_receipt yangilanadi.
+Fon oqimi yiqilsa (worker restart, xato) Order.staged_receipt to'ldirilgan holda qoladi —
+reprocess_receipts buyrug'i bunday buyurtmalarni qayta ishlaydi va egasiz fayllarni o'chiradi.
+"""
+
+import hashlib
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import Order
+
+
+logger = logging.getLogger(__name__)
+
+INCOMING_DIR = "receipts/incoming"
+RECEIPTS_DIR = "receipts"
+
+# Chekdagi yozuvlar o'qilishi uchun yetarli, telefon rasmidan esa bir necha barobar kichik
+RECEIPT_MAX_SIDE = getattr(settings, "RECEIPT_MAX_SIDE", 1600)
+RECEIPT_JPEG_QUALITY = getattr(settings, "RECEIPT_JPEG_QUALITY", 80)
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="receipts")
+
+
+class ReceiptService:
+    """Chekni vaqtinchalik saqlash, normallashtirish va buyurtmaga biriktirish"""
+
+    @staticmethod
+    def stage(upload):
+        """Faylni vaqtinchalik joyga yozadi (bo'laklab, xotiraga to'liq o'qimasdan)"""
+        ext = os.path.splitext(upload.name)[1].lower()[:10]
+        return default_storage.save(f"{INCOMING_DIR}/{uuid.uuid4().hex}{ext}", upload)
+
+    @staticmethod
+    def discard(staged_name):
+        if staged_name and default_storage.exists(staged_name):
+            default_storage.delete(staged_name)
+
+    @staticmethod
+    def normalize(fh):
+        """
+        Rasmni normallashtirib (baytlar, ".jpg") qaytaradi.
+        Rasm bo'lmasa (masalan PDF) None qaytadi va fayl o'zgarishsiz saqlanadi.
+        """
+        try:
+            img = Image.open(fh)
+            # JPEG'ni to'liq o'lchamda emas, kerakli o'lchamga yaqin masshtabda dekodlaymiz
+            img.draft("RGB", (RECEIPT_MAX_SIDE, RECEIPT_MAX_SIDE))
+            img = ImageOps.exif_transpose(img)
+        except (UnidentifiedImageError, OSError):
+            return None
+
+        img.thumbnail((RECEIPT_MAX_SIDE, RECEIPT_MAX_SIDE))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+
+        out = BytesIO()
+        img.save(out, "JPEG", quality=RECEIPT_JPEG_QUALITY, optimize=True, progressive=True)
+        return out.getvalue(), ".jpg"
+
+    @classmethod
+    def process(cls, order_id, staged_name):
+        """
+        Normallashtiradi, kontent hash bo'yicha saqlaydi va shundan keyingina
+        buyurtma qatorini yangilaydi (save() emas, update: loyalty/summa logikasi qayta ishlamaydi).
+        Buyurtmaning oxirgi yuklangan cheki bo'lmasa biriktirilmaydi va None qaytadi.
+        """
+        with default_storage.open(staged_name, "rb") as fh:
+            normalized = cls.normalize(fh)
+            if normalized is not None:
+                content, ext = normalized
+                content_hash = hashlib.sha256(content).hexdigest()
+                upload = ContentFile(content)
+            else:
+                fh.seek(0)
+                digest = hashlib.sha256()
+                for chunk in iter(lambda: fh.read(64 * 1024), b""):
+                    digest.update(chunk)
+                content_hash = digest.hexdigest()
+                ext = os.path.splitext(staged_name)[1]
+                fh.seek(0)
+                upload = File(fh)
+
+            # Bir xil chek qayta yuklansa, fayl takrorlanmaydi
+            final_name = f"{RECEIPTS_DIR}/{content_hash[:2]}/{content_hash}{ext}"
+            if not default_storage.exists(final_name):
+                final_name = default_storage.save(final_name, upload)
+
+        # Shu orada yangi chek yuklangan bo'lsa (staged_receipt boshqa), eski chek uning ustiga yozilmaydi
+        attached = Order.objects.filter(pk=order_id, staged_receipt=staged_name).update(
+            payment_receipt=final_name, receipt_hash=content_hash, staged_receipt=""
+        )
+        if not attached and not Order.objects.filter(payment_receipt=final_name).exists():
+            default_storage.delete(final_name)
+        cls.discard(staged_name)
+        return final_name if attached else None
+
+    @classmethod
+    def _process_in_background(cls, order_id, staged_name):
+        try:
+            cls.process(order_id, staged_name)
+        except Exception:
+            # Vaqtinchalik fayl qoladi, qayta ishlash mumkin
+            logger.exception("Receipt processing failed for order %s (%s)", order_id, staged_name)
+        finally:
+            # Oqimning o'z DB ulanishi ochiq qolmasligi uchun
+            connections.close_all()
+
+    @classmethod
+    def schedule(cls, order_id, staged_name):
+        """Tranzaksiya commit bo'lgandan keyin normallashtirishni boshlaydi"""
+        # Testlarda RECEIPT_PROCESS_ASYNC=False: qayta ishlash commit'dan keyin shu oqimda bajariladi
+        if getattr(settings, "RECEIPT_PROCESS_ASYNC", True):
+            transaction.on_commit(
+                lambda: _executor.submit(cls._process_in_background, order_id, staged_name)
+            )
+        else:
+            transaction.on_commit(lambda: cls.process(order_id, staged_name))
+
+    @classmethod
+    def reprocess_stale(cls, older_than=timedelta(minutes=15)):
+        """
+        older_than dan eski, hali biriktirilmagan cheklarni qayta ishlaydi;
+        hech qaysi buyurtmaga bog'lanmagan vaqtinchalik fayllarni o'chiradi.
+        Hisobot: {"processed", "failed", "missing", "removed"}.
+        """
+        cutoff = timezone.now() - older_than
+        report = {"processed": 0, "failed": 0, "missing": 0, "removed": 0}
+
+        pending = dict(Order.objects.exclude(staged_receipt="").values_list("staged_receipt", "id"))
+        for staged_name, order_id in pending.items():
+            if not default_storage.exists(staged_name):
+                Order.objects.filter(pk=order_id, staged_receipt=staged_name).update(staged_receipt="")
+                report["missing"] += 1
+                continue
+            # Yangi yuklanganlar hali fon oqimida bo'lishi mumkin
+            if default_storage.get_modified_time(staged_name) > cutoff:
+                continue
+            try:
+                cls.process(order_id, staged_name)
+            except Exception:
+                logger.exception("Receipt reprocessing failed for order %s (%s)", order_id, staged_name)
+                report["failed"] += 1
+            else:
+                report["processed"] += 1
+
+        try:
+            _, files = default_storage.listdir(INCOMING_DIR)
+        except FileNotFoundError:
+            files = []
+        for filename in files:
+            staged_name = f"{INCOMING_DIR}/{filename}"
+            # Tranzaksiya commit bo'lmagan so'rovlardan qolgan fayllar
+            if staged_name not in pending and default_storage.get_modified_time(staged_name) <= cutoff:
+                cls.discard(staged_name)
+                report["removed"] += 1
+        return report
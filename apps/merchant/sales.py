@@ -0,0 +1,190 @@
+"""
+Kunlik savdo statistikasi (DailySalesFact).
+
+Dashboard grafiklari 7/30/365 kunlik qatorlarni shu jadvaldan o'qiydi — Order skan qilinmaydi.
+    - record_transition(): buyurtma statusi o'zgarganda (order_status_changed) o'sha kun qatoriga
+      farqni qo'shadi; buyurtma bilan bitta tranzaksiyada bajariladi;
+    - record_transitions(): dashboarddagi ommaviy status o'zgarishi (kun bo'yicha yig'ilgan farq);
+    - record_new_customer(): yangi profil;
+    - rebuild(): oraliqni Order/OrderItem/Profile'dan qaytadan hisoblaydi (migratsiyadan keyin,
+      yoki total_amount status o'zgarmasdan o'zgarganda farqni tuzatish uchun).
+
+Kun chegaralari TIME_ZONE bo'yicha: created_at mahalliy sanaga o'tkaziladi.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.customer.models import Profile
+from .models import DailySalesFact, Order, OrderItem
+
+
+# status -> DailySalesFact ustuni
+STATUS_COLUMNS = {
+    "pending": "orders_pending",
+    "check_pending": "orders_check_pending",
+    "payment_pending": "orders_payment_pending",
+    "approved": "orders_approved",
+    "sent": "orders_sent",
+    "cancelled": "orders_cancelled",
+}
+
+SERIES_FIELDS = ("orders", *STATUS_COLUMNS.values(), "revenue", "units_sold", "loyalty_spent", "new_customers")
+
+
+def day_bounds(start, end):
+    """[start, end] sanalari uchun mahalliy vaqt bo'yicha aware [lo, hi) oraliq"""
+    lo = timezone.make_aware(datetime.combine(start, time.min))
+    hi = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+    return lo, hi
+
+
+class SalesFactService:
+
+    @staticmethod
+    def apply(day, **deltas):
+        """Kun qatoriga farqlarni qo'shadi (qator bo'lmasa yaratiladi)"""
+        deltas = {field: value for field, value in deltas.items() if value}
+        if not deltas:
+            return
+        DailySalesFact.objects.bulk_create([DailySalesFact(day=day)], ignore_conflicts=True)
+        DailySalesFact.objects.filter(day=day).update(
+            **{field: F(field) + value for field, value in deltas.items()},
+            updated_at=timezone.now(),
+        )
+
+    @staticmethod
+    def transition_deltas(old_status, new_status, amount, units, loyalty):
+        """Bitta buyurtma statusi o'zgarishining kun qatoriga farqi"""
+        deltas = {}
+
+        placed, was_placed = new_status != "in_cart", old_status not in (None, "in_cart")
+        if placed != was_placed:
+            deltas["orders"] = 1 if placed else -1
+        if old_status in STATUS_COLUMNS:
+            deltas[STATUS_COLUMNS[old_status]] = -1
+        if new_status in STATUS_COLUMNS:
+            deltas[STATUS_COLUMNS[new_status]] = deltas.get(STATUS_COLUMNS[new_status], 0) + 1
+
+        was_paid, is_paid = old_status in Order.PAID_STATUSES, new_status in Order.PAID_STATUSES
+        if was_paid != is_paid:
+            sign = 1 if is_paid else -1
+            deltas["revenue"] = sign * amount
+            deltas["units_sold"] = sign * units()
+            deltas["loyalty_spent"] = sign * (loyalty or 0)
+        return deltas
+
+    @classmethod
+    def record_transition(cls, order, old_status):
+        if order.created_at is None:
+            return
+        deltas = cls.transition_deltas(
+            old_status, order.status, order.total_amount,
+            lambda: order.orderitem.aggregate(total=Sum("quantity"))["total"] or 0,
+            order.loyalty_payment,
+        )
+        cls.apply(timezone.localdate(order.created_at), **deltas)
+
+    @classmethod
+    def record_transitions(cls, orders, old_statuses):
+        """
+        Ommaviy status o'zgarishi: farqlar kun bo'yicha yig'iladi va har bir kunga bitta UPDATE.
+        Donalar hamma buyurtmalar uchun bitta so'rovda olinadi.
+        """
+        units = dict(
+            OrderItem.objects.filter(order__in=[order.pk for order in orders])
+            .values("order").annotate(total=Sum("quantity")).values_list("order", "total")
+        )
+        days = {}
+        for order in orders:
+            if order.created_at is None:
+                continue
+            deltas = cls.transition_deltas(
+                old_statuses[order.pk], order.status, order.total_amount,
+                lambda: units.get(order.pk) or 0, order.loyalty_payment,
+            )
+            totals = days.setdefault(timezone.localdate(order.created_at), {})
+            for field, value in deltas.items():
+                totals[field] = totals.get(field, 0) + value
+        for day, deltas in days.items():
+            cls.apply(day, **deltas)
+
+    @classmethod
+    def record_new_customer(cls, profile):
+        cls.apply(timezone.localdate(profile.created_at or timezone.now()), new_customers=1)
+
+    @staticmethod
+    def compute(start, end):
+        """[start, end] kunlari uchun DailySalesFact obyektlari (saqlanmagan), faqat ma'lumoti bor kunlar"""
+        lo, hi = day_bounds(start, end)
+        paid = Q(status__in=Order.PAID_STATUSES)
+        rows = {}
+
+        def row(day):
+            if day not in rows:
+                rows[day] = DailySalesFact(day=day)
+            return rows[day]
+
+        orders = (
+            Order.objects.filter(created_at__gte=lo, created_at__lt=hi).exclude(status="in_cart")
+            .annotate(day=TruncDate("created_at")).values("day")
+            .annotate(
+                orders=Count("id"),
+                **{column: Count("id", filter=Q(status=status)) for status, column in STATUS_COLUMNS.items()},
+                revenue=Sum("total_amount", filter=paid),
+                loyalty_spent=Sum("loyalty_payment", filter=paid),
+            )
+        )
+        for values in orders:
+            fact = row(values.pop("day"))
+            for field, value in values.items():
+                setattr(fact, field, value or 0)
+
+        units = (
+            OrderItem.objects.filter(
+                order__created_at__gte=lo, order__created_at__lt=hi, order__status__in=Order.PAID_STATUSES
+            )
+            .annotate(day=TruncDate("order__created_at")).values("day")
+            .annotate(total=Sum("quantity"))
+        )
+        for values in units:
+            row(values["day"]).units_sold = values["total"] or 0
+
+        customers = (
+            Profile.objects.filter(created_at__gte=lo, created_at__lt=hi)
+            .annotate(day=TruncDate("created_at")).values("day")
+            .annotate(total=Count("id"))
+        )
+        for values in customers:
+            row(values["day"]).new_customers = values["total"]
+
+        return [rows[day] for day in sorted(rows)]
+
+    @classmethod
+    def rebuild(cls, start, end):
+        """Oraliqdagi qatorlarni qaytadan hisoblab almashtiradi; yozilgan qatorlar sonini qaytaradi"""
+        facts = cls.compute(start, end)
+        with transaction.atomic():
+            DailySalesFact.objects.filter(day__gte=start, day__lte=end).delete()
+            DailySalesFact.objects.bulk_create(facts, batch_size=500)
+        return len(facts)
+
+    @staticmethod
+    def series(days):
+        """Oxirgi `days` kun (bugun ham) uchun qatorlar; ma'lumot yo'q kunlar nol bilan"""
+        end = timezone.localdate()
+        start = end - timedelta(days=days - 1)
+        facts = {
+            fact["day"]: fact
+            for fact in DailySalesFact.objects.filter(day__gte=start, day__lte=end).values("day", *SERIES_FIELDS)
+        }
+        empty = {field: 0 for field in SERIES_FIELDS}
+        series = []
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            series.append({**empty, **facts.get(day, {}), "day": day})
+        return series
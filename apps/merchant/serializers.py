@@ -1,11 +1,12 @@
 from rest_framework import serializers
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from apps.product.serializers import (
     ProductItemSerializer,
 )
-from .models import Bonus, LoyaltyCard, Referral, LoyaltyPendingBonus
+from .models import Bonus, LoyaltyCard, Referral, LoyaltyPendingBonus, LoyaltyLedger
 from apps.product.models import Phone, Ticket, Good
 from .models import Order, OrderItem, Information, Service, SocialMedia
+from .base import OrderItemPresenter
 from ..customer.models import Profile, Location
 
 
@@ -15,6 +16,14 @@ class CustomPageNumberPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class LoyaltyLedgerCursorPagination(CursorPagination):
+    # COUNT(*) so'rovisiz, (profile, created_at) indeksi bo'yicha sahifalash
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-created_at", "-id")
+
+
 class OrderCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
@@ -89,63 +98,19 @@ class OrderListSerializer(serializers.ModelSerializer):
         ]
 
     def get_products_details(self, obj):
-        request = self.context.get('request')
+        presenter = OrderItemPresenter(self.context.get('request'))
         result = []
-
-        for item in obj.orderitem.all():
-            p = item.product  # ProductItem obyekti
-            if p:
-                # 1. Mahsulot nomlarini 4 tilda yig'amiz
-                names = {"uz": "Noma'lum", "ru": "Неизвестно", "en": "Unknown", "ko": "알 수 없음"}
-
-                if hasattr(p, 'phones'):
-                    names = {
-                        "uz": getattr(p.phones, 'model_name_uz', p.phones.model_name),
-                        "ru": getattr(p.phones, 'model_name_ru', p.phones.model_name),
-                        "en": getattr(p.phones, 'model_name_en', p.phones.model_name),
-                        "ko": getattr(p.phones, 'model_name_ko', p.phones.model_name),
-                    }
-                elif hasattr(p, 'goods'):
-                    names = {
-                        "uz": getattr(p.goods, 'name_uz', p.goods.name),
-                        "ru": getattr(p.goods, 'name_ru', p.goods.name),
-                        "en": getattr(p.goods, 'name_en', p.goods.name),
-                        "ko": getattr(p.goods, 'name_ko', p.goods.name),
-                    }
-                elif hasattr(p, 'tickets'):
-                    names = {
-                        "uz": getattr(p.tickets, 'event_name_uz', p.tickets.event_name),
-                        "ru": getattr(p.tickets, 'event_name_ru', p.tickets.event_name),
-                        "en": getattr(p.tickets, 'event_name_en', p.tickets.event_name),
-                        "ko": getattr(p.tickets, 'event_name_ko', p.tickets.event_name),
-                    }
-
-                # 2. Tavsiflarni (ProductItem modelidagi desc) 4 tilda yig'amiz
-                descriptions = {
-                    "uz": getattr(p, 'desc_uz', p.desc),
-                    "ru": getattr(p, 'desc_ru', p.desc),
-                    "en": getattr(p, 'desc_en', p.desc),
-                    "ko": getattr(p, 'desc_ko', p.desc),
-                }
-
-                # 3. Mahsulot rasmlarini to'liq URL bilan olish
-                images = []
-                for img_obj in p.images.all():
-                    if img_obj.image:
-                        full_url = request.build_absolute_uri(img_obj.image.url) if request else img_obj.image.url
-                        images.append(full_url)
-
-                # 4. Barcha ma'lumotlarni yig'ish
-                result.append({
-                    "id": p.id,
-                    "names": names,  # 4 tildagi nomlar
-                    "quantity": item.quantity,
-                    "price": float(p.new_price or p.old_price),
-                    "total_price": float((p.new_price or p.old_price) * item.quantity),
-                    "measure": p.get_measure_display(),
-                    "images": images,
-                    "descriptions": descriptions  # 4 tildagi tavsiflar
-                })
+        for row in presenter.present_order(obj):
+            result.append({
+                "id": row["product_id"],
+                "names": row["names"],  # 4 tildagi nomlar
+                "quantity": row["quantity"],
+                "price": row["price"],
+                "total_price": row["total_price"],
+                "measure": row["measure"],
+                "images": row["images"],
+                "descriptions": row["descriptions"]  # 4 tildagi tavsiflar
+            })
         return result
 
 
@@ -310,6 +275,21 @@ class CartAddSerializer(serializers.Serializer):
     quantity = serializers.IntegerField()
 
 
+class CartBatchItemSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, help_text="Yangi miqdor (0 bo'lsa o'chadi)")
+
+
+class CartBatchSerializer(serializers.Serializer):
+    items = CartBatchItemSerializer(many=True, allow_empty=False, max_length=200)
+
+    def validate_items(self, items):
+        ids = [item["product_id"] for item in items]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Har bir mahsulot ro'yxatda bir marta bo'lishi kerak")
+        return items
+
+
 class CheckoutSerializer(serializers.Serializer):
     # Bu maydon ID qabul qiladi (masalan: 5), lekin bizga Location obyektini beradi
     location = serializers.PrimaryKeyRelatedField(queryset=Location.objects.all())
@@ -358,58 +338,19 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         return "Karta biriktirilmagan"
 
     def get_items(self, obj):
-        request = self.context.get('request')
+        presenter = OrderItemPresenter(self.context.get('request'))
         result = []
-
-        for item in obj.orderitem.all():
-            p = item.product  # ProductItem obyekti
-            if p:
-                # 2. Mahsulot nomlarini 4 tilda yig'amiz (Phone, Good yoki Ticket bo'lishiga qarab)
-                names = {"uz": "Noma'lum", "ru": "Неизвестно", "en": "Unknown", "ko": "알 수 없음"}
-
-                if hasattr(p, 'phones'):
-                    names = {
-                        "uz": getattr(p.phones, 'model_name_uz', p.phones.model_name),
-                        "ru": getattr(p.phones, 'model_name_ru', p.phones.model_name),
-                        "en": getattr(p.phones, 'model_name_en', p.phones.model_name),
-                        "ko": getattr(p.phones, 'model_name_ko', p.phones.model_name),
-                    }
-                elif hasattr(p, 'goods'):
-                    names = {
-                        "uz": getattr(p.goods, 'name_uz', p.goods.name),
-                        "ru": getattr(p.goods, 'name_ru', p.goods.name),
-                        "en": getattr(p.goods, 'name_en', p.goods.name),
-                        "ko": getattr(p.goods, 'name_ko', p.goods.name),
-                    }
-                elif hasattr(p, 'tickets'):
-                    names = {
-                        "uz": getattr(p.tickets, 'event_name_uz', p.tickets.event_name),
-                        "ru": getattr(p.tickets, 'event_name_ru', p.tickets.event_name),
-                        "en": getattr(p.tickets, 'event_name_en', p.tickets.event_name),
-                        "ko": getattr(p.tickets, 'event_name_ko', p.tickets.event_name),
-                    }
-
-                # 3. Mahsulot tavsifini (desc) 4 tilda olamiz
-                descriptions = {
-                    "uz": getattr(p, 'desc_uz', p.desc),
-                    "ru": getattr(p, 'desc_ru', p.desc),
-                    "en": getattr(p, 'desc_en', p.desc),
-                    "ko": getattr(p, 'desc_ko', p.desc),
-                }
-
-                # 4. Rasmlarni to'liq URL bilan olish
-                product_images = [request.build_absolute_uri(img.image.url) for img in p.images.all() if img.image]
-
-                result.append({
-                    "product_id": p.id,
-                    "names": names,  # 4 ta tilda nomlar shu yerda
-                    "quantity": item.quantity,
-                    "price": float(p.new_price or p.old_price),
-                    "total_item_price": float((p.new_price or p.old_price) * item.quantity),
-                    "images": product_images,
-                    "measure": p.get_measure_display(),
-                    "descriptions": descriptions  # 4 ta tilda tavsiflar shu yerda
-                })
+        for row in presenter.present_order(obj):
+            result.append({
+                "product_id": row["product_id"],
+                "names": row["names"],  # 4 ta tilda nomlar shu yerda
+                "quantity": row["quantity"],
+                "price": row["price"],
+                "total_item_price": row["total_price"],
+                "images": row["images"],
+                "measure": row["measure"],
+                "descriptions": row["descriptions"]  # 4 ta tilda tavsiflar shu yerda
+            })
         return result
 
     def get_timeline(self, obj):
@@ -429,41 +370,13 @@ class OrderReceiptUploadSerializer(serializers.ModelSerializer):
         fields = ["payment_receipt"]
 
 
-class LoyaltySpendingHistorySerializer(serializers.ModelSerializer):
-    type = serializers.ReadOnlyField(default="spending")  # Flutterchi farqlashi uchun
+class LoyaltyLedgerSerializer(serializers.ModelSerializer):
+    type = serializers.ReadOnlyField(source='entry_type')  # spending / cashback / referral / adjustment
+    order_number = serializers.ReadOnlyField(source='order.order_number', default=None)
 
     class Meta:
-        model = Order
-        fields = ['order_number', 'loyalty_payment', 'status', 'created_at', 'type']
-
-
-# 2. Shaxsiy zakazdan kelgan cashback (Kirim)
-class LoyaltyEarnedHistorySerializer(serializers.ModelSerializer):
-    type = serializers.ReadOnlyField(default="cashback")
-    order_number = serializers.ReadOnlyField(source='order.order_number')
-
-    class Meta:
-        model = LoyaltyPendingBonus
-        fields = ['order_number', 'order_amount', 'percent', 'bonus_amount', 'status', 'created_at', 'type']
-
-
-# 3. Referaldan kelgan bonus (Kirim)
-class ReferralHistorySerializer(serializers.ModelSerializer):
-    type = serializers.ReadOnlyField(default="referral")
-    friend_name = serializers.ReadOnlyField(source='referee.full_name')
-    bonus_amount = serializers.ReadOnlyField(default=5000)  # Siz aytgan 5000 won
-
-    class Meta:
-        model = Referral
-        fields = ['friend_name', 'bonus_amount', 'status', 'created_at', 'type']
-
-
-# 4. UMUMIY HISTORY (Hamma ma'lumotlarni bitta Response ichida qaytarish uchun)
-class LoyaltyFullHistorySerializer(serializers.Serializer):
-    current_balance = serializers.DecimalField(max_digits=20, decimal_places=0)
-    spending_history = LoyaltySpendingHistorySerializer(many=True)
-    cashback_history = LoyaltyEarnedHistorySerializer(many=True)
-    referral_history = ReferralHistorySerializer(many=True)
+        model = LoyaltyLedger
+        fields = ['id', 'type', 'amount', 'balance_after', 'order_number', 'comment', 'created_at']
 
 
 class CartUpdateQuantitySerializer(serializers.Serializer):
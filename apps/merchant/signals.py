@@ -1,10 +1,19 @@
 from datetime import timedelta
 
-from django.db.models.signals import m2m_changed, post_save
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
-from .models import Order, OrderItem, LoyaltyCard, LoyaltyPendingBonus
+from apps.product import cache as catalog_cache
+from apps.product import cache_bus
+from apps.dashboard.kpi import KpiSnapshotService
+from .models import (
+    Order, OrderItem, LoyaltyCard, LoyaltyPendingBonus,
+    BankCardModel, Information, Service, SocialMedia, order_status_changed,
+)
+from .loyalty import LoyaltyLedgerService
+from .sales import SalesFactService
 from ..customer.models import Profile
 
 
@@ -66,11 +75,51 @@ def update_loyalty_card_balance(sender, instance, created, **kwargs):
 
     # Условия начисления
     if instance.status == "approved" and instance.bonus_amount > 0:
-        card, _ = LoyaltyCard.objects.get_or_create(
-            profile=instance.profile
-        )
+        # Bonus qayta saqlansa ham cashback bir marta yoziladi
+        LoyaltyLedgerService.credit_for_bonus(instance)
 
-        card.current_balance += instance.bonus_amount
-        card.save()
 
+# Sozlama jadvallari worker'lar xotirasida keshlanadi: o'zgarsa hammasiga xabar beramiz
+CONFIG_MODELS = (BankCardModel, Information, Service, SocialMedia)
 
+
+def invalidate_config_cache(sender, **kwargs):
+    cache_bus.publish(catalog_cache.CONFIG)
+
+
+for _model in CONFIG_MODELS:
+    post_save.connect(invalidate_config_cache, sender=_model, dispatch_uid=f"config-save-{_model.__name__}")
+    post_delete.connect(invalidate_config_cache, sender=_model, dispatch_uid=f"config-delete-{_model.__name__}")
+
+
+
+# Kunlik statistika buyurtma bilan bitta tranzaksiyada yangilanadi
+@receiver(order_status_changed, sender=Order, dispatch_uid="sales-fact-order-transition")
+def sales_fact_order_transition(sender, order, old_status, **kwargs):
+    SalesFactService.record_transition(order, old_status)
+
+
+@receiver(post_save, sender=Profile, dispatch_uid="sales-fact-new-customer")
+def sales_fact_new_customer(sender, instance, created, **kwargs):
+    if created:
+        SalesFactService.record_new_customer(instance)
+
+
+# Dashboard KPI snapshot'i hodisalar bilan yangilanadi (apps.dashboard.kpi)
+@receiver(order_status_changed, sender=Order, dispatch_uid="kpi-order-transition")
+def kpi_order_transition(sender, order, old_status, **kwargs):
+    # Qiymatlar hozir olinadi: commit'gacha order yana o'zgarishi mumkin
+    args = (old_status, order.status, order.total_amount, order.created_at)
+    transaction.on_commit(lambda: KpiSnapshotService.order_transition(*args))
+
+
+@receiver(post_save, sender=Profile, dispatch_uid="kpi-profile-created")
+def kpi_profile_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: KpiSnapshotService.adjust(customers=1, customers_today=1))
+
+
+@receiver(post_save, sender=LoyaltyPendingBonus, dispatch_uid="kpi-pending-bonus")
+def kpi_pending_bonus_created(sender, instance, created, **kwargs):
+    if created and instance.status == "pending":
+        transaction.on_commit(lambda: KpiSnapshotService.adjust(pending_bonuses=1))
@@ -1,10 +1,40 @@
+import asyncio
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.apps import apps as django_apps
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image as PILImage
 from rest_framework.test import APIClient
 
 from apps.customer.models import Profile
-from apps.merchant.models import Order, OrderItem
-from apps.product.models import ProductItem
+from apps.dashboard import kpi
+from apps.dashboard.kpi import KpiSnapshotService
+from apps.merchant import events as order_events
+from apps.merchant.bulk_status import OrderBulkStatusService
+from apps.merchant.picklist import PickListService
+from apps.merchant.receipts import ReceiptService
+from apps.merchant.loyalty import InsufficientLoyaltyBalance, LoyaltyLedgerService
+from apps.merchant.sales import SalesFactService
+from apps.merchant.models import (
+	DailySalesFact, IdempotencyKey, LoyaltyCard, LoyaltyLedger, LoyaltyPendingBonus, Order, OrderItem, Referral,
+)
+from apps.product.models import Good, Image, ProductItem, SoldProduct
 
 
 class CartDeleteBehaviorTests(TestCase):
@@ -73,3 +103,911 @@ class CartDeleteBehaviorTests(TestCase):
 
 		self.assertEqual(response.status_code, 204)
 		self.assertFalse(Order.objects.filter(pk=non_cart_order.pk).exists())
+
+
+@mock.patch("apps.product.signals.send_fcm_notification")
+class OrderItemPresenterQueryTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(username="998901110000", password="testpass123")
+		self.profile = Profile.objects.create(origin=self.user, full_name="Presenter User", phone_number="998901110000")
+		self.client.force_authenticate(user=self.user)
+
+	def _create_order(self):
+		order = Order.objects.create(user=self.profile, status="pending")
+		for i in range(3):
+			product = ProductItem.objects.create(desc=f"Product {i}", old_price=1000, new_price=900)
+			Good.objects.create(product=product, name=f"Good {i}")
+			Image.objects.create(product=product, name=f"Image {i}")
+			OrderItem.objects.create(order=order, product=product, quantity=2)
+		return order
+
+	def _count_queries(self, url):
+		with CaptureQueriesContext(connection) as ctx:
+			response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		return len(ctx.captured_queries), response
+
+	def test_my_orders_list_query_count_does_not_grow_with_orders(self, _fcm):
+		self._create_order()
+		single, _ = self._count_queries("/api/merchant/orders/")
+
+		for _ in range(4):
+			self._create_order()
+		many, response = self._count_queries("/api/merchant/orders/")
+
+		self.assertEqual(single, many)
+		first = response.data["results"][0]["products_details"][0]
+		self.assertEqual(first["names"]["en"], "Good 0")
+		self.assertEqual(first["total_price"], 1800.0)
+
+	def test_my_order_detail_items(self, _fcm):
+		order = self._create_order()
+		_, response = self._count_queries(f"/api/merchant/orders/{order.id}/")
+
+		items = response.data["items"]
+		self.assertEqual(len(items), 3)
+		self.assertEqual(items[0]["names"]["en"], "Good 0")
+		self.assertEqual(items[0]["total_item_price"], 1800.0)
+
+
+@mock.patch("apps.product.signals.send_fcm_notification")
+class LoyaltyLedgerTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(username="998901119999", password="testpass123")
+		self.profile = Profile.objects.create(origin=self.user, full_name="Ledger User", phone_number="998901119999")
+		self.client.force_authenticate(user=self.user)
+
+	def test_entries_keep_running_balance(self, _fcm):
+		LoyaltyLedgerService.credit(self.profile, 5000, "referral")
+		LoyaltyLedgerService.apply(self.profile, -1500, "spending")
+		entry = LoyaltyLedgerService.credit(self.profile, 200, "cashback")
+
+		self.assertEqual(entry.balance_after, Decimal("3700"))
+		self.profile.loyalty_card.refresh_from_db()
+		self.assertEqual(self.profile.loyalty_card.current_balance, Decimal("3700"))
+
+	def test_history_is_cursor_paginated(self, _fcm):
+		for _ in range(3):
+			LoyaltyLedgerService.credit(self.profile, 100, "cashback")
+
+		response = self.client.get("/api/merchant/loyalty/history/?page_size=2")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(len(response.data["results"]), 2)
+		self.assertIsNotNone(response.data["next"])
+		self.assertEqual(response.data["current_balance"], Decimal("300"))
+		self.assertEqual(response.data["results"][0]["balance_after"], "300.00")
+
+	def test_reconcile_reports_and_fixes_drift(self, _fcm):
+		LoyaltyLedgerService.credit(self.profile, 100, "cashback")
+		LoyaltyCard.objects.filter(profile=self.profile).update(current_balance=250)
+
+		out = StringIO()
+		call_command("reconcile_loyalty_ledger", "--fix", stdout=out)
+		self.assertIn("1 mismatched", out.getvalue())
+
+		out = StringIO()
+		call_command("reconcile_loyalty_ledger", stdout=out)
+		self.assertIn("0 mismatched", out.getvalue())
+
+	def test_legacy_loyalty_order_is_not_debited_again(self, _fcm):
+		migration = import_module("apps.merchant.migrations.0002_loyaltyledger")
+
+		# Ledger'dan oldingi buyurtma: karta allaqachon yechilgan, jurnal yozuvi yo'q
+		LoyaltyLedgerService.credit(self.profile, 600, "referral")
+		order = Order.objects.create(user=self.profile, status="pending")
+		Order.objects.filter(pk=order.pk).update(loyalty_payment=400)
+		migration.mark_legacy_spending(django_apps, None)
+
+		order.refresh_from_db()
+		order.save()
+		self.assertEqual(LoyaltyCard.objects.get(profile=self.profile).current_balance, Decimal("600"))
+		self.assertEqual(LoyaltyLedger.objects.get(order=order).amount, 0)
+
+	def test_order_debit_is_conditional_and_idempotent(self, _fcm):
+		LoyaltyLedgerService.credit(self.profile, 1000, "referral")
+		order = Order.objects.create(user=self.profile, status="payment_pending")
+
+		with self.assertRaises(InsufficientLoyaltyBalance):
+			LoyaltyLedgerService.debit_for_order(order, 5000)
+
+		first = LoyaltyLedgerService.debit_for_order(order, 400)
+		replay = LoyaltyLedgerService.debit_for_order(order, 400)
+		self.assertEqual(first.pk, replay.pk)
+		self.assertEqual(first.balance_after, Decimal("600"))
+
+		# Order.save endi har saqlashda qayta yechmaydi
+		order.loyalty_payment = 400
+		order.save()
+		order.save()
+		balance = LoyaltyCard.objects.get(profile=self.profile).current_balance
+		self.assertEqual(balance, Decimal("600"))
+
+	def _pending_bonus(self, amount):
+		order = Order.objects.create(user=self.profile, status="pending")
+		return LoyaltyPendingBonus.objects.create(
+			profile=self.profile, order=order, order_name=f"Order {order.pk}", order_amount=amount
+		)
+
+	def test_bulk_approval_credits_once(self, _fcm):
+		first = self._pending_bonus(10000)
+		second = self._pending_bonus(5000)
+
+		approved = LoyaltyLedgerService.approve_bonuses([first.pk, second.pk], 10)
+		self.assertEqual(approved, 2)
+		# Qayta yuborilgan so'rov hech narsani o'zgartirmaydi
+		self.assertEqual(LoyaltyLedgerService.approve_bonuses([first.pk, second.pk], 10), 0)
+
+		balance = LoyaltyCard.objects.get(profile=self.profile).current_balance
+		self.assertEqual(balance, Decimal("1500"))
+		entries = LoyaltyLedger.objects.filter(profile=self.profile).order_by("pk")
+		self.assertEqual([e.balance_after for e in entries], [Decimal("1000"), Decimal("1500")])
+
+		# Tasdiqlangan bonusni qayta saqlash signal orqali ikkinchi marta to'ldirmaydi
+		first.refresh_from_db()
+		first.save()
+		balance = LoyaltyCard.objects.get(profile=self.profile).current_balance
+		self.assertEqual(balance, Decimal("1500"))
+
+	def test_rollover_advances_expired_cycles(self, _fcm):
+		today = timezone.localdate()
+		LoyaltyCard.objects.filter(profile=self.profile).update(
+			cycle_start=today - timedelta(days=70), cycle_end=today - timedelta(days=10)
+		)
+
+		out = StringIO()
+		call_command("rollover_loyalty_cycles", "--batch-size", "1", stdout=out)
+		self.assertIn("Rolled over 1 cards", out.getvalue())
+
+		card = LoyaltyCard.objects.get(profile=self.profile)
+		self.assertEqual(card.cycle_number, 2)
+		self.assertEqual(card.cycle_start, today)
+		self.assertEqual(card.cycle_end, today + timedelta(days=card.cycle_days))
+
+
+@mock.patch("apps.product.signals.send_fcm_notification")
+class IdempotencyKeyTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(username="998901117777", password="testpass123")
+		self.profile = Profile.objects.create(origin=self.user, full_name="Retry User", phone_number="998901117777")
+		with mock.patch("apps.product.signals.send_fcm_notification"):
+			self.product = ProductItem.objects.create(desc="Retry product", old_price=1000, new_price=900, available_quantity=10)
+		self.client.force_authenticate(user=self.user)
+
+	def test_duplicate_key_replays_stored_response(self, _fcm):
+		payload = {"product": self.product.pk, "quantity": 2}
+		first = self.client.post("/api/merchant/cart/manage/", payload, format="json", HTTP_IDEMPOTENCY_KEY="cart-1")
+		self.assertEqual(first.status_code, 200)
+
+		with CaptureQueriesContext(connection) as ctx:
+			second = self.client.post("/api/merchant/cart/manage/", payload, format="json", HTTP_IDEMPOTENCY_KEY="cart-1")
+		self.assertEqual(second.status_code, 200)
+		self.assertEqual(second["Idempotent-Replayed"], "true")
+		self.assertEqual(second.json(), first.json())
+		# Qayta yuborilgan so'rov buyurtma jadvallariga tegmaydi
+		self.assertFalse(any("merchant_order" in q["sql"] for q in ctx.captured_queries))
+		self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+	def test_key_reused_with_other_payload_is_rejected(self, _fcm):
+		url = "/api/merchant/cart/manage/"
+		self.client.post(url, {"product": self.product.pk, "quantity": 1}, format="json", HTTP_IDEMPOTENCY_KEY="cart-2")
+		response = self.client.post(url, {"product": self.product.pk, "quantity": 5}, format="json", HTTP_IDEMPOTENCY_KEY="cart-2")
+		self.assertEqual(response.status_code, 422)
+		self.assertEqual(OrderItem.objects.get(order__user=self.profile).quantity, 1)
+
+
+@mock.patch("apps.product.signals.send_fcm_notification")
+class ReceiptUploadTests(TestCase):
+	def setUp(self):
+		self.media = tempfile.TemporaryDirectory()
+		self.addCleanup(self.media.cleanup)
+		settings_override = override_settings(MEDIA_ROOT=self.media.name, RECEIPT_PROCESS_ASYNC=False)
+		settings_override.enable()
+		self.addCleanup(settings_override.disable)
+
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(username="998901116666", password="testpass123")
+		self.profile = Profile.objects.create(origin=self.user, full_name="Receipt User", phone_number="998901116666")
+		self.order = Order.objects.create(user=self.profile, status="payment_pending")
+		self.client.force_authenticate(user=self.user)
+
+	def _photo(self):
+		buf = BytesIO()
+		PILImage.new("RGB", (4000, 3000), "white").save(buf, "PNG")
+		return SimpleUploadedFile("photo.png", buf.getvalue(), content_type="image/png")
+
+	def test_receipt_is_normalized_after_commit(self, _fcm):
+		with self.captureOnCommitCallbacks(execute=True):
+			response = self.client.post(
+				"/api/merchant/order/upload-receipt/",
+				{"order_id": self.order.pk, "payment_receipt": self._photo()},
+				format="multipart",
+			)
+		self.assertEqual(response.status_code, 200)
+
+		self.order.refresh_from_db()
+		self.assertEqual(self.order.status, "pending")
+		self.assertEqual(len(self.order.receipt_hash), 64)
+		self.assertTrue(self.order.payment_receipt.name.endswith(f"{self.order.receipt_hash}.jpg"))
+		with PILImage.open(self.order.payment_receipt.path) as img:
+			self.assertEqual(max(img.size), 1600)
+			self.assertEqual(img.format, "JPEG")
+		self.assertEqual(self.order.staged_receipt, "")
+
+	def upload(self):
+		return self.client.post(
+			"/api/merchant/order/upload-receipt/",
+			{"order_id": self.order.pk, "payment_receipt": self._photo()},
+			format="multipart",
+		)
+
+	def test_older_upload_finishing_last_does_not_replace_newer(self, _fcm):
+		staged = []
+		for color in ("white", "black"):
+			buf = BytesIO()
+			PILImage.new("RGB", (40, 30), color).save(buf, "PNG")
+			upload = SimpleUploadedFile("photo.png", buf.getvalue(), content_type="image/png")
+			self.client.post(
+				"/api/merchant/order/upload-receipt/",
+				{"order_id": self.order.pk, "payment_receipt": upload},
+				format="multipart",
+			)
+			self.order.refresh_from_db()
+			staged.append(self.order.staged_receipt)
+			# Qayta yuklash uchun status yana to'lov kutilmoqda
+			Order.objects.filter(pk=self.order.pk).update(status="payment_pending")
+		older, newer = staged
+
+		newest = ReceiptService.process(self.order.pk, newer)
+		self.assertIsNone(ReceiptService.process(self.order.pk, older))
+
+		self.order.refresh_from_db()
+		self.assertEqual(self.order.payment_receipt.name, newest)
+		self.assertEqual(self.order.staged_receipt, "")
+		# Eski chekning tayyor fayli ham, vaqtinchaligi ham qolmaydi
+		final = [
+			f"receipts/{folder}/{name}"
+			for folder in default_storage.listdir("receipts")[0] if folder != "incoming"
+			for name in default_storage.listdir(f"receipts/{folder}")[1]
+		]
+		self.assertEqual(final, [newest])
+		self.assertFalse(default_storage.listdir("receipts/incoming")[1])
+
+	def test_lost_background_job_is_reprocessed_by_command(self, _fcm):
+		# on_commit bajarilmaydi — fon oqimi yo'qolgandek
+		self.assertEqual(self.upload().status_code, 200)
+		self.order.refresh_from_db()
+		self.assertFalse(self.order.payment_receipt)
+		self.assertTrue(self.order.staged_receipt.startswith("receipts/incoming/"))
+		staged = self.order.staged_receipt
+		orphan = default_storage.save("receipts/incoming/orphan.png", ContentFile(b"x"))
+
+		out = StringIO()
+		call_command("reprocess_receipts", "--older-than", "0", stdout=out)
+
+		self.assertIn("Processed 1, failed 0, missing 0, removed 1", out.getvalue())
+		self.order.refresh_from_db()
+		self.assertEqual(self.order.staged_receipt, "")
+		self.assertTrue(self.order.payment_receipt.name.endswith(f"{self.order.receipt_hash}.jpg"))
+		self.assertFalse(default_storage.exists(staged))
+		self.assertFalse(default_storage.exists(orphan))
+
+	def test_staged_file_removed_when_order_save_fails(self, _fcm):
+		with mock.patch.object(Order, "save", side_effect=RuntimeError("db down")):
+			with self.assertRaises(RuntimeError):
+				self.upload()
+		_, files = default_storage.listdir("receipts/incoming")
+		self.assertEqual(files, [])
+		self.order.refresh_from_db()
+		self.assertEqual(self.order.staged_receipt, "")
+
+
+@mock.patch("apps.product.signals.send_fcm_notification")
+class CartBatchTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(username="998901115555", password="testpass123")
+		self.profile = Profile.objects.create(origin=self.user, full_name="Batch User", phone_number="998901115555")
+		with mock.patch("apps.product.signals.send_fcm_notification"):
+			self.products = [
+				ProductItem.objects.create(desc=f"Batch {i}", old_price=1000, new_price=800 if i else 0, available_quantity=5)
+				for i in range(3)
+			]
+		self.client.force_authenticate(user=self.user)
+
+	def post(self, items):
+		return self.client.post("/api/merchant/cart/batch/", {"items": items}, format="json")
+
+	def test_batch_upserts_removes_and_returns_cart(self, _fcm):
+		p0, p1, p2 = self.products
+		self.assertEqual(self.post([{"product_id": p0.pk, "quantity": 1}, {"product_id": p1.pk, "quantity": 2}]).status_code, 200)
+
+		response = self.post([
+			{"product_id": p0.pk, "quantity": 3},
+			{"product_id": p1.pk, "quantity": 0},
+			{"product_id": p2.pk, "quantity": 1},
+		])
+		self.assertEqual(response.status_code, 200)
+		quantities = {row["product_id"]: row["quantity"] for row in response.data["items"]}
+		self.assertEqual(quantities, {p0.pk: 3, p2.pk: 1})
+		# 3 * 1000 (chegirmasiz) + 1 * 800
+		self.assertEqual(response.data["total_amount"], Decimal("3800"))
+		self.assertEqual(OrderItem.objects.filter(order__user=self.profile).count(), 2)
+
+	def test_stock_violation_rejects_whole_batch(self, _fcm):
+		p0, p1, _ = self.products
+		response = self.post([{"product_id": p0.pk, "quantity": 1}, {"product_id": p1.pk, "quantity": 50}])
+		self.assertEqual(response.status_code, 400)
+		self.assertIn(p1.pk, response.data["items"])
+		self.assertFalse(OrderItem.objects.filter(order__user=self.profile).exists())
+
+
+
+@mock.patch("apps.product.signals.send_fcm_notification")
+class KpiSnapshotTests(TestCase):
+	def setUp(self):
+		cache.delete(kpi.SNAPSHOT_KEY)
+		self.addCleanup(cache.delete, kpi.SNAPSHOT_KEY)
+		user = get_user_model().objects.create_user(username="998901116666", password="testpass123")
+		self.profile = Profile.objects.create(origin=user, full_name="Kpi User", phone_number="998901116666")
+		with mock.patch("apps.product.signals.send_fcm_notification"):
+			self.product = ProductItem.objects.create(desc="Kpi", old_price=1000, new_price=0, available_quantity=50)
+
+	def order(self, status, quantity=1):
+		order = Order.objects.create(user=self.profile, status="in_cart")
+		OrderItem.objects.create(order=order, product=self.product, quantity=quantity)
+		order.status = status
+		order.save()
+		return order
+
+	def counters(self, snapshot):
+		return {key: value for key, value in snapshot.items() if key not in ("computed_at", "chart_data")}
+
+	def test_compute_uses_two_aggregate_queries(self, _fcm):
+		self.order("pending")
+		self.order("check_pending", 2)
+		approved = self.order("approved", 3)
+		self.order("cancelled")
+		LoyaltyPendingBonus.objects.create(
+			profile=self.profile, order=approved, order_name="Kpi", order_amount=3000, status="pending"
+		)
+
+		with self.assertNumQueries(2):
+			snapshot = {**KpiSnapshotService._order_counters(kpi.start_of_today()),
+						**KpiSnapshotService._customer_counters(kpi.start_of_today())}
+
+		self.assertEqual(snapshot["pending_orders"], 1)
+		self.assertEqual(snapshot["check_pending"], 1)
+		self.assertEqual(snapshot["order_today_count"], 4)
+		self.assertEqual(snapshot["revenue_today"], Decimal("3000"))
+		self.assertEqual(snapshot["total_revenue"], Decimal("3000"))
+		self.assertEqual((snapshot["customers"], snapshot["customers_today"]), (1, 1))
+		self.assertEqual(snapshot["pending_bonuses"], 1)
+
+	def test_cached_snapshot_follows_events(self, _fcm):
+		pending = self.order("pending")
+		KpiSnapshotService.get()
+
+		with self.assertNumQueries(0):
+			KpiSnapshotService.get()
+
+		with self.captureOnCommitCallbacks(execute=True):
+			pending.status = "approved"
+			pending.save()
+			self.order("check_pending", 2)
+			other = get_user_model().objects.create_user(username="998901117777", password="testpass123")
+			Profile.objects.create(origin=other, full_name="Kpi User 2", phone_number="998901117777")
+
+		cached = KpiSnapshotService.get()
+		self.assertEqual(self.counters(cached), self.counters(KpiSnapshotService.compute()))
+		self.assertEqual(cached["total_revenue"], Decimal("1000"))
+		self.assertEqual(cached["customers"], 2)
+
+		bonus_ids = list(LoyaltyPendingBonus.objects.values_list("id", flat=True))
+		KpiSnapshotService.adjust(pending_bonuses=-LoyaltyLedgerService.approve_bonuses(bonus_ids, 5))
+		self.assertEqual(KpiSnapshotService.get()["pending_bonuses"], 0)
+
+	def test_snapshot_is_recomputed_on_new_day(self, _fcm):
+		KpiSnapshotService.get()
+		snapshot = cache.get(kpi.SNAPSHOT_KEY)
+		snapshot["day"] = "2000-01-01"
+		snapshot["pending_orders"] = 99
+		cache.set(kpi.SNAPSHOT_KEY, snapshot, kpi.SNAPSHOT_TTL)
+
+		# Eskirgan snapshot'ga o'zgarish qo'shilmaydi, get() qayta hisoblaydi
+		KpiSnapshotService.adjust(pending_orders=1)
+		self.assertEqual(cache.get(kpi.SNAPSHOT_KEY)["pending_orders"], 99)
+		self.assertEqual(KpiSnapshotService.get()["pending_orders"], 0)
+
+
+@mock.patch("apps.product.signals.send_fcm_notification")
+class SalesFactTests(TestCase):
+	FIELDS = ("orders", "orders_pending", "orders_approved", "orders_cancelled", "revenue", "units_sold", "loyalty_spent", "new_customers")
+
+	def setUp(self):
+		self.django_user = get_user_model().objects.create_user(username="998901118888", password="testpass123")
+		self.profile = Profile.objects.create(origin=self.django_user, full_name="Sales User", phone_number="998901118888")
+		with mock.patch("apps.product.signals.send_fcm_notification"):
+			self.product = ProductItem.objects.create(desc="Sales", old_price=1000, new_price=0, available_quantity=50)
+
+	def order(self, *statuses, quantity=1):
+		order = Order.objects.create(user=self.profile, status="in_cart")
+		OrderItem.objects.create(order=order, product=self.product, quantity=quantity)
+		for status in statuses:
+			order.status = status
+			order.save()
+		return order
+
+	def facts(self, day):
+		return DailySalesFact.objects.filter(day=day).values(*self.FIELDS).get()
+
+	def test_incremental_rows_match_rebuild(self, _fcm):
+		self.order("pending", "approved", quantity=3)
+		self.order("pending", "approved", "sent", quantity=2)
+		self.order("pending", "cancelled")
+		self.order("pending", "approved", "cancelled")
+		self.order()  # savat hisobga kirmaydi
+		today = timezone.localdate()
+
+		incremental = self.facts(today)
+		self.assertEqual(incremental["orders"], 4)
+		self.assertEqual((incremental["orders_approved"], incremental["orders_cancelled"]), (1, 2))
+		self.assertEqual((incremental["revenue"], incremental["units_sold"]), (Decimal("5000"), 5))
+		self.assertEqual(incremental["new_customers"], 1)
+
+		self.assertEqual(SalesFactService.rebuild(today, today), 1)
+		self.assertEqual(self.facts(today), incremental)
+
+	@override_settings(TIME_ZONE="Asia/Tashkent")
+	def test_days_follow_time_zone(self, _fcm):
+		order = self.order("pending", "approved")
+		# 20:30 UTC = Toshkentda ertasi kun 01:30
+		Order.objects.filter(pk=order.pk).update(created_at=datetime(2026, 3, 1, 20, 30, tzinfo=dt_timezone.utc))
+		out = StringIO()
+		call_command("rebuild_sales_facts", "--from", "2026-03-01", "--to", "2026-03-02", stdout=out)
+
+		self.assertFalse(DailySalesFact.objects.filter(day="2026-03-01").exists())
+		self.assertEqual(self.facts("2026-03-02")["orders_approved"], 1)
+		self.assertIn("1 days with data", out.getvalue())
+
+	def test_series_endpoint_fills_missing_days(self, _fcm):
+		self.order("pending", "approved")
+		self.client.force_login(self.django_user)
+
+		response = self.client.get("/dashboard/sales-series/", {"days": 7})
+		self.assertEqual(response.status_code, 200)
+		series = response.json()["series"]
+		self.assertEqual(len(series), 7)
+		self.assertEqual(series[-1]["day"], timezone.localdate().isoformat())
+		self.assertEqual((series[-1]["orders"], series[-1]["revenue"]), (1, "1000"))
+		self.assertEqual(series[0]["orders"], 0)
+
+		self.assertEqual(self.client.get("/dashboard/sales-series/", {"days": 12}).status_code, 400)
+
+	def test_dashboard_page_renders_sales_chart(self, _fcm):
+		self.client.force_login(self.django_user)
+		response = self.client.get("/dashboard/")
+		self.assertEqual(response.status_code, 200)
+		self.assertContains(response, 'id="salesChart" data-url="/dashboard/sales-series/"')
+		for days in (7, 30, 365):
+			self.assertContains(response, f'data-days="{days}"')
+
+
+class OrderSearchTests(TestCase):
+	def setUp(self):
+		admin = get_user_model().objects.create_user(username="staff", password="testpass123", is_staff=True)
+		self.client.force_login(admin)
+		self.orders = {}
+		for phone, name in (("998903330001", "Alisher"), ("998903330002", "Bobur")):
+			user = get_user_model().objects.create_user(username=phone, password="testpass123")
+			profile = Profile.objects.create(origin=user, full_name=name, phone_number=phone)
+			profile.location.create(address=f"{name} uyi")
+			self.orders[name] = [
+				Order.objects.create(user=profile, status=status) for status in ("pending", "approved")
+			]
+
+	def ids(self, **params):
+		response = self.client.get("/dashboard/orders/", params)
+		self.assertEqual(response.status_code, 200)
+		return sorted(order.id for order in response.context["orders"])
+
+	def test_routes_input_to_id_number_phone_and_name(self):
+		first = self.orders["Alisher"][0]
+		self.assertEqual(self.ids(q=str(first.id)), [first.id])
+		self.assertEqual(self.ids(q=first.order_number.lower()), [first.id])
+		self.assertEqual(self.ids(q="90 333 0002"), sorted(o.id for o in self.orders["Bobur"]))
+		self.assertEqual(self.ids(q="ali"), sorted(o.id for o in self.orders["Alisher"]))
+		self.assertEqual(self.ids(q="nobody"), [])
+
+	def test_name_and_phone_match_substrings(self):
+		self.assertEqual(self.ids(q="lish"), sorted(o.id for o in self.orders["Alisher"]))
+		self.assertEqual(self.ids(q="3330002"), sorted(o.id for o in self.orders["Bobur"]))
+		self.assertEqual(self.ids(q="3330"), sorted(o.id for orders in self.orders.values() for o in orders))
+
+	def test_status_and_date_filters(self):
+		old = self.orders["Bobur"][1]
+		Order.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=10))
+		today = timezone.localdate().isoformat()
+
+		self.assertEqual(self.ids(status="approved"), sorted(o[1].id for o in self.orders.values()))
+		self.assertEqual(self.ids(status="approved", date_from=today), [self.orders["Alisher"][1].id])
+		self.assertEqual(self.ids(date_to=(timezone.localdate() - timedelta(days=1)).isoformat()), [old.id])
+
+	def test_list_queries_are_constant(self):
+		# session + user + count + sahifa + manzillar
+		with self.assertNumQueries(5):
+			response = self.client.get("/dashboard/orders/")
+		self.assertContains(response, "Alisher uyi")
+
+	def test_status_date_filter_uses_composite_index(self):
+		orders = Order.objects.filter(status="pending", created_at__gte=timezone.now() - timedelta(days=7))
+		with connection.cursor() as cursor:
+			cursor.execute("SET LOCAL enable_seqscan = off")
+			sql, params = orders.order_by("-created_at").query.sql_with_params()
+			cursor.execute(f"EXPLAIN {sql}", params)
+			plan = "\n".join(row[0] for row in cursor.fetchall())
+		self.assertIn("order_status_created_idx", plan)
+
+
+@mock.patch("apps.product.signals.send_fcm_notification")
+class OrderBulkStatusTests(TestCase):
+	def setUp(self):
+		user = get_user_model().objects.create_user(username="998904440001", password="testpass123")
+		self.profile = Profile.objects.create(origin=user, full_name="Bulk Buyer", phone_number="998904440001")
+		with mock.patch("apps.product.signals.send_fcm_notification"):
+			self.milk = ProductItem.objects.create(desc="Milk", old_price=1000, new_price=0, available_quantity=10)
+			self.bread = ProductItem.objects.create(desc="Bread", old_price=500, new_price=400, available_quantity=1)
+
+	def order(self, status="pending", **quantities):
+		order = Order.objects.create(user=self.profile, status="in_cart")
+		for name, quantity in quantities.items():
+			OrderItem.objects.create(order=order, product=getattr(self, name), quantity=quantity)
+		order.status = status
+		order.save()
+		return order
+
+	def test_moves_selection_with_one_update_and_batched_side_effects(self, _fcm):
+		orders = [self.order(milk=2), self.order(milk=1, bread=1), self.order(status="approved", bread=1)]
+		in_cart = Order.objects.create(user=self.profile)
+		ids = [order.pk for order in orders] + [in_cart.pk]
+
+		with mock.patch.object(order_events, "publish_many", wraps=order_events.publish_many) as publish, \
+				self.captureOnCommitCallbacks(execute=True):
+			report = OrderBulkStatusService.apply(ids, "approved")
+
+		self.assertEqual(report, {"updated": 2, "skipped": 2, "bonuses": 2, "products": 0})
+		publish.assert_called_once()
+		self.assertEqual(
+			sorted(Order.objects.filter(pk__in=ids).values_list("status", flat=True)),
+			["approved", "approved", "approved", "in_cart"],
+		)
+		self.assertEqual(
+			set(LoyaltyPendingBonus.objects.values_list("order_id", "order_amount")),
+			{(orders[0].pk, 2000), (orders[1].pk, 1400)},
+		)
+		today = timezone.localdate()
+		incremental = DailySalesFact.objects.filter(day=today).values(*SalesFactTests.FIELDS).get()
+		SalesFactService.rebuild(today, today)
+		self.assertEqual(DailySalesFact.objects.filter(day=today).values(*SalesFactTests.FIELDS).get(), incremental)
+
+	def test_query_count_does_not_grow_with_selection(self, _fcm):
+		small = [self.order(milk=1, bread=1).pk for _ in range(2)]
+		large = [self.order(milk=1, bread=1).pk for _ in range(8)]
+		with CaptureQueriesContext(connection) as first:
+			OrderBulkStatusService.apply(small, "sent")
+		with CaptureQueriesContext(connection) as second:
+			OrderBulkStatusService.apply(large, "sent")
+		self.assertEqual(len(first), len(second))
+
+	def test_sent_records_sold_products_and_stock(self, _fcm):
+		SoldProduct.objects.create(product=self.milk, user=self.profile, quantity=1, amount=1000)
+		before = ProductItem.objects.get(pk=self.milk.pk).modified
+		ids = [self.order(milk=3).pk, self.order(milk=2, bread=2).pk]
+
+		report = OrderBulkStatusService.apply(ids, "Sent")
+
+		self.assertEqual(report["products"], 2)
+		milk, bread = ProductItem.objects.get(pk=self.milk.pk), ProductItem.objects.get(pk=self.bread.pk)
+		self.assertEqual((milk.available_quantity, bread.available_quantity), (5, 0))
+		self.assertGreater(milk.modified, before)
+		sold = dict(SoldProduct.objects.values_list("product_id", "quantity"))
+		self.assertEqual(sold, {self.milk.pk: 6, self.bread.pk: 2})
+		self.assertEqual(SoldProduct.objects.get(product=self.bread).amount, 800)
+
+		# qayta "sent" — o'zgarish yo'q, qoldiq ikkinchi marta kamaymaydi
+		self.assertEqual(OrderBulkStatusService.apply(ids, "sent")["updated"], 0)
+		self.assertEqual(ProductItem.objects.get(pk=self.milk.pk).available_quantity, 5)
+
+	def test_shipment_is_recorded_once_and_reversed(self, _fcm):
+		order = self.order(milk=3)
+
+		OrderBulkStatusService.apply([order.pk], "sent")
+		self.assertEqual(ProductItem.objects.get(pk=self.milk.pk).available_quantity, 7)
+		self.assertIsNotNone(Order.objects.get(pk=order.pk).shipped_at)
+
+		# sent -> approved: qoldiq va SoldProduct qaytadi
+		self.assertEqual(OrderBulkStatusService.apply([order.pk], "approved")["products"], 1)
+		self.assertEqual(ProductItem.objects.get(pk=self.milk.pk).available_quantity, 10)
+		self.assertEqual(SoldProduct.objects.get(product=self.milk).quantity, 0)
+		self.assertIsNone(Order.objects.get(pk=order.pk).shipped_at)
+
+		# approved -> sent: yana bir marta, ikki barobar emas
+		OrderBulkStatusService.apply([order.pk], "sent")
+		self.assertEqual(ProductItem.objects.get(pk=self.milk.pk).available_quantity, 7)
+		self.assertEqual(SoldProduct.objects.get(product=self.milk).quantity, 3)
+
+	def test_return_restores_only_what_was_shipped(self, _fcm):
+		# Qoldiq 10, ikki buyurtma jami 14 — ikkinchisidan faqat 4 ta chiqadi
+		first, second = self.order(milk=6), self.order(milk=8)
+		OrderBulkStatusService.apply([first.pk, second.pk], "sent")
+		self.assertEqual(ProductItem.objects.get(pk=self.milk.pk).available_quantity, 0)
+		self.assertEqual(OrderItem.objects.get(order=second).shipped_quantity, 4)
+
+		OrderBulkStatusService.apply([second.pk], "cancelled")
+		self.assertEqual(ProductItem.objects.get(pk=self.milk.pk).available_quantity, 4)
+		OrderBulkStatusService.apply([first.pk], "cancelled")
+		self.assertEqual(ProductItem.objects.get(pk=self.milk.pk).available_quantity, 10)
+		self.assertFalse(OrderItem.objects.filter(shipped_quantity__gt=0).exists())
+
+	def test_legacy_capitalised_sent_is_not_shipped_again(self, _fcm):
+		order = self.order(milk=2)
+		Order.objects.filter(pk=order.pk).update(status="Sent")
+
+		report = OrderBulkStatusService.apply([order.pk], "sent")
+
+		self.assertEqual((report["updated"], report["products"]), (0, 0))
+		self.assertEqual(ProductItem.objects.get(pk=self.milk.pk).available_quantity, 10)
+		self.assertFalse(SoldProduct.objects.exists())
+
+	def test_dashboard_bulk_action(self, _fcm):
+		staff = get_user_model().objects.create_user(username="bulk-status-staff", password="testpass123", is_staff=True)
+		self.client.force_login(staff)
+		ids = [self.order(milk=1).pk, self.order(milk=1).pk]
+
+		response = self.client.post("/dashboard/orders/bulk-status/", {"ids": ids, "status": "cancelled"})
+		self.assertRedirects(response, "/dashboard/orders/", fetch_redirect_response=False)
+		self.assertEqual(set(Order.objects.filter(pk__in=ids).values_list("status", flat=True)), {"cancelled"})
+
+		response = self.client.post("/dashboard/orders/bulk-status/", {"ids": ids, "status": "bogus"}, follow=True)
+		self.assertContains(response, "noto&#x27;g&#x27;ri tanlangan")
+		self.assertEqual(set(Order.objects.filter(pk__in=ids).values_list("status", flat=True)), {"cancelled"})
+
+	def test_single_order_invalid_status_is_reported(self, _fcm):
+		staff = get_user_model().objects.create_user(username="single-status-staff", password="testpass123", is_staff=True)
+		self.client.force_login(staff)
+		order = self.order(milk=1)
+
+		response = self.client.post(f"/dashboard/update-order-status/{order.pk}/", {"status": "bogus"})
+		self.assertRedirects(response, "/dashboard/orders/", fetch_redirect_response=False)
+		messages = [str(message) for message in get_messages(response.wsgi_request)]
+		self.assertEqual(len(messages), 1)
+		self.assertIn("bogus", messages[0])
+		self.assertEqual(Order.objects.get(pk=order.pk).status, order.status)
+
+
+@mock.patch("apps.product.signals.send_fcm_notification")
+class PickListTests(TestCase):
+	def setUp(self):
+		staff = get_user_model().objects.create_user(username="pick-staff", password="testpass123", is_staff=True)
+		self.client.force_login(staff)
+		user = get_user_model().objects.create_user(username="998905550001", password="testpass123")
+		self.profile = Profile.objects.create(origin=user, full_name="Picker", phone_number="998905550001")
+		with mock.patch("apps.product.signals.send_fcm_notification"):
+			self.milk = ProductItem.objects.create(desc="Milk 1L", old_price=1000, measure=2, available_quantity=10)
+			self.bread = ProductItem.objects.create(desc="Bread", old_price=500, measure=1, available_quantity=1)
+		Good.objects.create(product=self.milk, name="Sut")
+
+	def order(self, status="approved", **quantities):
+		order = Order.objects.create(user=self.profile, status=status)
+		for name, quantity in quantities.items():
+			OrderItem.objects.create(order=order, product=getattr(self, name), quantity=quantity)
+		return order
+
+	def test_aggregates_selected_orders_in_one_query(self, _fcm):
+		first, second = self.order(milk=2, bread=1), self.order(milk=3, bread=2)
+		self.order(status="pending", milk=50)
+
+		with self.assertNumQueries(1):
+			pick_list = PickListService.build(PickListService.orders())
+
+		milk, bread = pick_list
+		self.assertEqual((milk["name"], milk["total"], milk["measure"], milk["order_count"]), ("Sut", 5, "L", 2))
+		self.assertEqual(milk["breakdown"], [(first.order_number, 2), (second.order_number, 3)])
+		self.assertEqual((bread["name"], bread["total"], bread["stock"], bread["shortage"]), ("Bread", 3, 1, 2))
+
+	def test_view_for_checked_orders_and_csv_export(self, _fcm):
+		first = self.order(milk=2)
+		self.order(milk=4, bread=1)
+		pending = self.order(status="pending", bread=3)
+
+		response = self.client.get("/dashboard/orders/pick-list/", {"ids": [first.pk, pending.pk]})
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.context["order_count"], 2)
+		self.assertEqual([row["total"] for row in response.context["pick_list"]], [3, 2])
+
+		exported = self.client.get("/dashboard/orders/pick-list/", {"export": "csv"})
+		lines = exported.content.decode().splitlines()
+		self.assertEqual(lines[0], "product_id,name,measure,total,stock,shortage,orders")
+		self.assertEqual(len(lines), 3)
+		self.assertIn("Sut", lines[1])
+
+
+@mock.patch("apps.product.signals.send_fcm_notification")
+class AdminChangelistQueryTests(TestCase):
+	CHANGELISTS = (
+		"/admin/merchant/order/",
+		"/admin/merchant/loyaltycard/",
+		"/admin/merchant/loyaltyledger/",
+		"/admin/product/productitem/",
+		"/admin/product/soldproduct/",
+		"/admin/customer/profile/",
+	)
+
+	def setUp(self):
+		admin_user = get_user_model().objects.create_superuser(username="root", password="testpass123")
+		self.client.force_login(admin_user)
+
+	def add_rows(self, count):
+		for _ in range(count):
+			number = f"99890{Profile.objects.count():07d}"
+			user = get_user_model().objects.create_user(username=number, password="testpass123")
+			profile = Profile.objects.create(origin=user, full_name=f"Admin {number}", phone_number=number)
+			with mock.patch("apps.product.signals.send_fcm_notification"):
+				product = ProductItem.objects.create(desc=f"Admin {number}", old_price=1000)
+			Good.objects.create(product=product, name=f"Admin {number}")
+			Image.objects.create(product=product, image="product/a.png")
+			order = Order.objects.create(user=profile, status="pending")
+			OrderItem.objects.create(order=order, product=product, quantity=1)
+			SoldProduct.objects.create(product=product, user=profile, quantity=1, amount=1000)
+			LoyaltyLedgerService.credit(profile, 100, "cashback")
+
+	def queries(self, url, **params):
+		with CaptureQueriesContext(connection) as captured:
+			response = self.client.get(url, params)
+		self.assertEqual(response.status_code, 200, url)
+		return len(captured)
+
+	def test_changelist_queries_do_not_grow_with_rows(self, _fcm):
+		self.add_rows(2)
+		few = {url: self.queries(url) for url in self.CHANGELISTS}
+		self.add_rows(6)
+		many = {url: self.queries(url) for url in self.CHANGELISTS}
+		self.assertEqual(few, many)
+		for url, count in many.items():
+			self.assertLessEqual(count, 10, url)
+
+	def test_search_uses_domain_lookups(self, _fcm):
+		self.add_rows(3)
+		profile = Profile.objects.order_by("id").first()
+		order = Order.objects.get(user=profile)
+
+		response = self.client.get("/admin/merchant/order/", {"q": order.order_number})
+		self.assertEqual(list(response.context["cl"].result_list), [order])
+		response = self.client.get("/admin/merchant/loyaltycard/", {"q": profile.phone_number})
+		self.assertEqual([card.profile_id for card in response.context["cl"].result_list], [profile.pk])
+		product = order.orderitem.get().product
+		response = self.client.get("/admin/product/productitem/", {"q": product.goods.name})
+		self.assertEqual(list(response.context["cl"].result_list), [product])
+
+	def test_product_search_matches_desc_and_names_by_substring(self, _fcm):
+		self.add_rows(2)
+		with mock.patch("apps.product.signals.send_fcm_notification"):
+			yogurt = ProductItem.objects.create(desc_uz="Tabiiy qatiq", desc_en="Natural yogurt", old_price=1000)
+		Good.objects.create(product=yogurt, name_uz="Qatiq 4507", name_en="Yogurt 4507")
+
+		def found(term):
+			response = self.client.get("/admin/product/productitem/", {"q": term})
+			return list(response.context["cl"].result_list)
+
+		# faqat desc_uz da, so'z o'rtasidan
+		self.assertEqual(found("biiy"), [yogurt])
+		# nom ichidagi raqam — faqat id bilan emas
+		self.assertEqual(found("450"), [yogurt])
+		self.assertEqual(found("GURT"), [yogurt])
+		self.assertIn(yogurt, found(str(yogurt.pk)))
+
+
+class LoyaltyCustomerListTests(TestCase):
+	def setUp(self):
+		self.profiles = []
+		for i in range(30):
+			user = get_user_model().objects.create_user(username=f"99890444{i:04d}", password="testpass123")
+			profile = Profile.objects.create(origin=user, full_name=f"Mijoz {i:02d}", phone_number=f"99890444{i:04d}")
+			LoyaltyCard.objects.filter(profile=profile).update(current_balance=i * 100)
+			self.profiles.append(profile)
+		top = self.profiles[-1]
+		for amount, status in ((1000, "approved"), (2000, "approved"), (4000, "pending")):
+			order = Order.objects.create(user=top, status="in_cart")
+			LoyaltyPendingBonus.objects.create(
+				profile=top, order=order, order_name="Bonus", order_amount=amount, bonus_amount=amount // 10, status=status
+			)
+		for referee in self.profiles[:2]:
+			Referral.objects.create(referrer=top, referee=referee)
+
+	def test_page_is_annotated_in_one_query(self):
+		# count + sahifa
+		with self.assertNumQueries(2):
+			response = self.client.get("/dashboard/loyalty/customers/", {"sort": "-balance"})
+			rows = list(response.context["profiles"])
+
+		self.assertEqual(len(rows), 25)
+		top = rows[0]
+		self.assertEqual(top.full_name, "Mijoz 29")
+		# 2900 + tasdiqlangan bonuslar karta balansiga yozilgan
+		self.assertEqual((top.balance, top.bonus_total, top.referral_count), (Decimal("3200"), Decimal("300"), 2))
+		self.assertEqual((rows[1].bonus_total, rows[1].referral_count), (0, 0))
+		self.assertEqual(response.context["page_obj"].paginator.num_pages, 2)
+
+	def test_search_sort_and_pagination(self):
+		response = self.client.get("/dashboard/loyalty/customers/", {"q": "mijoz 0", "sort": "name", "page": 1})
+		self.assertEqual([p.full_name for p in response.context["profiles"]], [f"Mijoz 0{i}" for i in range(10)])
+
+		response = self.client.get("/dashboard/loyalty/customers/", {"q": "90 444 0003"})
+		self.assertEqual([p.full_name for p in response.context["profiles"]], ["Mijoz 03"])
+
+	def test_search_matches_substrings(self):
+		response = self.client.get("/dashboard/loyalty/customers/", {"q": "joz 2", "sort": "name"})
+		self.assertEqual([p.full_name for p in response.context["profiles"]], [f"Mijoz 2{i}" for i in range(10)])
+
+		response = self.client.get("/dashboard/loyalty/customers/", {"q": "4440017"})
+		self.assertEqual([p.full_name for p in response.context["profiles"]], ["Mijoz 17"])
+
+	def test_detail_stats_are_aggregated(self):
+		response = self.client.get(f"/dashboard/loyalty/customer/{self.profiles[-1].id}/")
+		self.assertEqual(response.context["total_spent"], Decimal("7000"))
+		self.assertEqual(response.context["bonuses_count"], 3)
+
+
+class OrderEventStreamTests(TransactionTestCase):
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(username="998901116666", password="testpass123")
+		self.profile = Profile.objects.create(origin=self.user, full_name="Stream User", phone_number="998901116666")
+		self.order = Order.objects.create(user=self.profile, status="in_cart")
+
+		self.listener = order_events.OrderEventListener()
+		self.listener.start()
+		self.addCleanup(self.listener.join, 10)
+		self.addCleanup(self.listener.stop)
+		self.assertTrue(self.listener.ready.wait(5))
+
+	def _set_status(self, status):
+		self.order.status = status
+		self.order.save()
+
+	def test_checkout_notifies_owner_and_staff(self):
+		async def scenario():
+			owner = order_events.hub.subscribe([order_events.profile_key(self.profile.id)])
+			staff = order_events.hub.subscribe([order_events.STAFF])
+			stranger = order_events.hub.subscribe([order_events.profile_key(self.profile.id + 1)])
+			try:
+				await sync_to_async(self._set_status)("pending")
+				owner_event = await asyncio.wait_for(owner.queue.get(), 5)
+				staff_event = await asyncio.wait_for(staff.queue.get(), 5)
+				await sync_to_async(self._set_status)("approved")
+				next_owner_event = await asyncio.wait_for(owner.queue.get(), 5)
+				return owner_event, staff_event, next_owner_event, stranger.queue.qsize(), staff.queue.qsize()
+			finally:
+				for subscription in (owner, staff, stranger):
+					order_events.hub.unsubscribe(subscription)
+				# sync_to_async oqimidagi ulanish test bazasini o'chirishga xalaqit bermasin
+				await sync_to_async(lambda: connection.close())()
+
+		owner_event, staff_event, next_owner_event, stranger_count, staff_count = asyncio.run(scenario())
+		self.assertEqual((owner_event["type"], owner_event["status"]), (order_events.ORDER_STATUS, "pending"))
+		self.assertEqual((staff_event["type"], staff_event["order_id"]), (order_events.ORDER_CREATED, self.order.id))
+		self.assertEqual((next_owner_event["old_status"], next_owner_event["status"]), ("pending", "approved"))
+		# Status o'zgarishi xodimlarga yangi buyurtma sifatida qayta kelmaydi
+		self.assertEqual((stranger_count, staff_count), (0, 0))
+
+	def test_stream_requires_authentication(self):
+		response = asyncio.run(AsyncClient().get("/api/merchant/orders/events/"))
+		self.assertEqual(response.status_code, 401)
+
+	def test_stream_refused_under_wsgi(self):
+		self.client.force_login(self.user)
+		with mock.patch.object(order_events, "start_listener") as start_listener:
+			response = self.client.get("/api/merchant/orders/events/")
+		self.assertEqual(response.status_code, 503)
+		start_listener.assert_not_called()
@@ -27,6 +27,8 @@ urlpatterns = [
     # 1. Savatni boshqarish (Mahsulot qo'shish, sonini o'zgartirish yoki o'chirish)
     # Flutterchi JSON yuboradi: {"product": 1, "quantity": 2}
     path('cart/manage/', CartManageAPIView.as_view(), name='cart-manage'),
+    # Bir nechta mahsulot birdaniga: {"items": [{"product_id": 1, "quantity": 2}, ...]}
+    path('cart/batch/', CartBatchAPIView.as_view(), name='cart-batch'),
 
     # 2. Buyurtmani rasmiylashtirish (Savatni yopish va "To'lov kutilmoqda" holatiga o'tkazish)
     # Flutterchi JSON yuboradi: {"location": 5, "comment": "..."}
@@ -38,6 +40,8 @@ urlpatterns = [
 
     path('orders/', MyOrdersListView.as_view(), name='my-orders-list'),
     path('orders/<int:pk>/', MyOrderDetailView.as_view(), name='my-order-detail'),
+    # SSE: buyurtma status o'zgarishlari (mijoz) va yangi buyurtmalar (xodimlar)
+    path('orders/events/', OrderEventStreamView.as_view(), name='order-events'),
 
     path('loyalty/history/', LoyaltyHistoryAPIView.as_view(), name='loyalty-history'),
 
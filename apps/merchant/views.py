@@ -1,5 +1,12 @@
+import asyncio
+import json
 from urllib import request
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.types import OpenApiTypes
 from drf_yasg import openapi
@@ -18,9 +25,14 @@ from rest_framework import status, permissions, parsers
 from django.db import transaction
 from django.db.models import Prefetch, F
 from rest_framework.response import Response
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
 from rest_framework.parsers import MultiPartParser, FormParser
 from drf_spectacular.utils import extend_schema, OpenApiParameter
+from apps.product import cache as catalog_cache
+from apps.product.cache import LocalCachedListMixin
+from apps.customer.models import Profile
 from apps.product.models import Image, ProductItem
 from .models import Order, OrderItem, Information, Service, SocialMedia, Bonus, LoyaltyCard, Referral, \
     LoyaltyPendingBonus, BankCardModel
@@ -35,10 +47,16 @@ from .serializers import (
     OrderCreateSerializer,
     SocialMediaSerializer,
     BonusSerializer, LoyaltyCardSerializer, UserBonusSerializer, CartAddSerializer,
-    CheckoutSerializer, ReceiptUploadSerializer, OrderDetailSerializer, LoyaltySpendingHistorySerializer,
-    LoyaltyEarnedHistorySerializer, ReferralHistorySerializer, CartUpdateQuantitySerializer, RemoveFromCartSerializer,
-    B2BStatusResponseSerializer,
+    CheckoutSerializer, ReceiptUploadSerializer, OrderDetailSerializer, LoyaltyLedgerSerializer,
+    LoyaltyLedgerCursorPagination, CartUpdateQuantitySerializer, RemoveFromCartSerializer,
+    B2BStatusResponseSerializer, CartBatchSerializer,
 )
+from . import events as order_events
+from .base import OrderItemPresenter
+from .cart import CartBatchError, CartService
+from .idempotency import idempotent
+from .loyalty import InsufficientLoyaltyBalance, LoyaltyLedgerService
+from .receipts import ReceiptService
 from apps.dashboard.main import bot
 
 
@@ -182,50 +200,10 @@ class OrderListAPIView(ListAPIView):
         if user.is_anonymous:
             return Order.objects.none()
 
-        # Efficiently prefetching related data
-        # product_prefetch = Prefetch(
-        #     'products',
-        #     queryset=ProductItem.objects.all()
-        #     .select_related('phones', 'tickets', 'goods')  # Optimize OneToOne relations
-        #     .prefetch_related(
-        #         Prefetch('images', queryset=Image.objects.all(), to_attr='prefetched_images')
-        #     )
-        # )
-
-        # return (
-        #     Order.objects.filter(user=user.profile)
-        #     .prefetch_related(
-        #         product_prefetch,  # Products with optimized related objects
-        #         'orderitem', # Order items linked to the order
-        #         'orderitem__product'
-        #     )
-        #     .order_by("-created")  # Most recent orders first
-        # )
-
-        product_prefetch = Prefetch(
-            'product',
-            queryset=ProductItem.objects.all()
-            .select_related('phones', 'tickets', 'goods')
-            .prefetch_related(
-                'images'  # Prefetch all related images without using a custom attribute
-            )  # Optimize OneToOne relations
-            # .prefetch_related(
-            #     Prefetch('images', queryset=Image.objects.all(), to_attr='prefetched_images')
-            # )
-        )
-
-        # Ensure that 'orderitem' prefetches not only 'product' but also detailed relationships
-        order_items_prefetch = Prefetch(
-            'orderitem',
-            queryset=OrderItem.objects.all().prefetch_related(product_prefetch)
-        )
-
-        return (
-            Order.objects.filter(user=user.profile)
-            .prefetch_related(order_items_prefetch, 'orderitem__product')
-            .prefetch_related('products')
-            .order_by("-created_at")  # Most recent orders first
-        )
+        # Itemlar, mahsulotlar, ularning turi va rasmlari belgilangan sondagi so'rovda yuklanadi
+        return OrderItemPresenter.prefetch(
+            Order.objects.filter(user=user.profile).select_related("user", "location")
+        ).order_by("-created_at")  # Most recent orders first
 
 
 @extend_schema(tags=["Merchant"])
@@ -306,6 +284,7 @@ class OrderItemCreateAPIView(CreateAPIView):
         context["request"] = self.request
         return context
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -361,7 +340,7 @@ class OrderItemRetrieveUpdateDelete(RetrieveUpdateDestroyAPIView):
         return Response({"message": success_message}, status=status.HTTP_204_NO_CONTENT)
 
 @extend_schema(tags=["Merchant"])
-class InformationListAPIView(ListAPIView):
+class InformationListAPIView(LocalCachedListMixin, ListAPIView):
     queryset = Information.objects.all().order_by("-pk")
     serializer_class = InformationSerializer
     permission_classes = [AllowAny]
@@ -427,7 +406,7 @@ class CheckoutView(APIView):
 
 
 @extend_schema(tags=["Merchant"])
-class ServiceListAPIView(ListAPIView):
+class ServiceListAPIView(LocalCachedListMixin, ListAPIView):
     queryset = Service.objects.all().order_by("-pk")
     serializer_class = ServiceSerializer
     permission_classes = [IsAuthenticated]
@@ -435,7 +414,7 @@ class ServiceListAPIView(ListAPIView):
 
 
 @extend_schema(tags=["Merchant"])
-class SocialMeadiaAPIView(ListAPIView):
+class SocialMeadiaAPIView(LocalCachedListMixin, ListAPIView):
     queryset = SocialMedia.objects.all().order_by("-pk")
     serializer_class = SocialMediaSerializer
     permission_classes = [IsAuthenticated]
@@ -495,6 +474,7 @@ class CartManageAPIView(APIView):
     serializer_class = CartAddSerializer
 
     @swagger_auto_schema(request_body=CartAddSerializer)
+    @idempotent
     def post(self, request):
         serializer = CartAddSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -512,12 +492,43 @@ class CartManageAPIView(APIView):
         return Response({"message": "Savat yangilandi", "total": order.total_amount})
 
 
+@extend_schema(tags=["Savat Otkazish"])
+class CartBatchAPIView(APIView):
+    """Mobil ilova savatini bitta so'rov bilan sinxronlash"""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        summary="Savatni bir nechta mahsulot bo'yicha bitta so'rovda yangilash",
+        request=CartBatchSerializer,
+    )
+    @idempotent
+    def post(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        user = request.user
+        is_wholesale = getattr(user, "is_wholesaler", False) and getattr(user, "is_approved", False)
+        try:
+            order = CartService.apply_batch(user.profile, serializer.validated_data["items"], is_wholesale)
+        except CartBatchError as exc:
+            return Response({"error": "Savatni yangilab bo'lmadi", "items": exc.errors}, status=400)
+
+        order = OrderItemPresenter.prefetch(Order.objects.filter(pk=order.pk)).get()
+        return Response({
+            "message": "Savat yangilandi",
+            "order_id": order.id,
+            "total_amount": order.total_amount,
+            "items": OrderItemPresenter(request).present_order(order),
+        })
+
+
 @extend_schema(tags=["Zakaz Oformit kilish"])
 class CheckoutAPIView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = CheckoutSerializer
 
     @swagger_auto_schema(request_body=CheckoutSerializer)
+    @idempotent
     def post(self, request):
         user_profile = request.user.profile
         # Savatdagi buyurtmani topamiz
@@ -585,7 +596,9 @@ class UploadReceiptAPIView(APIView):
 
         # 2. Agar admin biriktirmagan bo'lsa, bazadagi "Default" (birinchi) kartani olamiz
         if not card:
-            card = BankCardModel.objects.first()
+            card = catalog_cache.local_get_or_set(
+                catalog_cache.CONFIG, ("default-bankcard",), BankCardModel.objects.first
+            )
 
         # 3. Agar bazada umuman karta bo'lmasa (Admin hali karta yaratmagan bo'lsa)
         if not card:
@@ -618,6 +631,7 @@ class UploadReceiptAPIView(APIView):
             }
         }
     )
+    @idempotent
     def post(self, request):
         user_profile = request.user.profile
         ord_id = request.data.get('order_id')  # Flutterchi yuborgan ID
@@ -637,39 +651,52 @@ class UploadReceiptAPIView(APIView):
         if not order:
             return Response({"error": "Buyurtma topilmadi yoki to'lov uchun yopiq"}, status=404)
 
-        # 2. Xavfsiz tranzaksiya ochamiz (Pul va Rasm birga ishlashi uchun)
-        with transaction.atomic():
-            if loyalty_amt > 0:
-                # Userda loyalty karta borligini tekshiramiz
-                if hasattr(user_profile, 'loyalty_card'):
-                    card = user_profile.loyalty_card
-
-                    # Balansni tekshiramiz
-                    if card.current_balance >= loyalty_amt:
-                        # Balansdan ayiramiz
-                        card.current_balance = F('current_balance') - loyalty_amt
-                        card.save()
-
-                        # Buyurtmaning o'ziga ham qancha yechilganini yozib qo'yamiz (history uchun)
-                        order.loyalty_payment = loyalty_amt
-                    else:
-                        return Response({"error": "Loyalty kartada mablag' yetarli emas"}, status=400)
-                else:
-                    return Response({"error": "Sizda loyalty karta mavjud emas"}, status=400)
+        # 2. Chekni tranzaksiyadan oldin storage'ga yozamiz: katta fayl DB tranzaksiyasini ushlab turmaydi
+        staged_receipt = ReceiptService.stage(receipt_file) if receipt_file else None
 
-            # 3. Rasmni saqlaymiz va statusni yangilaymiz
-            order.payment_receipt = receipt_file
-            order.status = 'pending'  # Avtomatik tasdiqlash
-            order.save()
+        # 3. Pul va status bitta qisqa tranzaksiyada
+        new_balance = None
+        try:
+            with transaction.atomic():
+                if loyalty_amt > 0:
+                    # Balans tekshiruvi va yechim bitta shartli UPDATE ... RETURNING;
+                    # shu buyurtma uchun qayta yuborilgan so'rov balansni ikkinchi marta kamaytirmaydi
+                    try:
+                        entry = LoyaltyLedgerService.debit_for_order(order, loyalty_amt)
+                    except InsufficientLoyaltyBalance as exc:
+                        ReceiptService.discard(staged_receipt)
+                        if not exc.has_card:
+                            return Response({"error": "Sizda loyalty karta mavjud emas"}, status=400)
+                        return Response({"error": "Loyalty kartada mablag' yetarli emas"}, status=400)
 
-        # Yangilangan balansni olish uchun kartani qayta yuklaymiz
-        user_profile.loyalty_card.refresh_from_db()
+                    new_balance = entry.balance_after
+                    # Buyurtmaning o'ziga ham qancha yechilganini yozib qo'yamiz (history uchun)
+                    order.loyalty_payment = int(-entry.amount)
+
+                order.status = 'pending'  # Avtomatik tasdiqlash
+                if staged_receipt:
+                    # Fon oqimi yiqilsa ham reprocess_receipts buyrug'i faylni shu yerdan topadi
+                    order.staged_receipt = staged_receipt
+                order.save()
+
+                # 4. Commit'dan keyin chek fonda normallashtiriladi va tayyor bo'lgach order'ga biriktiriladi
+                if staged_receipt:
+                    ReceiptService.schedule(order.pk, staged_receipt)
+        except Exception:
+            # Tranzaksiya bekor bo'ldi — vaqtinchalik fayl hech qaysi buyurtmaga bog'lanmay qolmasin
+            ReceiptService.discard(staged_receipt)
+            raise
+
+        if new_balance is None:
+            new_balance = LoyaltyCard.objects.filter(profile=user_profile).values_list(
+                'current_balance', flat=True
+            ).first() or 0
 
         return Response({
             "message": "To'lov muvaffaqiyatli! Rasm yuklandi va loyaltydan pul yechildi.",
             "order_id": order.id,
             "order_status": order.status,
-            "new_loyalty_balance": user_profile.loyalty_card.current_balance
+            "new_loyalty_balance": new_balance
         }, status=200)
 
 
@@ -682,7 +709,10 @@ class MyOrderDetailView(RetrieveAPIView):  # APIView o'rniga RetrieveAPIView qul
     def get_queryset(self):
         # Bu yerda ham xavfsizlik uchun faqat userning o'ziga tegishli orderlarni filtrlaymiz
         # Shunda birovning ID sini yozsa ham 404 (Topilmadi) beradi
-        return Order.objects.filter(user=self.request.user.profile)
+        return OrderItemPresenter.prefetch(
+            Order.objects.filter(user=self.request.user.profile)
+            .select_related("user", "location", "bankcard")
+        )
 
 
 @extend_schema(tags=["Buyurtmalar ro'yxati"])
@@ -693,50 +723,34 @@ class MyOrdersListView(ListAPIView):
 
     def get_queryset(self):
         # Faqat login qilgan userning savatda bo'lmagan buyurtmalarini chiqaradi
-        return Order.objects.filter(
-            user=self.request.user.profile
-        ).exclude(status='in_cart').order_by('-pk')
-        # Savatda bo'lmagan, ya'ni haqiqiy buyurtma bo'lgan narsalar
-        return Order.objects.filter(user=self.request.user.profile).exclude(status='in_cart').order_by('-pk')
+        return OrderItemPresenter.prefetch(
+            Order.objects.filter(user=self.request.user.profile)
+            .exclude(status='in_cart')
+            .select_related("user", "location")
+        ).order_by('-pk')
 
 
 @extend_schema(tags=["LoyaltyHistory"])
-class LoyaltyHistoryAPIView(APIView):
+class LoyaltyHistoryAPIView(ListAPIView):
+    """
+    Loyalty tarixi LoyaltyLedger jurnalidan bitta so'rov bilan, cursor bo'yicha sahifalab olinadi.
+    """
+    serializer_class = LoyaltyLedgerSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = LoyaltyLedgerCursorPagination
 
-    def get(self, request):
-        user_profile = request.user.profile
+    def get_queryset(self):
+        return LoyaltyLedgerService.history(self.request.user.profile)
 
-        # 1. Chiqimlar: loyalty_payment 0 dan katta bo'lgan buyurtmalar
-        spending = Order.objects.filter(
-            user=user_profile,
-            loyalty_payment__gt=0
-        ).order_by('-created_at')
-
-        # 2. Kirimlar (Cashback): Shaxsiy buyurtma bonuslari
-        cashback = LoyaltyPendingBonus.objects.filter(
-            profile=user_profile
-        ).order_by('-created_at')
-
-        # 3. Kirimlar (Referral): Taklif qilingan do'stlar
-        referrals = Referral.objects.filter(
-            referrer=user_profile
-        ).order_by('-created_at')
-
-        # 4. Hozirgi balansni olish
-        balance = 0
-        if hasattr(user_profile, 'loyalty_card'):
-            balance = user_profile.loyalty_card.current_balance
-
-        # Ma'lumotlarni serializerlarga beramiz
-        data = {
-            "current_balance": balance,
-            "spending_history": LoyaltySpendingHistorySerializer(spending, many=True).data,
-            "cashback_history": LoyaltyEarnedHistorySerializer(cashback, many=True).data,
-            "referral_history": ReferralHistorySerializer(referrals, many=True).data
-        }
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
 
-        return Response(data)
+        # Hozirgi balans
+        balance = LoyaltyCard.objects.filter(profile=request.user.profile).values_list(
+            'current_balance', flat=True
+        ).first()
+        response.data["current_balance"] = balance or 0
+        return response
 
 @extend_schema(tags=["Savatdagi mahsulot sonini yangilash"])
 class UpdateCartQuantityAPIView(APIView):
@@ -796,3 +810,73 @@ class UpdateCartQuantityAPIView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+
+
+class OrderEventStreamView(View):
+    """
+    Buyurtma hodisalari oqimi (Server-Sent Events). Faqat ASGI ostida ishlaydi, WSGI ostida 503.
+
+    Mijoz o'z buyurtmalarining status o'zgarishlarini (order.status), xodimlar esa
+    yangi buyurtmalarni (order.created) oladi — MyOrderDetailView'ni so'rab turish shart emas.
+    Token: "Authorization: Bearer <access>" yoki EventSource header yubora olmasa ?token=<access>.
+    Dashboard sessiya orqali ulanadi.
+    """
+    KEEPALIVE = 15
+
+    @staticmethod
+    def _jwt_user(request):
+        authenticator = JWTAuthentication()
+        try:
+            result = authenticator.authenticate(request)
+            if result is None and request.GET.get("token"):
+                token = authenticator.get_validated_token(request.GET["token"])
+                result = (authenticator.get_user(token), token)
+        except (InvalidToken, AuthenticationFailed):
+            return None
+        return result[0] if result else None
+
+    @staticmethod
+    def _subscription_keys(user):
+        keys = [order_events.profile_key(profile_id) for profile_id in
+                Profile.objects.filter(origin=user).values_list("id", flat=True)]
+        if user.is_staff:
+            keys.append(order_events.STAFF)
+        return keys
+
+    async def get(self, request):
+        # WSGI (gunicorn config.wsgi) ostida cheksiz oqim sync worker'ni timeout'gacha band qiladi,
+        # EventSource esa har 3 soniyada qayta ulanadi — oqim faqat ASGI serverda ochiladi
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({"error": "Event stream requires an ASGI server"}, status=503)
+
+        user = await request.auser()
+        if not user.is_authenticated:
+            user = await sync_to_async(self._jwt_user)(request)
+        if user is None or not user.is_authenticated:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+        keys = await sync_to_async(self._subscription_keys)(user)
+        if not keys:
+            return JsonResponse({"error": "Profile not found"}, status=400)
+
+        order_events.start_listener()
+        subscription = order_events.hub.subscribe(keys)
+
+        async def stream():
+            try:
+                yield "retry: 3000\n\n"
+                while True:
+                    try:
+                        event = await asyncio.wait_for(subscription.queue.get(), self.KEEPALIVE)
+                    except asyncio.TimeoutError:
+                        # Proxy'lar ulanishni yopmasligi uchun
+                        yield ": keepalive\n\n"
+                        continue
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            finally:
+                order_events.hub.unsubscribe(subscription)
+
+        response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
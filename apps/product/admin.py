@@ -1,7 +1,12 @@
+import uuid
+
 from django.contrib import admin
+from django.db.models import Prefetch, Q
 from django.utils.html import format_html
 from modeltranslation.admin import TranslationAdmin
-from .models import Category, ProductItem, Good, Phone, Ticket, Image, SoldProduct
+from apps.customer.admin_utils import EstimatedCountPaginator, LargeTableAdmin
+from apps.customer.trigram import TRIGRAM_MIN_LENGTH
+from .models import Category, ProductItem, Good, Phone, Ticket, Image, SoldProduct, Promotion, translated_text
 
 
 # ==========================================
@@ -68,8 +73,14 @@ class ProductItemAdmin(TranslationAdmin):
         "active",
     ]
     list_filter = ["active", "main", "measure", "created"]
-    search_fields = ["desc", "product_type", "goods__name", "phones__model_name"]
+    # Qidiruv get_search_results da: id, product_type, nom va ta'rif (desc) — pg_trgm indekslari bilan
+    search_fields = ["desc"]
     list_editable = ["active", "main", "new_price", "available_quantity"]
+    # Nom (hasattr turlari) JOIN bilan, birinchi rasm bitta prefetch bilan
+    list_select_related = ["goods", "phones", "tickets"]
+    ordering = ["-id"]
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
     # HAMMA NARSA BIR JOYDA:
     inlines = [GoodInline, ImageInline]
@@ -78,6 +89,48 @@ class ProductItemAdmin(TranslationAdmin):
     save_as = True
     save_on_top = True
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch("images", queryset=Image.objects.order_by("pk"), to_attr="ordered_images")
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        UUID -> product_type (indeksli); aks holda nom (Good/Phone/Ticket) yoki ta'rif (desc) ichidan, barcha tillarda,
+        raqam bo'lsa id ham. Har bir jadval translated_text() ifodasi va uning pg_trgm indeksi bilan alohida
+        subquery'da — asosiy ro'yxatga uchta LEFT JOIN + DISTINCT qo'shilmaydi.
+        Trigram indeksidan foydalanib bo'lmaydigan qisqa so'rov: raqam -> id, matn -> nom boshidan.
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        condition = Q(pk=int(term)) if term.isdigit() else Q(pk__in=[])
+        if not term.isdigit():
+            try:
+                return queryset.filter(product_type=uuid.UUID(term)), False
+            except ValueError:
+                pass
+
+        if len(term) < TRIGRAM_MIN_LENGTH:
+            if term.isdigit():
+                return queryset.filter(condition), False
+            return queryset.filter(
+                Q(pk__in=Good.objects.filter(name__istartswith=term).values("product_id"))
+                | Q(pk__in=Phone.objects.filter(model_name__istartswith=term).values("product_id"))
+                | Q(pk__in=Ticket.objects.filter(event_name__istartswith=term).values("product_id"))
+            ), False
+
+        def matching(model, field):
+            return model.objects.alias(text=translated_text(field)).filter(text__icontains=term).values("product_id")
+
+        return queryset.alias(text=translated_text("desc")).filter(
+            condition
+            | Q(text__icontains=term)
+            | Q(pk__in=matching(Good, "name"))
+            | Q(pk__in=matching(Phone, "model_name"))
+            | Q(pk__in=matching(Ticket, "event_name"))
+        ), False
+
     def save_formset(self, request, form, formset, change):
         # Agar "Save as new" tugmasi bosilgan bo'lsa
         if '_saveasnew' in request.POST:
@@ -96,7 +149,11 @@ class ProductItemAdmin(TranslationAdmin):
 
     def get_thumbnail(self, obj):
         # Mahsulotning birinchi rasmini ro'yxatda chiqarish
-        first_image = obj.images.first()
+        # Ro'yxatda prefetch qilingan (ordered_images), boshqa joyda oddiy so'rov
+        images = getattr(obj, "ordered_images", None)
+        if images is None:
+            images = list(obj.images.order_by("pk")[:1])
+        first_image = images[0] if images else None
         if first_image and first_image.image:
             return format_html('<img src="{}" style="width: 50px; height: 50px; border-radius: 5px;" />',
                                first_image.image.url)
@@ -115,9 +172,10 @@ class ProductItemAdmin(TranslationAdmin):
 
 
 @admin.register(SoldProduct)
-class SoldProductAdmin(admin.ModelAdmin):
+class SoldProductAdmin(LargeTableAdmin):
     list_display = ["user", "product", "quantity", "amount", "created"]
     list_filter = ["created"]
+    list_select_related = ["user__origin", "product"]
     readonly_fields = ["user", "product", "quantity", "amount"]  # Sotilgan narsani o'zgartirib bo'lmasin
 
 
@@ -125,10 +183,23 @@ class SoldProductAdmin(admin.ModelAdmin):
 @admin.register(Good)
 class GoodAdmin(TranslationAdmin):
     list_display = ["name", "category", "expire_date"]
-    search_fields = ["name"]
+    list_select_related = ["category"]
+    search_fields = ["^name"]
+    autocomplete_fields = ["product"]
 
 
 @admin.register(Phone)
 class PhoneAdmin(TranslationAdmin):
     list_display = ["model_name", "category", "ram", "storage", "color"]
-    search_fields = ["model_name"]
+    list_select_related = ["category"]
+    search_fields = ["^model_name"]
+    autocomplete_fields = ["product"]
+
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    # Saqlash/o'chirishda katalog narxlari qayta hisoblanadi (apps.product.promotions)
+    list_display = ("name", "scope", "kind", "value", "tier", "starts_at", "ends_at", "active")
+    list_filter = ("active", "scope", "kind", "tier")
+    search_fields = ("name",)
+    autocomplete_fields = ("category", "product")
@@ -6,4 +6,5 @@ class ProductConfig(AppConfig):
     name = "apps.product"
 
     def ready(self):
+        import apps.product.checks
         import apps.product.signals
@@ -0,0 +1,176 @@
+"""
+Mahsulot narxi, qoldig'i va faolligini ommaviy tahrirlash (dashboard jadvali yoki CSV).
+
+Har bir ProductItem.save() o'rniga:
+    - hamma o'zgarishlar bitta tranzaksiyada, qatorlar select_for_update bilan qulflanadi;
+    - bulk_update bilan yoziladi — post_save signallari (FCM, kesh) ishlamaydi;
+    - keyin bitta kesh invalidatsiyasi va arzonlashgan mahsulotlar uchun bitta push xabar.
+Bitta qator xato bo'lsa butun partiya rad etiladi (BulkEditError.errors).
+"""
+
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache as catalog_cache
+from .models import ProductItem
+from .promotions import PromotionEngine
+from .signals import PRICE_DROP_MANY, TITLES, invalidate_namespaces, send_fcm_notification, translations
+
+
+EDITABLE_FIELDS = ("old_price", "new_price", "b2b_price", "available_quantity", "active")
+PRICE_FIELDS = ("old_price", "new_price", "b2b_price")
+# Aksiya narxi shulardan hisoblanadi
+PROMOTION_INPUTS = {"old_price", "new_price", "manual_new_price", "b2b_price", "manual_b2b_price"}
+
+MAX_ROWS = 5000
+BATCH_SIZE = 500
+
+# narx maydonlari numeric(10, 0)
+MAX_PRICE = Decimal(10) ** 10
+
+TRUE_VALUES = {"1", "true", "yes", "ha", "on"}
+FALSE_VALUES = {"0", "false", "no", "yo'q", "yoq", "off"}
+
+
+class BulkEditError(Exception):
+    def __init__(self, errors):
+        super().__init__("Bulk edit rejected")
+        # {qator yoki mahsulot id: xabar}
+        self.errors = errors
+
+
+def effective_price(product):
+    return product.new_price if product.new_price and product.new_price > 0 else (product.old_price or 0)
+
+
+class ProductBulkEditService:
+
+    @staticmethod
+    def parse_value(field, raw):
+        """Bo'sh qiymat — o'zgartirilmaydi (None)"""
+        raw = str(raw).strip() if raw is not None else ""
+        if raw == "":
+            return None
+        if field == "active":
+            if raw.lower() in TRUE_VALUES:
+                return True
+            if raw.lower() in FALSE_VALUES:
+                return False
+            raise ValueError(f"{field}: '{raw}' ha/yo'q emas")
+        if field == "available_quantity":
+            if not raw.isdigit():
+                raise ValueError(f"{field}: '{raw}' musbat butun son emas")
+            return int(raw)
+        try:
+            value = Decimal(raw.replace(" ", "").replace(",", ""))
+        except InvalidOperation:
+            raise ValueError(f"{field}: '{raw}' son emas")
+        if value < 0 or value >= MAX_PRICE or value != value.to_integral_value():
+            raise ValueError(f"{field}: '{raw}' noto'g'ri narx")
+        return value
+
+    @staticmethod
+    def parse_csv(file):
+        """CSV: id ustuni majburiy, qolganlari EDITABLE_FIELDS dan ixtiyoriy"""
+        content = file.read()
+        if isinstance(content, bytes):
+            content = content.decode("utf-8-sig")
+        reader = csv.DictReader(io.StringIO(content))
+        if not reader.fieldnames or "id" not in reader.fieldnames:
+            raise BulkEditError({"csv": "CSV faylda 'id' ustuni yo'q"})
+        return [
+            {key: value for key, value in row.items() if key == "id" or key in EDITABLE_FIELDS}
+            for row in reader
+        ]
+
+    @classmethod
+    def clean(cls, rows):
+        """[{id, maydon: xom qiymat}] -> {id: {maydon: qiymat}}"""
+        if len(rows) > MAX_ROWS:
+            raise BulkEditError({"rows": f"Bir martada ko'pi bilan {MAX_ROWS} ta qator"})
+        changes, errors = {}, {}
+        for number, row in enumerate(rows, start=1):
+            raw_id = str(row.get("id") or "").strip()
+            if not raw_id.isdigit():
+                errors[number] = f"id: '{raw_id}' noto'g'ri"
+                continue
+            values = {}
+            for field in EDITABLE_FIELDS:
+                try:
+                    value = cls.parse_value(field, row.get(field))
+                except ValueError as exc:
+                    errors[number] = str(exc)
+                    break
+                if value is not None:
+                    values[field] = value
+            if values:
+                changes.setdefault(int(raw_id), {}).update(values)
+        if errors:
+            raise BulkEditError(errors)
+        return changes
+
+    @staticmethod
+    def notify_price_drops(products):
+        """Arzonlashgan mahsulotlar uchun bitta xabar (har biriga alohida emas)"""
+        if len(products) == 1:
+            body = translations(products[0], "desc")
+        else:
+            body = {lang: text.format(count=len(products)) for lang, text in PRICE_DROP_MANY.items()}
+        send_fcm_notification(TITLES["price_drop"], body, "productTopic")
+
+    @classmethod
+    def apply(cls, rows, notify=True):
+        changes = cls.clean(rows)
+        report = {"updated": 0, "unchanged": 0, "price_drops": 0}
+        if not changes:
+            return report
+
+        with transaction.atomic():
+            products = ProductItem.objects.select_for_update().in_bulk(list(changes))
+            missing = sorted(set(changes) - set(products))
+            if missing:
+                raise BulkEditError({pk: "mahsulot topilmadi" for pk in missing})
+
+            now = timezone.now()
+            changed, fields, drops, repriced = [], set(), [], []
+            for pk, values in changes.items():
+                product = products[pk]
+                before = effective_price(product)
+                # Narxlar aksiyada bo'lsa manual_* ga yoziladi (PromotionEngine.assign_price)
+                written = {PromotionEngine.assign_price(product, field, value) for field, value in values.items()}
+                written.discard(None)
+                if not written:
+                    report["unchanged"] += 1
+                    continue
+                # bulk_update AutoLastModifiedField'ni o'zi yangilamaydi (delta sync shunga tayanadi)
+                product.modified = now
+                fields.update(written)
+                changed.append(product)
+                if written & PROMOTION_INPUTS:
+                    repriced.append(product)
+                if product.active and effective_price(product) < before:
+                    drops.append(product)
+
+            if changed:
+                ProductItem.objects.bulk_update(changed, [*sorted(fields), "modified"], batch_size=BATCH_SIZE)
+                invalidate_namespaces(catalog_cache.PRODUCT)
+                if notify and drops:
+                    cls.notify_price_drops(drops)
+                if repriced:
+                    PromotionEngine.recompute_after_edit(repriced)
+
+        report["updated"] = len(changed)
+        report["price_drops"] = len(drops)
+        return report
+
+    @staticmethod
+    def export_csv(queryset, stream):
+        writer = csv.writer(stream)
+        writer.writerow(["id", "desc", *EDITABLE_FIELDS])
+        for row in queryset.order_by("id").values_list("id", "desc", *EDITABLE_FIELDS).iterator(chunk_size=2000):
+            product_id, desc, *values = row
+            writer.writerow([product_id, desc[:80], *["1" if v is True else "0" if v is False else v for v in values]])
@@ -0,0 +1,231 @@
+"""
+Katalog keshi (cache-aside).
+Backend settings.CACHES orqali tanlanadi: prod'da Redis, lokal va testlarda jarayon xotirasi (LocMemCache).
+
+Kalitlar namespace versiyasi bilan yoziladi: "{namespace}:v{version}:{key}".
+Invalidatsiya namespace versiyasini oshiradi — eski kalitlar o'chirilmaydi,
+shunchaki o'qilmay qoladi va TTL bo'yicha o'zi tozalanadi.
+
+Juda issiq va kichik ma'lumotlar (sozlamalar, kategoriyalar) uchun jarayon xotirasidagi
+LocalCache ham bor; u boshqa worker'lardagi o'zgarishlardan apps.product.cache_bus
+(PostgreSQL LISTEN/NOTIFY) orqali xabar topadi.
+"""
+
+import hashlib
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, Optional, TypeVar
+
+from django.core.cache import cache
+from django.utils.translation import get_language
+from rest_framework.response import Response
+
+T = TypeVar("T")
+
+# Invalidatsiya signallari ishlatadigan namespace'lar
+PRODUCT = "product"
+CATEGORY = "category"
+BANNER = "banner"
+NEWS = "news"
+CONFIG = "config"
+
+DEFAULT_TIMEOUT = 300
+
+# Kesh bo'sh qolganda faqat bitta jarayon loader'ni chaqiradi, qolganlar shuncha kutadi
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+# LocalCache'da bitta namespace uchun maksimal kalitlar soni (query string'lar cheksiz bo'lishi mumkin)
+LOCAL_MAX_KEYS = 256
+
+_MISSING = object()
+
+
+class CacheStats:
+    """
+    Hit/miss hisoblagichlari. Har bir jarayon avval o'zida yig'adi va har
+    FLUSH_EVERY ta hodisada umumiy keshga qo'shadi — shunda barcha worker'lar
+    bo'yicha jami ko'rinadi va har bir so'rovga qo'shimcha round trip qo'shilmaydi.
+    """
+
+    FLUSH_EVERY = 50
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+
+    @staticmethod
+    def _key(namespace, outcome):
+        return f"cache-stats:{namespace}:{outcome}"
+
+    def record(self, namespace, outcome):
+        with self._lock:
+            self._pending[(namespace, outcome)] += 1
+            should_flush = sum(self._pending.values()) >= self.FLUSH_EVERY
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        for (namespace, outcome), count in pending.items():
+            key = self._key(namespace, outcome)
+            cache.add(key, 0, timeout=None)
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                # Kalit shu orada o'chirilgan bo'lsa (masalan cache.clear())
+                cache.set(key, count, timeout=None)
+
+    def snapshot(self, namespaces: Iterable[str] = (PRODUCT, CATEGORY, BANNER, NEWS)) -> Dict[str, dict]:
+        self.flush()
+        keys = {
+            self._key(ns, outcome): (ns, outcome)
+            for ns in namespaces
+            for outcome in ("hit", "miss")
+        }
+        values = cache.get_many(list(keys))
+        result = {}
+        for key, (ns, outcome) in keys.items():
+            result.setdefault(ns, {"hit": 0, "miss": 0})[outcome] = values.get(key, 0)
+        for counts in result.values():
+            total = counts["hit"] + counts["miss"]
+            counts["hit_ratio"] = round(counts["hit"] / total, 3) if total else None
+        return result
+
+
+stats = CacheStats()
+
+
+def namespace_version(namespace: str) -> int:
+    return cache.get(f"cache-version:{namespace}") or 1
+
+
+def make_key(namespace: str, *parts) -> str:
+    """Versiyali kalit. Uzun qismlar (query string va h.k.) hash qilinadi."""
+    raw = ":".join(str(p) for p in parts)
+    if len(raw) > 100:
+        raw = hashlib.sha1(raw.encode()).hexdigest()
+    return f"{namespace}:v{namespace_version(namespace)}:{raw}"
+
+
+def get_or_set(namespace: str, key_parts: Iterable, loader: Callable[[], T],
+               timeout: Optional[int] = DEFAULT_TIMEOUT) -> T:
+    """
+    Cache-aside: kalit bo'lsa qaytaradi, bo'lmasa loader() natijasini yozadi.
+    Bir vaqtda kelgan miss'larda loader faqat bitta marta chaqiriladi (stampede lock).
+    """
+    key = make_key(namespace, *key_parts)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        stats.record(namespace, "hit")
+        return value
+
+    stats.record(namespace, "miss")
+    lock_key = f"{key}:lock"
+    if not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        # Boshqa jarayon hisoblayapti — natijani kutamiz
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+        # Lock egasi yiqilgan bo'lsa, o'zimiz hisoblaymiz
+
+    try:
+        value = loader()
+        cache.set(key, value, timeout=timeout)
+    finally:
+        cache.delete(lock_key)
+    return value
+
+
+class LocalCache:
+    """
+    Jarayon xotirasidagi kesh (L1). O'qish tarmoqsiz, lekin har bir worker'da alohida,
+    shuning uchun faqat cache_bus tinglovchisi ishlayotgan jarayonlarda ishonchli.
+    TTL — xabar yo'qolgan holatlar uchun zaxira.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, tuple]] = {}
+        # Har bir evict'da oshadi: yuklash paytida kelgan invalidatsiya eski qiymatni saqlatmaydi
+        self._generation: Counter = Counter()
+
+    def generation(self, namespace):
+        return self._generation[namespace]
+
+    def get(self, namespace, key):
+        entry = self._data.get(namespace, {}).get(key)
+        if entry is None or entry[1] < time.monotonic():
+            return _MISSING
+        return entry[0]
+
+    def set(self, namespace, key, value, timeout, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation[namespace]:
+                return
+            bucket = self._data.setdefault(namespace, {})
+            if len(bucket) >= LOCAL_MAX_KEYS:
+                bucket.clear()
+            bucket[key] = (value, time.monotonic() + timeout)
+
+    def evict(self, namespace):
+        with self._lock:
+            self._generation[namespace] += 1
+            self._data.pop(namespace, None)
+
+    def clear(self):
+        with self._lock:
+            for namespace in list(self._data):
+                self._generation[namespace] += 1
+            self._data.clear()
+
+
+local = LocalCache()
+
+
+def local_get_or_set(namespace: str, key_parts: Iterable, loader: Callable[[], T],
+                     timeout: int = 60) -> T:
+    """Jarayon xotirasidan o'qiydi; bo'lmasa loader() ni chaqirib saqlaydi"""
+    key = ":".join(str(p) for p in key_parts)
+    value = local.get(namespace, key)
+    if value is not _MISSING:
+        return value
+    generation = local.generation(namespace)
+    value = loader()
+    local.set(namespace, key, value, timeout, generation=generation)
+    return value
+
+
+class LocalCachedListMixin:
+    """
+    ListAPIView javobini worker xotirasida saqlaydi (kam o'zgaradigan sozlama jadvallari uchun).
+    Javob shaxsiy bo'lmasligi kerak: kalitda foydalanuvchi yo'q.
+    """
+    cache_namespace = CONFIG
+    cache_timeout = 300
+
+    def list(self, request, *args, **kwargs):
+        data = local_get_or_set(
+            self.cache_namespace,
+            (type(self).__name__, get_language(), request.get_host(), request.GET.urlencode()),
+            lambda: super(LocalCachedListMixin, self).list(request, *args, **kwargs).data,
+            self.cache_timeout,
+        )
+        return Response(data)
+
+
+def invalidate(*namespaces: str) -> None:
+    """Namespace versiyasini oshiradi: undagi barcha kalitlar bir zumda eskiradi"""
+    for namespace in namespaces:
+        version_key = f"cache-version:{namespace}"
+        if cache.add(version_key, 2, timeout=None):
+            continue
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            cache.set(version_key, 2, timeout=None)
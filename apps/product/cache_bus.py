@@ -0,0 +1,104 @@
+"""
+Worker'lar o'rtasida kesh invalidatsiyasi (PostgreSQL LISTEN/NOTIFY).
+
+Model signallari publish() orqali kanalga namespace nomini yuboradi; NOTIFY tranzaksiya
+commit bo'lganda yetkaziladi. Har bir gunicorn worker'ida start_listener() alohida
+ulanish bilan kanalni tinglaydi va kelgan namespace'ni LocalCache'dan o'chiradi.
+
+start_listener() config/wsgi.py va config/asgi.py da chaqiriladi. gunicorn --preload bilan
+oqim master jarayonda qolib ketadi, shuning uchun u holda post_fork hook'dan chaqirish kerak.
+"""
+
+import logging
+import os
+import select
+import threading
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+from . import cache as catalog_cache
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+
+# select() shu vaqtdan ko'p kutmaydi: stop() so'rovi tez bajarilishi uchun
+POLL_TIMEOUT = 5
+RECONNECT_DELAY = 2
+
+
+def publish(*namespaces):
+    """Barcha worker'larga xabar beradi va o'z jarayonidagi keshni darhol tozalaydi"""
+    for namespace in namespaces:
+        catalog_cache.local.evict(namespace)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, namespace])
+
+
+class InvalidationListener(threading.Thread):
+    """
+    Alohida DB ulanishida kanalni tinglaydi; uzilsa qayta ulanadi.
+    Boshqa kanallar uchun (masalan apps.merchant.events) channel, on_connect va handle
+    qayta yoziladi.
+    """
+    channel = CHANNEL
+
+    def __init__(self):
+        super().__init__(name=f"{self.channel}-listener", daemon=True)
+        self._stop_event = threading.Event()
+        self.ready = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def on_connect(self):
+        # Ulanish uzilgan paytda kelgan xabarlar yo'qolgan bo'lishi mumkin
+        catalog_cache.local.clear()
+
+    def handle(self, payload):
+        catalog_cache.local.evict(payload)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            wrapper = connections.create_connection(DEFAULT_DB_ALIAS)
+            try:
+                wrapper.ensure_connection()
+                raw = wrapper.connection
+                raw.autocommit = True
+                with raw.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+                self.on_connect()
+                self.ready.set()
+
+                while not self._stop_event.is_set():
+                    readable, _, _ = select.select([raw], [], [], POLL_TIMEOUT)
+                    if not readable:
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        self.handle(raw.notifies.pop(0).payload)
+            except Exception:
+                logger.exception("%s listener failed, reconnecting", self.channel)
+                time.sleep(RECONNECT_DELAY)
+            finally:
+                self.ready.clear()
+                wrapper.close()
+
+
+_listener = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def start_listener():
+    """Har bir jarayonda bitta tinglovchi oqim (fork'dan keyin qayta ishga tushadi)"""
+    global _listener, _listener_pid
+    with _listener_lock:
+        if _listener is not None and _listener_pid == os.getpid() and _listener.is_alive():
+            return _listener
+        _listener = InvalidationListener()
+        _listener_pid = os.getpid()
+        _listener.start()
+        return _listener
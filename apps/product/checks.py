@@ -0,0 +1,27 @@
+"""
+Deploy tekshiruvlari (manage.py check --deploy).
+
+Katalog keshi (apps.product.cache) stampede qulfi uchun cache.add() va invalidatsiya uchun
+cache.incr() ga tayanadi — ular barcha worker'lar uchun umumiy va atomar bo'lishi kerak.
+Fayl va LocMem keshlari buni ta'minlamaydi, shuning uchun prod'da faqat Redis.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+SHARED_CACHE_BACKENDS = ("django.core.cache.backends.redis.RedisCache",)
+
+
+@register(Tags.caches, deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if backend in SHARED_CACHE_BACKENDS:
+        return []
+    return [
+        Error(
+            f"Default cache backend {backend} is not shared between worker processes.",
+            hint="Set REDIS_URL: catalog cache locks and invalidation need an atomic shared cache.",
+            id="product.E001",
+        )
+    ]
@@ -0,0 +1,92 @@
+"""
+Ilova bosh sahifasi uchun yig'ma javob.
+
+Oldin ilova ishga tushganda 7 ta alohida so'rov yuborardi (bannerlar, kategoriyalar,
+ommabop, chegirmadagi va yangi mahsulotlar, o'qilmagan yangilik, loyalty karta).
+Bu yerda hammasi bitta javobda yig'iladi:
+    - umumiy bo'limlar til/host (mahsulotlarda narx darajasi ham) bo'yicha keshlanadi;
+    - shaxsiy bo'limlar (is_favorite, loyalty balansi, o'qilmagan yangilik) har bir
+      so'rov uchun alohida, imkon qadar bitta so'rov bilan qo'shiladi.
+"""
+
+from django.db.models import F, Sum
+from django.utils.translation import get_language
+
+from apps.customer.base import CustomerListService
+from apps.customer.models import News
+from apps.customer.serializers import BannerSerializer, NewsSerializer
+from apps.merchant.models import LoyaltyCard
+from apps.merchant.serializers import LoyaltyCardSerializer
+from . import cache as catalog_cache
+from .models import Category, Good
+from .serializers import CategorySerializer, GoodPopularSerializer, GoodSerializer
+from .singleflight import overlay_favorites, user_tier
+from .utils import optimized_queryset
+
+
+# Har bir mahsulot bo'limida nechta element ko'rsatiladi
+HOME_SECTION_SIZE = 10
+
+PRODUCT_SECTIONS = ("popular_goods", "sale_goods", "new_goods")
+
+
+class HomeService:
+
+    @staticmethod
+    def _product_sections(context):
+        goods = optimized_queryset(Good)
+        popular = goods.annotate(sold_count=Sum("product__sold_products__quantity")).order_by("-sold_count")
+        sale = goods.filter(product__new_price__lt=F("product__old_price")).order_by("-pk")
+        new = goods.order_by("-product__created")
+        return {
+            "popular_goods": GoodPopularSerializer(popular[:HOME_SECTION_SIZE], many=True, context=context).data,
+            "sale_goods": GoodSerializer(sale[:HOME_SECTION_SIZE], many=True, context=context).data,
+            "new_goods": GoodSerializer(new[:HOME_SECTION_SIZE], many=True, context=context).data,
+        }
+
+    @staticmethod
+    def shared_sections(request):
+        """Hamma foydalanuvchilar uchun bir xil bo'limlar (namespace bo'yicha keshlanadi)"""
+        lang, host = get_language(), request.get_host()
+        # is_favorite keyin personalize() da qo'shiladi
+        context = {"request": request, "favorite_product_ids": frozenset()}
+
+        sections = {
+            "banners": catalog_cache.get_or_set(
+                catalog_cache.BANNER, ("home", lang, host),
+                lambda: BannerSerializer(
+                    CustomerListService.get_banners_list().filter(active=True), many=True, context=context
+                ).data,
+            ),
+            "categories": catalog_cache.get_or_set(
+                catalog_cache.CATEGORY, ("home", lang, host),
+                lambda: CategorySerializer(
+                    Category.objects.all().order_by("-pk"), many=True, context=context
+                ).data,
+            ),
+        }
+        # Narxlar foydalanuvchi darajasiga bog'liq
+        sections.update(catalog_cache.get_or_set(
+            catalog_cache.PRODUCT, ("home", lang, host, user_tier(request.user)),
+            lambda: HomeService._product_sections(context),
+        ))
+        return sections
+
+    @staticmethod
+    def personalize(sections, request):
+        """Umumiy bo'limlarga foydalanuvchining shaxsiy ma'lumotlarini qo'shadi"""
+        profile = request.user.profile
+
+        # Uchala mahsulot bo'limi uchun sevimlilar bitta so'rovda
+        rows = [row for name in PRODUCT_SECTIONS for row in sections[name]]
+        marked = iter(overlay_favorites(rows, request.user))
+        result = dict(sections)
+        for name in PRODUCT_SECTIONS:
+            result[name] = [next(marked) for _ in sections[name]]
+
+        latest_news = News.get_latest_unviewed_news(profile)
+        result["latest_news"] = NewsSerializer(latest_news).data if latest_news else None
+
+        card = LoyaltyCard.objects.select_related("profile").filter(profile=profile).first()
+        result["loyalty_card"] = LoyaltyCardSerializer(card).data if card else None
+        return result
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.product.promotions import PromotionEngine
+
+
+class Command(BaseCommand):
+    help = (
+        "Aksiya narxlarini butun katalog bo'yicha qayta hisoblaydi (faqat o'zgargan narxlar yoziladi). "
+        "Aksiyalar o'z vaqtida boshlanib/tugashi uchun cron'da har daqiqada ishga tushiring."
+    )
+
+    def handle(self, *args, **options):
+        changed = PromotionEngine.recompute()
+        next_boundary = PromotionEngine.next_boundary()
+        self.stdout.write(self.style.SUCCESS(
+            f"{changed} products repriced. Next promotion boundary: {next_boundary or '-'}"
+        ))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.product.snapshot import CatalogSnapshotService
+
+
+class Command(BaseCommand):
+    help = (
+        "Faol katalogni har bir til uchun gzip JSON snapshot qilib media storage'ga yozadi. "
+        "Cron uchun: --if-dirty --debounce 120"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Katalog o'zgarmagan bo'lsa ham qayta yozish")
+        parser.add_argument("--if-dirty", action="store_true", help="Faqat katalog o'zgargan bo'lsa")
+        parser.add_argument(
+            "--debounce", type=int, default=0,
+            help="Oxirgi o'zgarishdan keyin shuncha soniya o'tmaguncha kutish (--if-dirty bilan)",
+        )
+
+    def handle(self, *args, **options):
+        if options["if_dirty"]:
+            dirty_since = CatalogSnapshotService.dirty_since()
+            if dirty_since is None:
+                self.stdout.write("Catalog unchanged, nothing to build.")
+                return
+            if time.time() - dirty_since < options["debounce"]:
+                self.stdout.write("Catalog is still changing, skipping.")
+                return
+
+        manifest = CatalogSnapshotService.build(force=options["force"])
+        sizes = ", ".join(f"{lang}: {info['size']} B" for lang, info in manifest["files"].items())
+        self.stdout.write(self.style.SUCCESS(f"Snapshot {manifest['version']} ready ({sizes})."))
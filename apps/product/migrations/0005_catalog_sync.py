@@ -0,0 +1,52 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:10
+
+import django.utils.timezone
+import model_utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0004_alter_good_product'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('category', 'Category'), ('product', 'ProductItem'), ('good', 'Good'), ('phone', 'Phone'), ('ticket', 'Ticket'), ('image', 'Image')], max_length=16)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='good',
+            name='modified',
+            field=model_utils.fields.AutoLastModifiedField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='modified',
+            field=model_utils.fields.AutoLastModifiedField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='phone',
+            name='modified',
+            field=model_utils.fields.AutoLastModifiedField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='modified',
+            field=model_utils.fields.AutoLastModifiedField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='productitem',
+            index=models.Index(fields=['modified', 'id'], name='productitem_sync_cursor'),
+        ),
+        migrations.AddIndex(
+            model_name='catalogtombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='tombstone_sync_cursor'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:45
+
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0005_catalog_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productitem',
+            name='manual_b2b_price',
+            field=models.DecimalField(blank=True, decimal_places=0, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='productitem',
+            name='manual_new_price',
+            field=models.DecimalField(blank=True, decimal_places=0, editable=False, max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('name', models.CharField(max_length=255)),
+                ('scope', models.CharField(choices=[('category', 'Kategoriya'), ('product_type', 'Mahsulot guruhi'), ('product', 'Mahsulot')], max_length=16)),
+                ('product_type', models.UUIDField(blank=True, null=True)),
+                ('kind', models.CharField(choices=[('percent', 'Foiz'), ('fixed', 'Summa')], default='percent', max_length=8)),
+                ('value', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('tier', models.CharField(choices=[('retail', 'Chakana'), ('b2b', 'B2B')], default='retail', max_length=8)),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('active', models.BooleanField(default=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='product.category')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='product.productitem')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='productitem',
+            name='b2b_promotion',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='product.promotion'),
+        ),
+        migrations.AddField(
+            model_name='productitem',
+            name='promotion',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='product.promotion'),
+        ),
+        migrations.AddIndex(
+            model_name='promotion',
+            index=models.Index(fields=['active', 'starts_at', 'ends_at'], name='promotion_window_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.10 on 2026-10-19 18:30
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+import apps.customer.trigram
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0006_profile_trigram_indexes'),
+        ('product', '0006_promotions'),
+    ]
+
+    operations = [
+        apps.customer.trigram.AddTrigramIndex(
+            model_name='good',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.text.Concat('name_uz', models.Value(' '), 'name_en', models.Value(' '), 'name_ru', models.Value(' '), 'name_ko', output_field=models.TextField())), name='gin_trgm_ops'), name='good_name_trgm'),
+        ),
+        apps.customer.trigram.AddTrigramIndex(
+            model_name='phone',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.text.Concat('model_name_uz', models.Value(' '), 'model_name_en', models.Value(' '), 'model_name_ru', models.Value(' '), 'model_name_ko', output_field=models.TextField())), name='gin_trgm_ops'), name='phone_model_name_trgm'),
+        ),
+        apps.customer.trigram.AddTrigramIndex(
+            model_name='productitem',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.text.Concat('desc_uz', models.Value(' '), 'desc_en', models.Value(' '), 'desc_ru', models.Value(' '), 'desc_ko', output_field=models.TextField())), name='gin_trgm_ops'), name='productitem_desc_trgm'),
+        ),
+        apps.customer.trigram.AddTrigramIndex(
+            model_name='ticket',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.text.Concat('event_name_uz', models.Value(' '), 'event_name_en', models.Value(' '), 'event_name_ru', models.Value(' '), 'event_name_ko', output_field=models.TextField())), name='gin_trgm_ops'), name='ticket_event_name_trgm'),
+        ),
+    ]
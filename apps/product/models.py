@@ -1,8 +1,30 @@
 import uuid
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Concat, Upper
+from django.utils import timezone
+from model_utils.fields import AutoLastModifiedField
 from model_utils.models import TimeStampedModel
 
 
+def translated_text(field):
+    """
+    Tarjima qilinadigan maydonning barcha tillardagi qiymatlari bitta matnda.
+    Admin qidiruvi (icontains -> UPPER(...) LIKE) va trigram_index aynan shu ifodadan foydalanadi — aks holda indeks ishlamaydi.
+    """
+    parts = []
+    for lang in settings.MODELTRANSLATION_LANGUAGES:
+        parts += [f"{field}_{lang}", Value(" ")]
+    return Concat(*parts[:-1], output_field=models.TextField())
+
+
+def trigram_index(field, name):
+    return GinIndex(OpClass(Upper(translated_text(field)), name="gin_trgm_ops"), name=name)
+
+
 class Category(TimeStampedModel, models.Model):
     PRODUCT_TYPE = (
         ("f", "Oziq-ovqat"),
@@ -63,9 +85,24 @@ class ProductItem(TimeStampedModel, models.Model):
     main = models.BooleanField(default=True)
     active = models.BooleanField(default=True)
 
+    # Aksiyalar (apps.product.promotions) new_price / b2b_price ga yozadi; qo'lda qo'yilgan
+    # narx aksiya tugaguncha manual_* da saqlanadi (None — aksiya qo'llanmagan)
+    promotion = models.ForeignKey(
+        "Promotion", on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="+"
+    )
+    manual_new_price = models.DecimalField(decimal_places=0, max_digits=10, null=True, blank=True, editable=False)
+    b2b_promotion = models.ForeignKey(
+        "Promotion", on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="+"
+    )
+    manual_b2b_price = models.DecimalField(decimal_places=0, max_digits=10, null=True, blank=True, editable=False)
+
     class Meta:
         indexes = [
             models.Index(fields=['product_type']),
+            # Delta sync kursori (modified, id) bo'yicha o'qiydi
+            models.Index(fields=['modified', 'id'], name='productitem_sync_cursor'),
+            # Admin qidiruvi: ta'rif ichidan, barcha tillarda
+            trigram_index("desc", "productitem_desc_trgm"),
         ]
 
     @property
@@ -97,6 +134,11 @@ class Ticket(models.Model):
     category = models.ForeignKey(
         Category, on_delete=models.SET_NULL, null=True, related_name="tickets"
     )
+    # Delta sync uchun (api/product/sync/)
+    modified = AutoLastModifiedField(db_index=True)
+
+    class Meta:
+        indexes = [trigram_index("event_name", "ticket_event_name_trgm")]
 
     def __str__(self) -> str:
         return self.event_name
@@ -138,6 +180,10 @@ class Phone(models.Model):
     category = models.ForeignKey(
         Category, on_delete=models.SET_NULL, null=True, related_name="phones"
     )
+    modified = AutoLastModifiedField(db_index=True)
+
+    class Meta:
+        indexes = [trigram_index("model_name", "phone_model_name_trgm")]
 
     def __str__(self) -> str:
         return self.model_name
@@ -159,6 +205,10 @@ class Good(models.Model):
     category = models.ForeignKey(
         Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="goods"
     )
+    modified = AutoLastModifiedField(db_index=True)
+
+    class Meta:
+        indexes = [trigram_index("name", "good_name_trgm")]
 
     def __str__(self) -> str:
         return self.name
@@ -170,6 +220,7 @@ class Image(models.Model):
     product = models.ForeignKey(
         ProductItem, on_delete=models.CASCADE, related_name="images"
     )
+    modified = AutoLastModifiedField(db_index=True)
 
     def __str__(self) -> str:
         return self.name
@@ -185,3 +236,80 @@ class SoldProduct(TimeStampedModel, models.Model):
 
     def __int__(self) -> int:
         return self.id
+
+
+class CatalogTombstone(models.Model):
+    """
+    O'chirilgan katalog yozuvlari (delta sync uchun). post_delete signali yozadi.
+    Qurilma o'zidagi lokal katalogdan shu yozuvlarni o'chiradi.
+    """
+    ENTITIES = (
+        ("category", "Category"),
+        ("product", "ProductItem"),
+        ("good", "Good"),
+        ("phone", "Phone"),
+        ("ticket", "Ticket"),
+        ("image", "Image"),
+    )
+    entity = models.CharField(max_length=16, choices=ENTITIES)
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["deleted_at", "id"], name="tombstone_sync_cursor"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.entity}#{self.object_id}"
+
+
+class Promotion(TimeStampedModel, models.Model):
+    """
+    Aksiya qoidasi: kategoriya, mahsulot guruhi (product_type) yoki bitta mahsulot uchun
+    foiz yoki summa chegirmasi, [starts_at, ends_at) oralig'ida, chakana yoki B2B mijozlarga.
+    Narxlar so'rov paytida hisoblanmaydi: apps.product.promotions katalogni qayta hisoblab
+    ProductItem.new_price / b2b_price ga yozadi.
+    """
+    SCOPE_CHOICES = (
+        ("category", "Kategoriya"),
+        ("product_type", "Mahsulot guruhi"),
+        ("product", "Mahsulot"),
+    )
+    KIND_CHOICES = (
+        ("percent", "Foiz"),
+        ("fixed", "Summa"),
+    )
+    TIER_CHOICES = (
+        ("retail", "Chakana"),
+        ("b2b", "B2B"),
+    )
+
+    name = models.CharField(max_length=255)
+    scope = models.CharField(max_length=16, choices=SCOPE_CHOICES)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name="promotions")
+    product_type = models.UUIDField(null=True, blank=True)
+    product = models.ForeignKey(ProductItem, on_delete=models.CASCADE, null=True, blank=True, related_name="promotions")
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES, default="percent")
+    value = models.DecimalField(decimal_places=2, max_digits=12)
+    tier = models.CharField(max_length=8, choices=TIER_CHOICES, default="retail")
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    active = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["active", "starts_at", "ends_at"], name="promotion_window_idx"),
+        ]
+
+    def clean(self):
+        targets = {"category": self.category_id, "product_type": self.product_type, "product": self.product_id}
+        if not targets.get(self.scope):
+            raise ValidationError({self.scope or "scope": "Aksiya qaysi mahsulotlarga tegishli ekanini tanlang"})
+        if self.value is not None and (self.value <= 0 or (self.kind == "percent" and self.value > 100)):
+            raise ValidationError({"value": "Chegirma 0 dan katta (foizda 100 dan oshmagan) bo'lishi kerak"})
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError({"ends_at": "Tugash vaqti boshlanishidan keyin bo'lishi kerak"})
+
+    def __str__(self) -> str:
+        return self.name
@@ -0,0 +1,199 @@
+"""
+Aksiya narxlarini butun katalog bo'yicha qayta hisoblash.
+
+O'qish yo'li o'zgarmaydi: mijoz, savat va buyurtma avvalgidek new_price / b2b_price ustunini
+o'qiydi. Aksiya boshlanganda/tugaganda yoki o'zgarganda recompute():
+    1) katalog ustunlar ko'rinishida bitta so'rovda o'qiladi (id, old_price, narxlar, guruh, kategoriya);
+    2) har bir faol qoida butun ustun bo'yicha bir marta o'tadi va har bir mahsulot uchun
+       eng katta chegirmani saqlaydi (qoidalar soni x mahsulotlar, mahsulot uchun alohida so'rov yo'q);
+    3) faqat narxi o'zgargan qatorlar bulk_update bilan yoziladi, keyin bitta kesh invalidatsiyasi.
+
+Qoidalar:
+    - chakana: chegirma old_price dan hisoblanadi; qo'lda qo'yilgan new_price bundan arzon bo'lsa,
+      aksiya qo'llanmaydi;
+    - B2B: chegirma qo'lda qo'yilgan b2b_price dan (u bo'lmasa old_price dan);
+    - qo'lda qo'yilgan narx manual_* ustunida saqlanadi va aksiya tugaganda qaytariladi;
+    - aksiya davomida admin narxni o'zgartirsa (forma, bulk tahrir), qiymat assign_price() orqali
+      manual_* ga yoziladi va recompute_after_edit() narxni shu yangi asosdan qayta hisoblaydi.
+"""
+
+import logging
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import cache as catalog_cache
+from .models import ProductItem, Promotion
+from .signals import invalidate_namespaces
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+ZERO = Decimal(0)
+
+# tier -> (narx ustuni, qo'lda qo'yilgan narx ustuni, qo'llangan aksiya ustuni)
+TIER_COLUMNS = {
+    "retail": ("new_price", "manual_new_price", "promotion_id"),
+    "b2b": ("b2b_price", "manual_b2b_price", "b2b_promotion_id"),
+}
+
+CATALOG_COLUMNS = (
+    "id", "old_price", "product_type", "category_id",
+    "new_price", "manual_new_price", "promotion_id",
+    "b2b_price", "manual_b2b_price", "b2b_promotion_id",
+)
+
+
+def active_rules(now=None):
+    now = now or timezone.now()
+    return list(Promotion.objects.filter(active=True, starts_at__lte=now, ends_at__gt=now).order_by("id"))
+
+
+class PromotionEngine:
+
+    @staticmethod
+    def load_catalog():
+        """Katalog ustunlar bo'yicha: {ustun: [qiymatlar]}"""
+        rows = list(
+            ProductItem.objects.annotate(
+                category_id=Coalesce("goods__category_id", "phones__category_id", "tickets__category_id")
+            ).order_by("id").values_list(*CATALOG_COLUMNS)
+        )
+        columns = {name: [] for name in CATALOG_COLUMNS}
+        for row in rows:
+            for name, value in zip(CATALOG_COLUMNS, row):
+                columns[name].append(value)
+        return columns
+
+    @staticmethod
+    def rule_mask(rule, catalog):
+        """Qoida tegishli bo'lgan mahsulotlar (ustun bo'yicha bool ro'yxat)"""
+        if rule.scope == "category":
+            return [category == rule.category_id for category in catalog["category_id"]]
+        if rule.scope == "product_type":
+            return [product_type == rule.product_type for product_type in catalog["product_type"]]
+        return [product_id == rule.product_id for product_id in catalog["id"]]
+
+    @classmethod
+    def evaluate(cls, catalog, rules, tier):
+        """
+        Bitta tier uchun yangi (narx, qo'lda qo'yilgan narx, aksiya id) ustunlari.
+        Faqat hisoblaydi, bazaga yozmaydi.
+        """
+        price_col, manual_col, promo_col = TIER_COLUMNS[tier]
+        size = len(catalog["id"])
+        # Aksiyasiz narx: stash bo'lsa o'sha, aks holda joriy ustun
+        manual = [
+            stashed if stashed is not None else (current or ZERO)
+            for stashed, current in zip(catalog[manual_col], catalog[price_col])
+        ]
+        list_price = [old or ZERO for old in catalog["old_price"]]
+        if tier == "b2b":
+            base = [own if own > 0 else retail for own, retail in zip(manual, list_price)]
+        else:
+            base = list_price
+
+        best_discount = [ZERO] * size
+        best_rule = [None] * size
+        for rule in rules:
+            if rule.tier != tier:
+                continue
+            mask = cls.rule_mask(rule, catalog)
+            for i in range(size):
+                if not mask[i] or base[i] <= 0:
+                    continue
+                discount = base[i] * rule.value / 100 if rule.kind == "percent" else rule.value
+                discount = min(discount, base[i]).quantize(Decimal(1), ROUND_HALF_UP)
+                if discount > best_discount[i]:
+                    best_discount[i], best_rule[i] = discount, rule.id
+
+        prices, stashes, applied = [], [], []
+        for i in range(size):
+            promo_price = base[i] - best_discount[i]
+            beats_manual = manual[i] <= 0 or promo_price < manual[i]
+            if best_rule[i] is not None and beats_manual:
+                prices.append(promo_price)
+                stashes.append(manual[i])
+                applied.append(best_rule[i])
+            else:
+                prices.append(manual[i] if catalog[manual_col][i] is not None else catalog[price_col][i])
+                stashes.append(None)
+                applied.append(None)
+        return {price_col: prices, manual_col: stashes, promo_col: applied}
+
+    @classmethod
+    def recompute(cls, now=None):
+        """Butun katalog narxlarini aksiyalar bo'yicha yangilaydi; o'zgargan mahsulotlar sonini qaytaradi"""
+        now = now or timezone.now()
+        with transaction.atomic():
+            rules = active_rules(now)
+            catalog = cls.load_catalog()
+            results = {}
+            for tier in TIER_COLUMNS:
+                results.update(cls.evaluate(catalog, rules, tier))
+
+            # modified — yozish vaqti (tranzaksiya ichida), qoidalar vaqti now emas: delta sync watermark'i shunga tayanadi
+            modified = timezone.now()
+            changed, fields = [], set()
+            for i, product_id in enumerate(catalog["id"]):
+                diff = {
+                    column: values[i] for column, values in results.items()
+                    if values[i] != catalog[column][i]
+                }
+                if not diff:
+                    continue
+                product = ProductItem(id=product_id)
+                for column, value in diff.items():
+                    setattr(product, column, value)
+                product.modified = modified
+                changed.append(product)
+                fields.update(column.removesuffix("_id") for column in diff)
+
+            if changed:
+                ProductItem.objects.bulk_update(changed, [*sorted(fields), "modified"], batch_size=BATCH_SIZE)
+                invalidate_namespaces(catalog_cache.PRODUCT)
+
+        logger.info("Promotions recomputed: %d rules, %d products changed", len(rules), len(changed))
+        return len(changed)
+
+    @classmethod
+    def recompute_on_commit(cls):
+        transaction.on_commit(cls.recompute)
+
+    @staticmethod
+    def assign_price(product, field, value):
+        """
+        Qo'lda kiritilgan narxni yozadi (saqlamaydi). Aksiya qo'llangan bo'lsa narx ustuni aksiyada qoladi,
+        qiymat esa manual_* ga — aks holda aksiya tugaganda eski stash qaytib kelardi.
+        Joriy (ko'rinib turgan) narxga teng qiymat o'zgarish hisoblanmaydi. Yozilgan ustunni yoki None qaytaradi.
+        """
+        if value == getattr(product, field):
+            return None
+        for price_col, manual_col, promo_col in TIER_COLUMNS.values():
+            if field == price_col and getattr(product, promo_col) is not None:
+                # Bo'sh narx stash'da "qo'lda narx yo'q" (0) bo'ladi; None stash yo'qligini bildiradi
+                setattr(product, manual_col, value if value is not None else ZERO)
+                return manual_col
+        setattr(product, field, value)
+        return field
+
+    @classmethod
+    def recompute_after_edit(cls, products):
+        """Narxi qo'lda o'zgargan mahsulotlar: aksiyada bo'lsa yoki faol qoida bo'lsa commit'dan keyin qayta hisoblash"""
+        if any(p.promotion_id or p.b2b_promotion_id for p in products) or active_rules():
+            cls.recompute_on_commit()
+
+    @staticmethod
+    def next_boundary(now=None):
+        """Keyingi aksiya boshlanishi yoki tugashi (cron buyrug'i uchun)"""
+        now = now or timezone.now()
+        upcoming = Promotion.objects.filter(active=True).filter(Q(starts_at__gt=now) | Q(ends_at__gt=now))
+        moments = [
+            moment for rule in upcoming.only("starts_at", "ends_at")
+            for moment in (rule.starts_at, rule.ends_at) if moment > now
+        ]
+        return min(moments, default=None)
@@ -24,6 +24,10 @@ class FavoriteMixin(metaclass=serializers.SerializerMetaclass):
         request = self.context.get("request")
         if not request or request.user.is_anonymous:
             return False
+        # View sevimlilarni oldindan bergan bo'lsa (single-flight), har bir element uchun so'rov yo'q
+        favorite_ids = self.context.get("favorite_product_ids")
+        if favorite_ids is not None:
+            return obj.product_id in favorite_ids
         # exists() filter(...).first() dan tezroq ishlaydi
         return Favorite.objects.filter(
             user=request.user.profile,
@@ -375,3 +379,24 @@ class GoodFullSerializer(serializers.ModelSerializer):
             .order_by("-main", "id")
         )
         return ProductVariantFullSerializer(queryset, many=True, context=self.context).data
+
+
+# --- Delta sync ---
+# Lokal katalog uchun tekis yozuvlar: product va category faqat id bilan
+
+class GoodSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Good
+        fields = "__all__"
+
+
+class PhoneSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Phone
+        fields = "__all__"
+
+
+class TicketSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Ticket
+        fields = "__all__"
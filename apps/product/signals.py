@@ -1,42 +1,140 @@
-import requests
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.conf import settings
-from apps.customer.models import News
-from .models import ProductItem
+from apps.customer.models import Banner, News
+from apps.customer.push import PushService
+from . import cache as catalog_cache
+from . import cache_bus
+from .snapshot import CatalogSnapshotService
+from .models import CatalogTombstone, Category, Good, Image, Phone, ProductItem, Promotion, Ticket
 
-FCM_URL = "https://fcm.googleapis.com/fcm/send"
-FCM_SERVER_KEY = settings.FCM_SERVER_KEY
+# Sarlavhalar har bir til uchun (body esa modeltranslation maydonlaridan olinadi)
+TITLES = {
+    "news": {"uz": "Yangilik!", "ru": "Новость!", "en": "News!", "ko": "새 소식!"},
+    "new_product": {"uz": "Yangi mahsulot!", "ru": "Новый товар!", "en": "New product!", "ko": "신상품!"},
+    "price_drop": {
+        "uz": "Mahsulot narxi arzonladi", "ru": "Цена на товар снизилась",
+        "en": "Price dropped", "ko": "가격이 내렸습니다",
+    },
+}
 
+# Ko'p mahsulot birdaniga arzonlashganda (bulk tahrir) bitta xabar matni
+PRICE_DROP_MANY = {
+    "uz": "{count} ta mahsulot narxi arzonladi",
+    "ru": "Снижены цены на {count} товаров",
+    "en": "{count} products are now cheaper",
+    "ko": "{count}개 상품의 가격이 내렸습니다",
+}
 
-def send_fcm_notification(title, body, topic):
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"key={FCM_SERVER_KEY}",
-    }
-    data = {
-        "to": f"/topics/all",
-        "priority": "high",
-        "notification": {"title": title, "body": body},
+
+def translations(instance, field):
+    return {
+        lang: getattr(instance, f"{field}_{lang}", None) or getattr(instance, field)
+        for lang in settings.MODELTRANSLATION_LANGUAGES
     }
-    requests.post(FCM_URL, json=data, headers=headers)
-    # return response.json()
+
+
+def send_fcm_notification(title, body, topic):
+    """
+    title va body: {til: matn} yoki oddiy matn. Har bir foydalanuvchiga o'z tilida,
+    qurilma tokenlari bo'yicha yuboriladi (apps.customer.push).
+    """
+    def localized(value, lang):
+        return value.get(lang) if isinstance(value, dict) else value
+
+    PushService.send_localized(
+        {lang: (localized(title, lang), localized(body, lang)) for lang in settings.MODELTRANSLATION_LANGUAGES},
+        data={"topic": topic},
+    )
 
 
 @receiver(post_save, sender=News)
 def news_created(sender, instance, created, **kwargs):
     if created:
-        send_fcm_notification("Yangilik!", instance.title, "newsTopic")
+        send_fcm_notification(TITLES["news"], translations(instance, "title"), "newsTopic")
 
 
 @receiver(post_save, sender=ProductItem)
 def product_created(sender, instance, created, **kwargs):
     if created:
-        send_fcm_notification("Yangi mahsulot!", instance.desc, "productTopic")
+        send_fcm_notification(TITLES["new_product"], translations(instance, "desc"), "productTopic")
         # pass
 
 
 @receiver(post_save, sender=ProductItem)
 def product_price_changed(sender, instance, **kwargs):
     if instance.price_changed():  # Bu metod narx o'zgarganligini aniqlash uchun
-        send_fcm_notification("Mahsulot narxi arzonladi", instance.desc, "productTopic")
+        send_fcm_notification(TITLES["price_drop"], translations(instance, "desc"), "productTopic")
+
+
+# ---------------- KESH INVALIDATSIYASI ----------------
+# Umumiy keshda versiya commit'dan keyin oshiriladi: aks holda parallel so'rov eski
+# ma'lumotni yangi versiya kaliti ostida keshlab qo'yishi mumkin.
+# Worker'lar xotirasidagi kesh NOTIFY orqali tozalanadi (u ham commit'da yetkaziladi).
+
+CACHE_NAMESPACES = {
+    ProductItem: (catalog_cache.PRODUCT,),
+    Good: (catalog_cache.PRODUCT,),
+    Phone: (catalog_cache.PRODUCT,),
+    Ticket: (catalog_cache.PRODUCT,),
+    Image: (catalog_cache.PRODUCT,),
+    # Mahsulot javoblarida kategoriya ham bor
+    Category: (catalog_cache.CATEGORY, catalog_cache.PRODUCT),
+    Banner: (catalog_cache.BANNER,),
+    News: (catalog_cache.NEWS,),
+}
+
+
+def invalidate_catalog_cache(sender, **kwargs):
+    invalidate_namespaces(*CACHE_NAMESPACES[sender])
+
+
+def invalidate_namespaces(*namespaces):
+    """Signalsiz yo'llar (bulk_update) ham shu funksiyani bir marta chaqiradi"""
+    cache_bus.publish(*namespaces)
+    transaction.on_commit(lambda: catalog_cache.invalidate(*namespaces))
+    if catalog_cache.PRODUCT in namespaces:
+        # Snapshot'ni cron'dagi build_catalog_snapshot --if-dirty qayta quradi
+        transaction.on_commit(CatalogSnapshotService.mark_dirty)
+
+
+for _model in CACHE_NAMESPACES:
+    post_save.connect(invalidate_catalog_cache, sender=_model, dispatch_uid=f"cache-save-{_model.__name__}")
+    post_delete.connect(invalidate_catalog_cache, sender=_model, dispatch_uid=f"cache-delete-{_model.__name__}")
+
+
+
+# ---------------- DELTA SYNC TOMBSTONE'LARI ----------------
+# Qurilmalar o'chirilgan yozuvlarni api/product/sync/ dagi "deleted" orqali bilib oladi
+
+TOMBSTONE_ENTITIES = {
+    Category: "category",
+    ProductItem: "product",
+    Good: "good",
+    Phone: "phone",
+    Ticket: "ticket",
+    Image: "image",
+}
+
+
+def write_tombstone(sender, instance, **kwargs):
+    CatalogTombstone.objects.create(entity=TOMBSTONE_ENTITIES[sender], object_id=instance.pk)
+
+
+for _model in TOMBSTONE_ENTITIES:
+    post_delete.connect(write_tombstone, sender=_model, dispatch_uid=f"tombstone-{_model.__name__}")
+
+
+# ---------------- AKSIYALAR ----------------
+# Qoida o'zgarsa katalog narxlari commit'dan keyin qayta hisoblanadi (apps.product.promotions).
+# Boshlanish/tugash vaqtlari uchun cron'da apply_promotions ishlaydi.
+
+def recompute_promotions(sender, **kwargs):
+    from .promotions import PromotionEngine
+
+    PromotionEngine.recompute_on_commit()
+
+
+post_save.connect(recompute_promotions, sender=Promotion, dispatch_uid="promotion-save")
+post_delete.connect(recompute_promotions, sender=Promotion, dispatch_uid="promotion-delete")
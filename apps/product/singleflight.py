@@ -0,0 +1,154 @@
+"""
+Single-flight: bir xil og'ir hisoblash bir vaqtda faqat bir marta bajariladi.
+
+Deploy yoki kesh tozalangandan keyin bir xil ro'yxatga kelgan o'nlab parallel so'rov
+PostgreSQL'ga birdaniga tushmasligi uchun: birinchi so'rov (leader) hisoblaydi,
+qolganlari uning natijasini kutib, o'sha natijani oladi.
+
+Kalit: (view, til, host, query parametrlar, foydalanuvchi darajasi). Natija shaxsiy
+bo'lmasligi kerak — is_favorite kabi shaxsiy maydonlar keyin har bir so'rov uchun
+alohida qo'shiladi (overlay_favorites).
+
+SINGLEFLIGHT_SHARED=True bo'lsa, worker'lar o'rtasida ham birlashtiriladi: leader umumiy
+keshdagi lock'ni oladi va natijani qisqa muddatga (SINGLEFLIGHT_SHARED_TTL) keshga yozadi.
+"""
+
+import threading
+
+from django.conf import settings
+from django.utils.translation import get_language
+from rest_framework.response import Response
+
+from apps.customer.models import Favorite
+from . import cache as catalog_cache
+
+
+# Leader yiqilib qolsa, kutayotganlar shuncha vaqtdan keyin o'zlari hisoblaydi
+WAIT_TIMEOUT = 30
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Jarayon ichida bir xil kalitli parallel chaqiruvlarni birlashtiradi"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.event.wait(WAIT_TIMEOUT) and call.error is None:
+                return call.result
+            # Leader xato bilan tugadi yoki osilib qoldi — o'zimiz hisoblaymiz
+            return fn()
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+
+flight = SingleFlight()
+
+
+def coalesce(key, fn, shared=None):
+    """
+    Jarayon ichida har doim, shared=True bo'lsa worker'lar o'rtasida ham birlashtiradi.
+    Kross-jarayon rejimi catalog_cache.get_or_set'dagi stampede lock'dan foydalanadi.
+    """
+    if shared is None:
+        shared = getattr(settings, "SINGLEFLIGHT_SHARED", False)
+    if shared:
+        ttl = getattr(settings, "SINGLEFLIGHT_SHARED_TTL", 5)
+        return flight.do(
+            key, lambda: catalog_cache.get_or_set(catalog_cache.PRODUCT, ("flight",) + key, fn, timeout=ttl)
+        )
+    return flight.do(key, fn)
+
+
+def user_tier(user):
+    """Narxlar faqat shu bayroqlarga bog'liq, shuning uchun natija daraja bo'yicha umumiy"""
+    if not user or not user.is_authenticated:
+        return "anon"
+    wholesale = getattr(user, "is_wholesaler", False) and getattr(user, "is_approved", False)
+    return f"b2b{int(getattr(user, 'is_b2b', False))}-ws{int(bool(wholesale))}"
+
+
+def request_key(view, request):
+    return (
+        type(view).__name__,
+        get_language(),
+        request.get_host(),
+        request.GET.urlencode(),
+        user_tier(request.user),
+    )
+
+
+def overlay_favorites(rows, user):
+    """Umumiy natijaga foydalanuvchining is_favorite qiymatlarini bitta so'rov bilan qo'shadi"""
+    if not user or not user.is_authenticated or not rows:
+        return rows
+    product_ids = {row["product"]["id"] for row in rows if row.get("product")}
+    favorites = set(
+        Favorite.objects.filter(user=user.profile, product_id__in=product_ids)
+        .values_list("product_id", flat=True)
+    )
+    # Umumiy natija boshqa so'rovlar bilan bo'lishiladi: o'zgartirmasdan nusxa olamiz
+    return [
+        {**row, "is_favorite": bool(row.get("product")) and row["product"]["id"] in favorites}
+        for row in rows
+    ]
+
+
+class CoalescedListMixin:
+    """
+    ListAPIView uchun: javob (view, query, daraja) bo'yicha birlashtiriladi.
+    Hisoblash vaqtida shared_computation=True — serializer va queryset shaxsiy
+    ma'lumotni (is_favorite) hisoblamaydi, u overlay_favorites bilan qo'shiladi.
+    """
+    shared_computation = False
+    personal_favorites = True
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.shared_computation:
+            context["favorite_product_ids"] = frozenset()
+        return context
+
+    def _shared_list(self, request, *args, **kwargs):
+        self.shared_computation = True
+        try:
+            return super().list(request, *args, **kwargs).data
+        finally:
+            self.shared_computation = False
+
+    def list(self, request, *args, **kwargs):
+        data = coalesce(
+            request_key(self, request),
+            lambda: self._shared_list(request, *args, **kwargs),
+        )
+        if not self.personal_favorites:
+            return Response(data)
+        if isinstance(data, dict) and "results" in data:
+            return Response({**data, "results": overlay_favorites(data["results"], request.user)})
+        return Response(overlay_favorites(data, request.user))
@@ -0,0 +1,152 @@
+"""
+Ilova birinchi ishga tushganda katalogni bitta statik fayldan yuklashi uchun snapshot.
+
+build_catalog_snapshot buyrug'i faol katalogni har bir til uchun JSON qilib, gzip bilan
+media storage'ga yozadi: catalog/snapshots/<version>/<lang>.json.gz
+version — kontent hash'i: katalog o'zgarmagan bo'lsa yangi fayl yozilmaydi.
+
+Snapshot'dagi watermark bilan qurilma keyin api/product/sync/?since=<watermark> orqali
+faqat o'zgarishlarni oladi.
+
+Katalog o'zgarganda signal mark_dirty() qiladi; cron har daqiqada
+`build_catalog_snapshot --if-dirty --debounce 120` ni chaqiradi — o'zgarishlar tinchigandan
+keyin bitta build bo'ladi (admin ketma-ket 50 ta mahsulotni tahrirlasa ham).
+"""
+
+import gzip
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone, translation
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import sync as catalog_sync
+from .models import Category, Good, Image, Phone, Ticket
+from .serializers import CategorySerializer, GoodSerializer, ImageSerializer, PhoneSerializer, TicketSerializer
+from .utils import optimized_queryset
+
+
+SNAPSHOT_DIR = "catalog/snapshots"
+MANIFEST_PATH = f"{SNAPSHOT_DIR}/manifest.json"
+MANIFEST_CACHE_KEY = "catalog-snapshot:manifest"
+DIRTY_CACHE_KEY = "catalog-snapshot:dirty"
+
+# Eski versiyalar darhol o'chirilmaydi: yuklab olayotgan qurilmalar uchun
+KEEP_VERSIONS = 3
+
+
+class CatalogSnapshotService:
+
+    @staticmethod
+    def mark_dirty():
+        cache.set(DIRTY_CACHE_KEY, time.time(), timeout=None)
+
+    @staticmethod
+    def dirty_since():
+        return cache.get(DIRTY_CACHE_KEY)
+
+    @staticmethod
+    def render(language):
+        """Bitta til uchun faol katalog (request yo'q: chakana narxlar, is_favorite=False)"""
+        context = {}
+        with translation.override(language):
+            return {
+                "categories": CategorySerializer(
+                    Category.objects.filter(active=True).order_by("id"), many=True, context=context
+                ).data,
+                "goods": GoodSerializer(
+                    optimized_queryset(Good).filter(product__active=True).order_by("id"), many=True, context=context
+                ).data,
+                "phones": PhoneSerializer(
+                    optimized_queryset(Phone).filter(product__active=True).order_by("id"), many=True, context=context
+                ).data,
+                "tickets": TicketSerializer(
+                    optimized_queryset(Ticket).filter(product__active=True).order_by("id"), many=True, context=context
+                ).data,
+                "images": ImageSerializer(
+                    Image.objects.filter(product__active=True).order_by("id"), many=True, context=context
+                ).data,
+            }
+
+    @staticmethod
+    def get_manifest():
+        manifest = cache.get(MANIFEST_CACHE_KEY)
+        if manifest is None and default_storage.exists(MANIFEST_PATH):
+            with default_storage.open(MANIFEST_PATH) as fh:
+                manifest = json.load(fh)
+            cache.set(MANIFEST_CACHE_KEY, manifest, timeout=None)
+        return manifest
+
+    @classmethod
+    def _prune(cls, versions):
+        for version in versions[KEEP_VERSIONS:]:
+            directory = f"{SNAPSHOT_DIR}/{version}"
+            try:
+                _, files = default_storage.listdir(directory)
+            except FileNotFoundError:
+                continue
+            for name in files:
+                default_storage.delete(f"{directory}/{name}")
+
+    @classmethod
+    def build(cls, force=False):
+        """
+        Snapshot yozadi va manifest'ni qaytaradi.
+        Katalog oldingi versiya bilan bir xil bo'lsa (force=False) hech narsa yozilmaydi.
+        """
+        dirty_mark = cls.dirty_since()
+        # Shu vaqtdan keyingi o'zgarishlarni qurilma delta sync orqali oladi
+        watermark = catalog_sync.CatalogSyncService.watermark()
+
+        bundles = {}
+        for language in settings.MODELTRANSLATION_LANGUAGES:
+            bundles[language] = json.dumps(
+                cls.render(language), cls=JSONEncoder, ensure_ascii=False, sort_keys=True
+            ).encode()
+
+        digest = hashlib.sha256()
+        for language in sorted(bundles):
+            digest.update(language.encode())
+            digest.update(bundles[language])
+        version = digest.hexdigest()[:16]
+
+        previous = cls.get_manifest()
+        if previous and previous["version"] == version and not force:
+            # Kontent o'zgarmagan, lekin watermark yangilanadi (sync kamroq yozuv qaytaradi)
+            manifest = {**previous, "watermark": watermark.isoformat()}
+        else:
+            files = {}
+            for language, payload in bundles.items():
+                path = f"{SNAPSHOT_DIR}/{version}/{language}.json.gz"
+                # mtime=0: bir xil kontent — bir xil fayl (CDN keshi uchun)
+                compressed = gzip.compress(payload, compresslevel=9, mtime=0)
+                if default_storage.exists(path):
+                    default_storage.delete(path)
+                default_storage.save(path, ContentFile(compressed))
+                files[language] = {"path": path, "size": len(compressed), "raw_size": len(payload)}
+
+            history = [version] + [v for v in (previous or {}).get("history", []) if v != version]
+            manifest = {
+                "version": version,
+                "generated_at": timezone.now().isoformat(),
+                "watermark": watermark.isoformat(),
+                "files": files,
+                "history": history,
+            }
+            cls._prune(history)
+            manifest["history"] = history[:KEEP_VERSIONS]
+
+        if default_storage.exists(MANIFEST_PATH):
+            default_storage.delete(MANIFEST_PATH)
+        default_storage.save(MANIFEST_PATH, ContentFile(json.dumps(manifest).encode()))
+        cache.set(MANIFEST_CACHE_KEY, manifest, timeout=None)
+
+        # Build paytida yangi o'zgarish kelgan bo'lsa, belgi qoladi va keyingi build uni oladi
+        if dirty_mark is not None and cls.dirty_since() == dirty_mark:
+            cache.delete(DIRTY_CACHE_KEY)
+        return manifest
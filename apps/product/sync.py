@@ -0,0 +1,141 @@
+"""
+Katalogning delta sync'i: qurilma lokal katalog saqlaydi va faqat o'zgarishlarni oladi.
+
+GET /api/product/sync/?since=<ISO vaqt>  ->  since'dan keyin o'zgargan va o'chirilgan yozuvlar.
+Javob har bir jadval bo'yicha (modified, id) kursori bilan sahifalanadi: has_more=True bo'lsa
+keyingi sahifa ?cursor=<next_cursor> bilan so'raladi. Oxirgi sahifadagi watermark keyingi
+sync uchun since sifatida saqlanadi.
+
+watermark bazadagi eng eski ochiq tranzaksiya boshlangan vaqtdan (pg_stat_activity.xact_start;
+ochiq tranzaksiya bo'lmasa hozirgi vaqtdan) SAFETY_LAG oldin olinadi. Hali commit bo'lmagan
+tranzaksiya (masalan bulk tahrir yoki aksiya qayta hisobi) qancha uzoq davom etmasin, uning
+yozuvlaridagi modified shu tranzaksiya ichida qo'yiladi va watermark'dan keyin bo'ladi — keyingi
+sync'da olinadi, o'tkazib yuborilmaydi. SAFETY_LAG faqat ilova va baza soatlari farqi uchun.
+"""
+
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import CatalogTombstone, Category, Good, Image, Phone, ProductItem, Ticket
+from .serializers import (
+    CategorySerializer, GoodSyncSerializer, ImageSerializer, PhoneSyncSerializer,
+    ProductItemSerializer, TicketSyncSerializer,
+)
+
+
+SAFETY_LAG = timedelta(seconds=getattr(settings, "CATALOG_SYNC_SAFETY_LAG", 2))
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+# javobdagi nom -> (tombstone entity, model, serializer)
+STREAMS = {
+    "categories": ("category", Category, CategorySerializer),
+    "products": ("product", ProductItem, ProductItemSerializer),
+    "goods": ("good", Good, GoodSyncSerializer),
+    "phones": ("phone", Phone, PhoneSyncSerializer),
+    "tickets": ("ticket", Ticket, TicketSyncSerializer),
+    "images": ("image", Image, ImageSerializer),
+}
+ENTITY_STREAMS = {entity: name for name, (entity, _, _) in STREAMS.items()}
+DELETED = "deleted"
+
+
+class CatalogSyncService:
+
+    @staticmethod
+    def oldest_transaction_start():
+        """Shu bazadagi boshqa ochiq tranzaksiyalarning eng eskisi boshlangan vaqt (yo'q bo'lsa None)"""
+        with connection.cursor() as cursor:
+            # pg_stat_activity tranzaksiya oxirigacha keshlanadi — joriy holatni o'qish uchun
+            cursor.execute("SELECT pg_stat_clear_snapshot()")
+            cursor.execute(
+                "SELECT min(xact_start) FROM pg_stat_activity"
+                " WHERE datname = current_database() AND pid <> pg_backend_pid()"
+                " AND backend_type = 'client backend' AND xact_start IS NOT NULL"
+            )
+            return cursor.fetchone()[0]
+
+    @classmethod
+    def watermark(cls):
+        until = timezone.now()
+        oldest = cls.oldest_transaction_start()
+        if oldest is not None:
+            until = min(until, oldest)
+        return until - SAFETY_LAG
+
+    @staticmethod
+    def encode_cursor(state):
+        return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            until = parse_datetime(state["until"])
+            positions = state["pos"]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid cursor")
+        if until is None or not isinstance(positions, dict):
+            raise ValueError("Invalid cursor")
+        return until, positions
+
+    @staticmethod
+    def _after(queryset, field, position):
+        """(field, id) juftligi bo'yicha position'dan keyingi yozuvlar"""
+        if position is None:
+            return queryset
+        moment, last_id = parse_datetime(position[0]), position[1]
+        if last_id is None:
+            return queryset.filter(**{f"{field}__gt": moment})
+        return queryset.filter(Q(**{f"{field}__gt": moment}) | Q(**{field: moment, "id__gt": last_id}))
+
+    @classmethod
+    def _read(cls, queryset, field, position, until, limit):
+        queryset = cls._after(queryset.filter(**{f"{field}__lte": until}), field, position)
+        rows = list(queryset.order_by(field, "id")[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if rows:
+            position = [getattr(rows[-1], field).isoformat(), rows[-1].id]
+        return rows, position, has_more
+
+    @classmethod
+    def page(cls, context, since=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        if cursor:
+            until, positions = cls.decode_cursor(cursor)
+        else:
+            until = cls.watermark()
+            start = [since.isoformat(), None] if since else None
+            positions = {name: start for name in (*STREAMS, DELETED)}
+
+        changes, has_more = {}, False
+        for name, (_, model, serializer_class) in STREAMS.items():
+            rows, positions[name], more = cls._read(
+                model.objects.all(), "modified", positions.get(name), until, limit
+            )
+            has_more |= more
+            changes[name] = serializer_class(rows, many=True, context=context).data
+
+        tombstones, positions[DELETED], more = cls._read(
+            CatalogTombstone.objects.all(), "deleted_at", positions.get(DELETED), until, limit
+        )
+        has_more |= more
+        deleted = {name: [] for name in STREAMS}
+        for tombstone in tombstones:
+            deleted[ENTITY_STREAMS[tombstone.entity]].append(tombstone.object_id)
+
+        return {
+            "changes": changes,
+            "deleted": deleted,
+            "has_more": has_more,
+            "next_cursor": cls.encode_cursor({"until": until.isoformat(), "pos": positions}) if has_more else None,
+            "watermark": until.isoformat(),
+        }
@@ -1,3 +1,504 @@
-from django.test import TestCase
+import gzip
+import json
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.product import bulk
+from apps.product import cache as catalog_cache
+from apps.product import cache_bus
+from apps.product import checks
+from apps.product import singleflight
+from apps.product import sync as catalog_sync
+from apps.product.bulk import ProductBulkEditService
+from apps.product.promotions import PromotionEngine
+from apps.product.snapshot import CatalogSnapshotService
+from rest_framework.test import APIClient
+
+from apps.customer.models import Favorite, News, Profile
+from apps.dashboard.forms import GoodEditForm
+from apps.merchant.loyalty import LoyaltyLedgerService
+from apps.merchant.models import LoyaltyCard
+from apps.product.models import Category, Good, ProductItem, Promotion
+
+
+# REDIS_URL berilgan muhitda testlar umumiy Redis'ni tozalamasin
+TEST_CACHES = {
+	"default": {
+		"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+		"LOCATION": "product-tests",
+		"KEY_PREFIX": "million",
+		"TIMEOUT": 300,
+	}
+}
+
+@override_settings(CACHES=TEST_CACHES)
+class CatalogCacheTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.addCleanup(cache.clear)
+
+	def test_deploy_check_requires_shared_cache(self):
+		self.assertEqual([error.id for error in checks.shared_cache_check(None)], ["product.E001"])
+		redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://cache:6379/1"}}
+		with override_settings(CACHES=redis):
+			self.assertEqual(checks.shared_cache_check(None), [])
+
+	def test_cache_aside_hits_after_first_load(self):
+		loader = mock.Mock(return_value=["a"])
+		for _ in range(3):
+			self.assertEqual(catalog_cache.get_or_set(catalog_cache.CATEGORY, ("list", "en"), loader), ["a"])
+		loader.assert_called_once()
+
+		counts = catalog_cache.stats.snapshot([catalog_cache.CATEGORY])[catalog_cache.CATEGORY]
+		self.assertEqual((counts["hit"], counts["miss"]), (2, 1))
+
+	def test_category_save_bumps_namespace_version(self):
+		loader = mock.Mock(side_effect=[["old"], ["new"]])
+		catalog_cache.get_or_set(catalog_cache.CATEGORY, ("list",), loader)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			Category.objects.create(name="Drinks", image="category/drinks.png")
+
+		self.assertEqual(catalog_cache.get_or_set(catalog_cache.CATEGORY, ("list",), loader), ["new"])
+
+
+class CacheBusTests(TransactionTestCase):
+	def setUp(self):
+		catalog_cache.local.clear()
+		self.listener = cache_bus.InvalidationListener()
+		self.listener.start()
+		self.addCleanup(self.listener.join, 10)
+		self.addCleanup(self.listener.stop)
+		self.assertTrue(self.listener.ready.wait(5))
+
+	def test_notify_evicts_local_namespace(self):
+		catalog_cache.local_get_or_set(catalog_cache.CONFIG, ("service",), lambda: "cached")
+		# Boshqa worker'dan kelgandek: faqat NOTIFY, lokal evict'siz
+		with connection.cursor() as cursor:
+			cursor.execute("SELECT pg_notify(%s, %s)", [cache_bus.CHANNEL, catalog_cache.CONFIG])
+
+		deadline = time.monotonic() + 5
+		while catalog_cache.local.get(catalog_cache.CONFIG, "service") is not catalog_cache._MISSING:
+			self.assertLess(time.monotonic(), deadline)
+			time.sleep(0.01)
+		self.assertEqual(catalog_cache.local_get_or_set(catalog_cache.CONFIG, ("service",), lambda: "fresh"), "fresh")
+
+
+
+class SingleFlightTests(TestCase):
+	def test_concurrent_calls_share_one_computation(self):
+		flight = singleflight.SingleFlight()
+		started, release = threading.Event(), threading.Event()
+		calls = []
+
+		def loader():
+			calls.append(1)
+			started.set()
+			release.wait(5)
+			return {"results": [1, 2]}
+
+		results = []
+		leader = threading.Thread(target=lambda: results.append(flight.do("k", loader)))
+		leader.start()
+		self.assertTrue(started.wait(5))
+		followers = [threading.Thread(target=lambda: results.append(flight.do("k", loader))) for _ in range(4)]
+		for thread in followers:
+			thread.start()
+		# Follower'lar leader'ni kutib turishi uchun
+		time.sleep(0.05)
+		release.set()
+		for thread in [leader, *followers]:
+			thread.join(5)
+
+		self.assertEqual(len(calls), 1)
+		self.assertEqual(results, [{"results": [1, 2]}] * 5)
+
+	def test_failed_leader_does_not_poison_key(self):
+		flight = singleflight.SingleFlight()
+		with self.assertRaises(ValueError):
+			flight.do("k", mock.Mock(side_effect=ValueError))
+		self.assertEqual(flight.do("k", lambda: "ok"), "ok")
+
+	def test_user_tier_separates_price_groups(self):
+		anon = mock.Mock(is_authenticated=False)
+		retail = mock.Mock(is_authenticated=True, is_b2b=False, is_wholesaler=False, is_approved=False)
+		pending = mock.Mock(is_authenticated=True, is_b2b=False, is_wholesaler=True, is_approved=False)
+		wholesale = mock.Mock(is_authenticated=True, is_b2b=False, is_wholesaler=True, is_approved=True)
+		self.assertEqual(singleflight.user_tier(anon), "anon")
+		self.assertEqual(singleflight.user_tier(retail), singleflight.user_tier(pending))
+		self.assertNotEqual(singleflight.user_tier(retail), singleflight.user_tier(wholesale))
+
+
+class CoalescedListTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(username="998901112222", password="testpass123")
+		self.profile = Profile.objects.create(origin=self.user, full_name="Flight User", phone_number="998901112222")
+		self.client.force_authenticate(user=self.user)
+		with mock.patch("apps.product.signals.send_fcm_notification"):
+			self.products = [
+				ProductItem.objects.create(desc=f"Product {i}", old_price=1000, new_price=900)
+				for i in range(3)
+			]
+		for i, product in enumerate(self.products):
+			Good.objects.create(product=product, name=f"Good {i}")
+		Favorite.objects.create(user=self.profile, product=self.products[1])
+
+	def test_popular_goods_overlays_personal_favorites(self):
+		response = self.client.get("/api/product/popular-goods/list/")
+		self.assertEqual(response.status_code, 200)
+		favorites = {row["product"]["id"]: row["is_favorite"] for row in response.data["results"]}
+		self.assertEqual(favorites, {p.id: p == self.products[1] for p in self.products})
+
+		# Boshqa foydalanuvchi umumiy natijani oladi, lekin o'z sevimlilari bilan
+		other = get_user_model().objects.create_user(username="998901113333", password="testpass123")
+		Profile.objects.create(origin=other, full_name="Other User", phone_number="998901113333")
+		self.client.force_authenticate(user=other)
+		response = self.client.get("/api/product/popular-goods/list/")
+		self.assertFalse(any(row["is_favorite"] for row in response.data["results"]))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class HomeAPITests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.addCleanup(cache.clear)
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(username="998901114444", password="testpass123")
+		self.profile = Profile.objects.create(origin=self.user, full_name="Home User", phone_number="998901114444")
+		self.client.force_authenticate(user=self.user)
+		with mock.patch("apps.product.signals.send_fcm_notification"):
+			self.products = [
+				ProductItem.objects.create(desc=f"Product {i}", old_price=1000, new_price=900 if i else 1000)
+				for i in range(3)
+			]
+			for i, product in enumerate(self.products):
+				Good.objects.create(product=product, name=f"Good {i}")
+			now = timezone.now()
+			self.news = News.objects.create(
+				title="Yangilik", start_date=now, end_date=now + timezone.timedelta(days=1), image="media/news/a.png"
+			)
+		Favorite.objects.create(user=self.profile, product=self.products[2])
+		LoyaltyLedgerService.get_card(self.profile)
+		LoyaltyCard.objects.filter(profile=self.profile).update(current_balance=5000)
+
+	def test_home_assembles_sections_and_personal_data(self):
+		response = self.client.get("/api/product/home/")
+		self.assertEqual(response.status_code, 200)
+		data = response.data
+		self.assertEqual(len(data["new_goods"]), 3)
+		self.assertEqual(len(data["sale_goods"]), 2)
+		favorites = [row["product"]["id"] for row in data["new_goods"] if row["is_favorite"]]
+		self.assertEqual(favorites, [self.products[2].id])
+		self.assertEqual(data["latest_news"]["id"], self.news.id)
+		self.assertEqual(data["loyalty_card"]["current_balance"], "5000.00")
+
+	def test_shared_sections_come_from_cache(self):
+		self.client.get("/api/product/home/")
+		# Ikkinchi so'rovda faqat shaxsiy qismlar: sevimlilar, yangilik, karta
+		with self.assertNumQueries(3):
+			response = self.client.get("/api/product/home/")
+		self.assertEqual(len(response.data["popular_goods"]), 3)
+
+
+@mock.patch("apps.product.signals.send_fcm_notification")
+@mock.patch.object(catalog_sync, "SAFETY_LAG", timezone.timedelta(0))
+class CatalogSyncTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.user = get_user_model().objects.create_user(username="998901115555", password="testpass123")
+		self.client.force_authenticate(user=self.user)
+		with mock.patch("apps.product.signals.send_fcm_notification"):
+			self.products = [
+				ProductItem.objects.create(desc=f"Product {i}", old_price=1000, new_price=900)
+				for i in range(3)
+			]
+		self.goods = [Good.objects.create(product=p, name=f"Good {i}") for i, p in enumerate(self.products)]
+
+	def _sync(self, **params):
+		response = self.client.get("/api/product/sync/", params)
+		self.assertEqual(response.status_code, 200, response.data)
+		return response.data
+
+	def test_changes_and_tombstones_since_watermark(self, _fcm):
+		watermark = self._sync()["watermark"]
+
+		self.goods[0].name = "Renamed"
+		self.goods[0].save()
+		deleted_product_id, deleted_good_id = self.products[1].id, self.goods[1].id
+		self.products[1].delete()
+
+		data = self._sync(since=watermark)
+		self.assertEqual([row["id"] for row in data["changes"]["goods"]], [self.goods[0].id])
+		self.assertEqual(data["changes"]["products"], [])
+		self.assertEqual(data["deleted"]["products"], [deleted_product_id])
+		self.assertEqual(data["deleted"]["goods"], [deleted_good_id])
+
+	def test_cursor_pages_through_all_rows(self, _fcm):
+		seen = []
+		data = self._sync(page_size=2)
+		seen += [row["id"] for row in data["changes"]["products"]]
+		while data["has_more"]:
+			data = self._sync(cursor=data["next_cursor"], page_size=2)
+			seen += [row["id"] for row in data["changes"]["products"]]
+		self.assertEqual(sorted(seen), sorted(p.id for p in self.products))
+
+	def test_watermark_stays_behind_open_transactions(self, _fcm):
+		# Boshqa worker'dagi uzoq tranzaksiya (bulk tahrir, aksiya hisobi) hali commit bo'lmagan
+		other = connections.create_connection("default")
+		self.addCleanup(other.close)
+		other.set_autocommit(False)
+		with other.cursor() as cursor:
+			cursor.execute("SELECT now()")
+			started = cursor.fetchone()[0]
+
+		self.assertLessEqual(parse_datetime(self._sync()["watermark"]), started)
+		other.rollback()
+		self.assertGreater(parse_datetime(self._sync()["watermark"]), started)
+
+	def test_invalid_parameters_are_rejected(self, _fcm):
+		self.assertEqual(self.client.get("/api/product/sync/", {"since": "yesterday"}).status_code, 400)
+		self.assertEqual(self.client.get("/api/product/sync/", {"cursor": "broken"}).status_code, 400)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHES=TEST_CACHES)
+class CatalogSnapshotTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.addCleanup(cache.clear)
+		with mock.patch("apps.product.signals.send_fcm_notification"):
+			active = ProductItem.objects.create(desc="Active", old_price=1000, new_price=900)
+			hidden = ProductItem.objects.create(desc="Hidden", old_price=1000, new_price=900, active=False)
+		self.good = Good.objects.create(product=active, name="Visible good")
+		Good.objects.create(product=hidden, name="Hidden good")
+
+	def test_build_writes_versioned_gzip_bundle_per_language(self):
+		manifest = CatalogSnapshotService.build()
+		self.assertEqual(set(manifest["files"]), {"uz", "en", "ru", "ko"})
+
+		with default_storage.open(manifest["files"]["en"]["path"]) as fh:
+			bundle = json.loads(gzip.decompress(fh.read()))
+		self.assertEqual([row["id"] for row in bundle["goods"]], [self.good.id])
+
+		# Katalog o'zgarmagan: versiya ham o'zgarmaydi
+		self.assertEqual(CatalogSnapshotService.build()["version"], manifest["version"])
+
+		response = APIClient().get("/api/product/snapshot/", {"lang": "en"})
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.data["version"], manifest["version"])
+		self.assertTrue(response.data["url"].endswith(manifest["files"]["en"]["path"]))
+
+	def test_default_language_without_lang_param(self):
+		manifest = CatalogSnapshotService.build()
+		# LocaleMiddleware yo'q: faol til LANGUAGE_CODE ("en-us")
+		response = APIClient().get("/api/product/snapshot/")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.data["language"], "en")
+		self.assertTrue(response.data["url"].endswith(manifest["files"]["en"]["path"]))
+
+	def test_command_builds_only_when_catalog_changed(self):
+		call_command("build_catalog_snapshot", stdout=StringIO())
+		out = StringIO()
+		call_command("build_catalog_snapshot", "--if-dirty", stdout=out)
+		self.assertIn("unchanged", out.getvalue())
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.good.name = "Renamed good"
+			self.good.save()
+		out = StringIO()
+		call_command("build_catalog_snapshot", "--if-dirty", stdout=out)
+		self.assertIn("ready", out.getvalue())
+		self.assertIsNone(CatalogSnapshotService.dirty_since())
+
+
+@mock.patch("apps.product.bulk.send_fcm_notification")
+class ProductBulkEditTests(TestCase):
+	def setUp(self):
+		with mock.patch("apps.product.signals.send_fcm_notification"):
+			self.products = [
+				ProductItem.objects.create(desc=f"Bulk {i}", old_price=1000, new_price=0, available_quantity=5)
+				for i in range(3)
+			]
+
+	def test_applies_rows_with_one_coalesced_event(self, fcm):
+		before = ProductItem.objects.get(pk=self.products[0].pk).modified
+		with mock.patch("apps.product.bulk.invalidate_namespaces") as invalidate, \
+				mock.patch("apps.product.signals.send_fcm_notification") as per_save_fcm:
+			report = ProductBulkEditService.apply([
+				{"id": self.products[0].pk, "new_price": "800", "available_quantity": "7"},
+				{"id": self.products[1].pk, "new_price": "900", "active": "yo'q"},
+				{"id": self.products[2].pk, "old_price": "1000"},
+			])
+
+		self.assertEqual(report, {"updated": 2, "unchanged": 1, "price_drops": 1})
+		invalidate.assert_called_once_with(catalog_cache.PRODUCT)
+		# post_save signallari ishlamadi, faol va arzonlashgan bitta mahsulot uchun bitta xabar
+		per_save_fcm.assert_not_called()
+		fcm.assert_called_once()
+		self.assertEqual(fcm.call_args.args[1]["uz"], "Bulk 0")
+
+		first, second = ProductItem.objects.filter(pk__in=[self.products[0].pk, self.products[1].pk]).order_by("pk")
+		self.assertEqual((first.new_price, first.available_quantity), (800, 7))
+		self.assertGreater(first.modified, before)
+		self.assertFalse(second.active)
+
+	def test_invalid_row_rejects_whole_batch(self, fcm):
+		with self.assertRaises(bulk.BulkEditError) as ctx:
+			ProductBulkEditService.apply([
+				{"id": self.products[0].pk, "new_price": "500"},
+				{"id": self.products[1].pk, "new_price": "-1"},
+			])
+		self.assertIn(2, ctx.exception.errors)
+		with self.assertRaises(bulk.BulkEditError):
+			ProductBulkEditService.apply([{"id": 999999, "new_price": "1"}])
+		self.assertEqual(ProductItem.objects.get(pk=self.products[0].pk).new_price, 0)
+		fcm.assert_not_called()
+
+	def test_csv_round_trip_through_dashboard(self, fcm):
+		staff = get_user_model().objects.create_user(username="bulk-staff", password="testpass123", is_staff=True)
+		self.client.force_login(staff)
+
+		exported = self.client.get("/dashboard/product/bulk-edit/", {"export": "csv", "q": "Bulk"})
+		lines = exported.content.decode().splitlines()
+		self.assertEqual(lines[0], "id,desc,old_price,new_price,b2b_price,available_quantity,active")
+		self.assertEqual(len(lines), 4)
+
+		upload = SimpleUploadedFile(
+			"prices.csv",
+			"id,new_price,available_quantity\n"
+			f"{self.products[0].pk},700,\n{self.products[1].pk},700,0\n".encode(),
+		)
+		response = self.client.post("/dashboard/product/bulk-edit/", {"csv": upload})
+		self.assertEqual(response.status_code, 302)
+		prices = dict(ProductItem.objects.filter(new_price=700).values_list("pk", "available_quantity"))
+		self.assertEqual(prices, {self.products[0].pk: 5, self.products[1].pk: 0})
+		fcm.assert_called_once()
+		self.assertEqual(fcm.call_args.args[1]["uz"], "2 ta mahsulot narxi arzonladi")
+
+
+@mock.patch("apps.product.signals.send_fcm_notification")
+class PromotionTests(TestCase):
+	def setUp(self):
+		self.now = timezone.now()
+		with mock.patch("apps.product.signals.send_fcm_notification"):
+			self.category = Category.objects.create(name="Promo", image="category/promo.png")
+			self.cheap = ProductItem.objects.create(desc="Promo A", old_price=1000, new_price=0, b2b_price=800)
+			self.manual = ProductItem.objects.create(desc="Promo B", old_price=1000, new_price=700)
+			self.other = ProductItem.objects.create(desc="Other", old_price=1000, new_price=0)
+			for product in (self.cheap, self.manual):
+				Good.objects.create(product=product, name=product.desc, category=self.category)
+
+	def rule(self, **kwargs):
+		defaults = {
+			"name": "Rule", "scope": "category", "category": self.category, "kind": "percent", "value": 10,
+			"starts_at": self.now - timezone.timedelta(hours=1), "ends_at": self.now + timezone.timedelta(hours=1),
+		}
+		return Promotion.objects.create(**{**defaults, **kwargs})
+
+	def prices(self, product):
+		product.refresh_from_db()
+		return product.new_price, product.manual_new_price, product.promotion_id
+
+	def test_best_rule_wins_and_manual_price_is_kept(self, _fcm):
+		self.rule()
+		fixed = self.rule(kind="fixed", value=250)
+		with mock.patch("apps.product.promotions.invalidate_namespaces") as invalidate:
+			changed = PromotionEngine.recompute(self.now)
+
+		invalidate.assert_called_once_with(catalog_cache.PRODUCT)
+		self.assertEqual(changed, 1)
+		self.assertEqual(self.prices(self.cheap), (750, 0, fixed.id))
+		# 750 qo'lda qo'yilgan 700 dan qimmat — aksiya qo'llanmaydi
+		self.assertEqual(self.prices(self.manual), (700, None, None))
+		self.assertEqual(self.prices(self.other), (0, None, None))
+
+		# o'zgarish yo'q — hech narsa yozilmaydi
+		with mock.patch("apps.product.promotions.invalidate_namespaces") as invalidate:
+			self.assertEqual(PromotionEngine.recompute(self.now), 0)
+		invalidate.assert_not_called()
+
+	def test_b2b_rule_uses_b2b_price(self, _fcm):
+		rule = self.rule(tier="b2b", scope="product", category=None, product=self.cheap, value=50)
+		PromotionEngine.recompute(self.now)
+		self.cheap.refresh_from_db()
+		self.assertEqual((self.cheap.b2b_price, self.cheap.manual_b2b_price, self.cheap.b2b_promotion_id), (400, 800, rule.id))
+		self.assertEqual(self.cheap.new_price, 0)
+
+	def test_ended_rule_restores_manual_price(self, _fcm):
+		self.rule(value=50)
+		PromotionEngine.recompute(self.now)
+		self.assertEqual(self.prices(self.manual)[0], 500)
+
+		later = self.now + timezone.timedelta(hours=2)
+		PromotionEngine.recompute(later)
+		self.assertEqual(self.prices(self.manual), (700, None, None))
+		self.assertEqual(self.prices(self.cheap), (0, None, None))
+
+	def test_bulk_edit_during_promotion_survives_its_end(self, _fcm):
+		self.rule(value=50)
+		PromotionEngine.recompute(self.now)
+		self.assertEqual(self.prices(self.manual), (500, 700, mock.ANY))
+
+		# Eksport qilingan (aksiya) narx qayta yuklansa — o'zgarish emas
+		self.assertEqual(ProductBulkEditService.apply([{"id": self.manual.pk, "new_price": "500"}])["unchanged"], 1)
+		with self.captureOnCommitCallbacks(execute=True):
+			ProductBulkEditService.apply([{"id": self.manual.pk, "new_price": "600"}], notify=False)
+		# Aksiya narxi yangi qo'lda narxdan arzon — aksiyada qoladi, yangi narx stash'da
+		self.assertEqual(self.prices(self.manual), (500, 600, mock.ANY))
+
+		PromotionEngine.recompute(self.now + timezone.timedelta(hours=2))
+		self.assertEqual(self.prices(self.manual), (600, None, None))
+
+	def test_form_edit_during_promotion_survives_its_end(self, _fcm):
+		self.rule(value=50)
+		PromotionEngine.recompute(self.now)
+		good = Good.objects.get(product=self.manual)
+		data = {
+			"name_uz": "Promo B", "name_ru": "", "name_en": "", "name_ko": "", "category": self.category.pk,
+			"ingredients": "", "old_price": "1000",
+		}
+		# Faqat nom o'zgardi (forma aksiya narxini qaytarib yuboradi) — stash tegilmaydi
+		form = GoodEditForm({**data, "new_price": "500"}, instance=good)
+		self.assertTrue(form.is_valid(), form.errors)
+		with self.captureOnCommitCallbacks(execute=True):
+			form.save()
+		self.assertEqual(self.prices(self.manual), (500, 700, mock.ANY))
+
+		# Qo'lda narx aksiyadan arzon — aksiya bekor, yangi narx darhol
+		form = GoodEditForm({**data, "new_price": "450"}, instance=good)
+		self.assertTrue(form.is_valid(), form.errors)
+		with self.captureOnCommitCallbacks(execute=True):
+			form.save()
+		self.assertEqual(self.prices(self.manual), (450, None, None))
+
+		PromotionEngine.recompute(self.now + timezone.timedelta(hours=2))
+		self.assertEqual(self.prices(self.manual), (450, None, None))
+
+	def test_rule_save_and_delete_recompute_on_commit(self, _fcm):
+		with self.captureOnCommitCallbacks(execute=True):
+			rule = self.rule(scope="product_type", category=None, product_type=self.other.product_type, value=20)
+		self.assertEqual(self.prices(self.other), (800, 0, rule.id))
+
+		with self.captureOnCommitCallbacks(execute=True):
+			rule.delete()
+		self.assertEqual(self.prices(self.other), (0, None, None))
+
+	def test_apply_promotions_command(self, _fcm):
+		rule = self.rule(starts_at=self.now - timezone.timedelta(minutes=5))
+		out = StringIO()
+		call_command("apply_promotions", stdout=out)
+		self.assertIn("1 products repriced", out.getvalue())
+		self.assertIn(str(rule.ends_at.year), out.getvalue())
@@ -29,6 +29,7 @@ from .views import (
     MultiProductSearchView,
     RegularProductListAPIView,
     WholesaleProductAPIView, GoodDetailAPIView, GoodAllListAPIView,
+    CacheStatsAPIView, CatalogSnapshotAPIView, CatalogSyncAPIView, HomeAPIView,
 )
 
 urlpatterns = [
@@ -65,4 +66,16 @@ urlpatterns = [
 
     path('goods/', GoodAllListAPIView.as_view(), name='good-list'),
     path('goods/<int:pk>/', GoodDetailAPIView.as_view(), name='good-detail'),
+
+    # Bosh sahifa: barcha bo'limlar bitta so'rovda
+    path('home/', HomeAPIView.as_view(), name='home'),
+
+    # Delta sync: ?since=<watermark> yoki ?cursor=<next_cursor>
+    path('sync/', CatalogSyncAPIView.as_view(), name='catalog-sync'),
+
+    # Birinchi ishga tushish uchun katalog snapshot'i (versiya va fayl manzili)
+    path('snapshot/', CatalogSnapshotAPIView.as_view(), name='catalog-snapshot'),
+
+    # Kesh statistikasi (faqat admin)
+    path('cache-stats/', CacheStatsAPIView.as_view(), name='cache-stats'),
 ]
@@ -7,4 +7,8 @@ class ProductItemCreatorMixin(serializers.ModelSerializer):
     def create_pruduct(self, validation_data):
         product_item = validation_data.pop("product")
         product = ProductItem.objects.create(**product_item)
-        return product
\ No newline at end of file
+        return product
+
+def optimized_queryset(model_class):
+    """Ticket/Phone/Good ro'yxatlari uchun umumiy select/prefetch qoidalari"""
+    return model_class.objects.select_related("product").prefetch_related("product__images")
@@ -1,15 +1,25 @@
 from django.db.models import Q, Exists, OuterRef, F, Sum, Value, BooleanField
 from django.conf import settings
+from django.core.files.storage import default_storage
 import django_filters
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet
 from rest_framework import views, status, generics
 from rest_framework.filters import SearchFilter
 from rest_framework.generics import ListAPIView, RetrieveAPIView
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema
 from rest_framework.pagination import PageNumberPagination
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import get_language
 from apps.customer.models import Favorite
+from . import cache as catalog_cache
+from .home import HomeService
+from .snapshot import CatalogSnapshotService
+from .sync import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, CatalogSyncService
+from .utils import optimized_queryset
+from .singleflight import CoalescedListMixin, coalesce, overlay_favorites, request_key
 from .models import Category, Good, Image, Phone, Ticket, ProductItem
 from .permissions import IsApprovedWholesaler
 from .serializers import (
@@ -33,9 +43,10 @@ class ProductOptimizationMixin:
     pagination_class = CustomPageNumberPagination
     def get_optimized_queryset(self, model_class, relation_name=None):
         user = self.request.user
-        queryset = model_class.objects.select_related("product").prefetch_related("product__images")
+        queryset = optimized_queryset(model_class)
 
-        if user.is_authenticated:
+        # Umumiy (single-flight) hisoblashda is_favorite keyin alohida qo'shiladi
+        if user.is_authenticated and not getattr(self, "shared_computation", False):
             favorites_subquery = Favorite.objects.filter(
                 user=user.profile, product_id=OuterRef("product_id")
             )
@@ -58,6 +69,15 @@ class CategoryListAPIView(generics.ListAPIView):
     pagination_class = CustomPageNumberPagination
     permission_classes = [IsAuthenticated]
 
+    def list(self, request, *args, **kwargs):
+        # Kategoriyalar kam o'zgaradi: javob til va query parametrlar bo'yicha keshlanadi
+        data = catalog_cache.get_or_set(
+            catalog_cache.CATEGORY,
+            ("list", get_language(), request.get_host(), request.GET.urlencode()),
+            lambda: super(CategoryListAPIView, self).list(request, *args, **kwargs).data,
+        )
+        return Response(data)
+
 
 # SubCategoryListAPIView butunlay olib tashlandi.
 
@@ -169,7 +189,7 @@ class PopularPhonesAPIView(generics.ListAPIView):
 
 
 @extend_schema(tags=["Product"])
-class PopularGoodAPIView(ProductOptimizationMixin, generics.ListAPIView):
+class PopularGoodAPIView(CoalescedListMixin, ProductOptimizationMixin, generics.ListAPIView):
     pagination_class = CustomPageNumberPagination
     serializer_class = GoodPopularSerializer
     permission_classes = [IsAuthenticated]
@@ -225,14 +245,22 @@ class MultiProductSearchView(views.APIView):
                 query |= Q(**{f"{field_name}_{lang}__icontains": search_query})
             return query
 
-        context = {"request": request}
-        results = {
-            "tickets": TicketSerializer(Ticket.objects.filter(build_query("event_name")), many=True,
-                                        context=context).data,
-            "phones": PhoneSerializer(Phone.objects.filter(build_query("model_name")), many=True, context=context).data,
-            "goods": GoodSerializer(Good.objects.filter(build_query("name")), many=True, context=context).data,
-        }
-        return Response(results)
+        # Natija umumiy: is_favorite keyin har bir foydalanuvchi uchun qo'shiladi
+        context = {"request": request, "favorite_product_ids": frozenset()}
+
+        def search():
+            return {
+                "tickets": TicketSerializer(Ticket.objects.filter(build_query("event_name")), many=True,
+                                            context=context).data,
+                "phones": PhoneSerializer(Phone.objects.filter(build_query("model_name")), many=True, context=context).data,
+                "goods": GoodSerializer(Good.objects.filter(build_query("name")), many=True, context=context).data,
+            }
+
+        results = coalesce(request_key(self, request), search)
+        return Response({
+            group: overlay_favorites(rows, request.user)
+            for group, rows in results.items()
+        })
 
 
 # --- Other Views ---
@@ -301,10 +329,12 @@ class RegularProductListAPIView(ListAPIView):
         return context
 
 @extend_schema(tags=["Main_Product"])
-class GoodAllListAPIView(generics.ListAPIView):
+class GoodAllListAPIView(CoalescedListMixin, generics.ListAPIView):
     """
     Barcha oziq-ovqatlar ro'yxati (Faqat main=True bo'lganlar)
     """
+    # GoodFullSerializer is_favorite'ni hisoblamaydi — javob faqat narx darajasiga bog'liq
+    personal_favorites = False
     serializer_class = GoodFullSerializer
     pagination_class = CustomPageNumberPagination
     filter_backends = [DjangoFilterBackend, SearchFilter]
@@ -342,3 +372,95 @@ class GoodDetailAPIView(generics.RetrieveAPIView):
             favs = Favorite.objects.filter(user=user.profile, product_id=OuterRef('product_id'))
             queryset = queryset.annotate(is_favorite=Exists(favs))
         return queryset
+
+
+@extend_schema(tags=["Product"])
+class HomeAPIView(views.APIView):
+    """
+    Bosh sahifa uchun hamma bo'limlar bitta so'rovda:
+    banners, categories, popular_goods, sale_goods, new_goods, latest_news, loyalty_card
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        sections = HomeService.shared_sections(request)
+        return Response(HomeService.personalize(sections, request))
+
+
+@extend_schema(tags=["Product"])
+class CatalogSyncAPIView(views.APIView):
+    """
+    Katalogdagi o'zgarishlar: ?since=<watermark> yoki keyingi sahifa uchun ?cursor=<next_cursor>.
+    since berilmasa — to'liq katalog (birinchi sync).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        since = request.query_params.get("since")
+        cursor = request.query_params.get("cursor")
+        try:
+            limit = min(int(request.query_params.get("page_size", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({"error": "page_size must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"error": "page_size must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if since:
+            try:
+                # "+" query string'da bo'sh joyga aylanib qoladi
+                since = parse_datetime(since.replace(" ", "+"))
+            except ValueError:
+                since = None
+            if since is None:
+                return Response({"error": "since must be an ISO 8601 datetime"}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        try:
+            data = CatalogSyncService.page(
+                {"request": request}, since=since, cursor=cursor, limit=limit
+            )
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+
+@extend_schema(tags=["Product"])
+class CatalogSnapshotAPIView(views.APIView):
+    """
+    Joriy katalog snapshot'ining versiyasi va yuklab olish manzili (?lang=uz|en|ru|ko).
+    Qurilma faylni yuklab oladi, keyin watermark bilan api/product/sync/ ni chaqiradi.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        manifest = CatalogSnapshotService.get_manifest()
+        lang = request.query_params.get("lang")
+        if not lang:
+            # LANGUAGE_CODE "en-us" kabi to'liq kod keladi, snapshot esa modeltranslation tillari bo'yicha
+            lang = (get_language() or "").split("-")[0]
+            if lang not in settings.MODELTRANSLATION_LANGUAGES:
+                lang = settings.MODELTRANSLATION_DEFAULT_LANGUAGE
+        if not manifest or lang not in manifest["files"]:
+            return Response({"error": "Snapshot not available"}, status=status.HTTP_404_NOT_FOUND)
+
+        bundle = manifest["files"][lang]
+        return Response({
+            "version": manifest["version"],
+            "generated_at": manifest["generated_at"],
+            "watermark": manifest["watermark"],
+            "language": lang,
+            "url": request.build_absolute_uri(default_storage.url(bundle["path"])),
+            "size": bundle["size"],
+            "encoding": "gzip",
+        })
+
+
+@extend_schema(tags=["Product"])
+class CacheStatsAPIView(views.APIView):
+    """Katalog keshining hit/miss statistikasi (barcha worker'lar bo'yicha)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(catalog_cache.stats.snapshot())
+
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Har bir worker o'z xotira keshini NOTIFY orqali tozalab turadi
+from apps.product.cache_bus import start_listener  # noqa: E402
+
+start_listener()
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "django_filters",
     "rest_framework",
     "rest_framework.authtoken",
@@ -121,6 +122,35 @@ DATABASES = {
     }
 }
 
+# ============================================
+# CACHE
+# ============================================
+
+# Prod'da REDIS_URL majburiy (REDIS_URL=redis://host:6379/1): barcha worker'lar uchun umumiy kesh,
+# apps.product.cache dagi add() qulfi va namespace versiyasi incr() jarayonlar orasida atomar.
+# REDIS_URL bo'lmasa (faqat lokal va testlar) — jarayon xotirasidagi kesh; entrypoint.sh dagi
+# "check --deploy" bunday sozlama bilan serverni ishga tushirmaydi (apps.product.checks).
+REDIS_URL = os.environ.get("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "million",
+            "TIMEOUT": 300,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "million",
+            "KEY_PREFIX": "million",
+            "TIMEOUT": 300,
+        }
+    }
+
 # ============================================
 # PASSWORD VALIDATION
 # ============================================
@@ -1,6 +1,7 @@
 #!/bin/sh
 set -e
 
+python manage.py check --deploy --tag caches --fail-level ERROR
 python manage.py migrate --fake
 python manage.py collectstatic --noinput
 python create_admin.py